@@ -4,21 +4,74 @@
 當 Agent 故障時，發送 Telegram/Email 警報
 """
 
+import os
+import time
+import atexit
+import string
+import weakref
+import threading
 import subprocess
+from collections import OrderedDict
+from types import MappingProxyType
 from datetime import datetime, timezone, timedelta
 
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
+# 不經過合併窗口、立即發送的嚴重級別
+CRITICAL_SEVERITIES = {'severe', 'critical'}
+
+SEVERITY_ORDER = ['critical', 'severe', 'high', 'moderate', 'medium', 'low']
+
+RENDER_CACHE_SIZE = 1024
+
+_formatter = string.Formatter()
+
+# 需要在進程退出前發送未結束窗口的 AlertManager（弱引用，不延長實例壽命）
+_open_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_managers():
+    """進程退出前發送所有未關閉的 AlertManager 中的警報"""
+    for manager in list(_open_managers):
+        manager.close()
+
+
+class CompiledTemplate:
+    """預先解析的格式模板（不可變，渲染時不再解析格式字符串）"""
+    
+    __slots__ = ('source', 'parts')
+    
+    def __init__(self, source: str):
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'parts', tuple(_formatter.parse(source)))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledTemplate is immutable")
+    
+    def render(self, values: dict) -> str:
+        """渲染模板"""
+        output = []
+        for literal, field_name, format_spec, conversion in self.parts:
+            output.append(literal)
+            if field_name is None:
+                continue
+            value = _formatter.get_field(field_name, (), values)[0]
+            value = _formatter.convert_field(value, conversion)
+            output.append(format(value, format_spec or ''))
+        return ''.join(output)
+
 
 class AlertManager:
     """警報管理器"""
     
-    def __init__(self):
+    def __init__(self, coalesce_window: float = 60, auto_flush: bool = True):
         self.alert_types = {
             'agent_down': {
                 'title': 'Agent 故障',
                 'severity': 'high',
+                'description': "{agent_name} 連續 {fail_count} 次健康檢查失敗。",
                 'template': """<b>{severity} - {title}</b>
 
 {description}
@@ -34,6 +87,7 @@ class AlertManager:
             'agent_slow': {
                 'title': 'Agent 響應緩慢',
                 'severity': 'low',
+                'description': "{agent_name} 響應緩慢：響應時間 {response_time} 秒，超過閾值 {threshold} 秒。",
                 'template': """<b>{severity} - {title}</b>
 
 {description}
@@ -49,6 +103,7 @@ class AlertManager:
             'database_down': {
                 'title': '數據庫故障',
                 'severity': 'severe',
+                'description': "{component} 連續 {fail_count} 次連接失敗。",
                 'template': """<b>{severity} - {title}</b>
 
 {description}
@@ -63,6 +118,7 @@ class AlertManager:
             'docker_down': {
                 'title': 'Docker 容器故障',
                 'severity': 'high',
+                'description': "容器 {container_name} 連續 {fail_count} 次檢查失敗。",
                 'template': """<b>{severity} - {title}</b>
 
 {description}
@@ -76,8 +132,63 @@ class AlertManager:
             }
         }
         
+        # 模板只編譯一次，之後只讀
+        self.alert_types = MappingProxyType({
+            alert_type: MappingProxyType(config) for alert_type, config in self.alert_types.items()
+        })
+        self.compiled_templates = MappingProxyType({
+            alert_type: (CompiledTemplate(config['description']), CompiledTemplate(config['template']))
+            for alert_type, config in self.alert_types.items()
+        })
+        
+        # 相同參數的渲染結果緩存（LRU）
+        self._render_cache = OrderedDict()
+        
         # 通知頻道
         self.channels = ['telegram', 'email']
+        
+        # 合併窗口：(channel, severity) -> {'started': 開始時間, 'entries': {(type, severity, subject): 條目}}
+        self.coalesce_window = coalesce_window
+        self.pending = {}
+        
+        # 窗口結束時由定時器發送摘要；進程退出前發送未結束窗口內的警報
+        self.auto_flush = auto_flush
+        self._flush_timer = None
+        self._lock = threading.RLock()
+        if auto_flush:
+            _open_managers.add(self)
+    
+    def render(self, alert_type: str, **kwargs) -> tuple:
+        """渲染描述和完整消息（建議措施在渲染時附加，不修改模板）"""
+        try:
+            cache_key = (alert_type, tuple(sorted(kwargs.items())))
+            hash(cache_key)
+        except TypeError:
+            cache_key = None
+        
+        if cache_key is not None and cache_key in self._render_cache:
+            self._render_cache.move_to_end(cache_key)
+            return self._render_cache[cache_key]
+        
+        config = self.alert_types[alert_type]
+        description_template, message_template = self.compiled_templates[alert_type]
+        
+        description = description_template.render(kwargs)
+        message = message_template.render({
+            **kwargs,
+            'severity': config['severity'].upper(),
+            'title': config['title'],
+            'description': description
+        }) + self.get_recommendations(alert_type, **kwargs)
+        
+        rendered = (description, message)
+        
+        if cache_key is not None:
+            self._render_cache[cache_key] = rendered
+            if len(self._render_cache) > RENDER_CACHE_SIZE:
+                self._render_cache.popitem(last=False)
+        
+        return rendered
     
     def generate_alert(self, alert_type: str, **kwargs) -> dict:
         """生成警報"""
@@ -88,21 +199,7 @@ class AlertManager:
         # 生成警報內容
         title = template['title']
         severity = template['severity']
-        description = template['description'].format(**kwargs)
-        
-        # 生成建議措施
-        recommendations = self.get_recommendations(alert_type, **kwargs)
-        
-        # 添加建議措施
-        template['template'] += recommendations
-        
-        # 生成完整消息
-        message = template['template'].format(
-            severity=severity.upper(),
-            title=title,
-            description=description,
-            **kwargs
-        )
+        description, message = self.render(alert_type, **kwargs)
         
         alert = {
             'alert_id': f"alert_{int(datetime.now(HK_TZ).timestamp())}",
@@ -231,8 +328,137 @@ class AlertManager:
                 'timestamp': datetime.now(HK_TZ)
             }
     
+    @staticmethod
+    def alert_subject(alert: dict) -> str:
+        """警報對象（用於去重）"""
+        metadata = alert.get('metadata') or {}
+        for key in ('agent_id', 'component', 'container_name', 'location'):
+            if metadata.get(key):
+                return str(metadata[key])
+        return alert['title']
+    
+    def dispatch(self, alert: dict, channels: list = None) -> list:
+        """發送到指定頻道"""
+        results = []
+        
+        for channel in channels or self.channels:
+            if channel == 'telegram':
+                results.append(self.send_telegram_alert(alert))
+            elif channel == 'email':
+                results.append(self.send_email_alert(alert))
+        
+        return results
+    
+    def submit_alert(self, alert: dict, now: float = None) -> list:
+        """提交警報到合併窗口（嚴重警報立即發送），返回立即發送的結果"""
+        if alert['severity'] in CRITICAL_SEVERITIES:
+            return self.dispatch(alert)
+        
+        now = time.monotonic() if now is None else now
+        key = (alert['alert_type'], alert['severity'], self.alert_subject(alert))
+        
+        with self._lock:
+            for channel in self.channels:
+                bucket = self.pending.setdefault((channel, alert['severity']), {'started': now, 'entries': {}})
+                entry = bucket['entries'].get(key)
+                
+                if entry:
+                    # 重複警報只計數，保留最新內容
+                    entry['count'] += 1
+                    entry['alert'] = alert
+                else:
+                    bucket['entries'][key] = {'alert': alert, 'count': 1}
+            
+            self._schedule_flush(now)
+        
+        return []
+    
+    def _schedule_flush(self, now: float):
+        """在最早的窗口結束時觸發 flush（已有定時器時不重複設置）"""
+        if not self.auto_flush or self._flush_timer is not None or not self.pending:
+            return
+        
+        started = min(bucket['started'] for bucket in self.pending.values())
+        delay = max(0.0, self.coalesce_window - (now - started))
+        
+        self._flush_timer = threading.Timer(delay, self._timer_flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+    
+    def _timer_flush(self):
+        """定時器回調：發送到期的摘要，仍有未到期的窗口時重新設置定時器"""
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[ALERT] 發送警報摘要失敗：{e}")
+        with self._lock:
+            self._schedule_flush(time.monotonic())
+    
+    def close(self):
+        """停止定時器並發送所有未發送的警報"""
+        _open_managers.discard(self)
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        return self.flush(force=True)
+    
+    def submit(self, alert_type: str, now: float = None, **kwargs) -> dict:
+        """生成並提交警報到合併窗口"""
+        alert = self.generate_alert(alert_type, **kwargs)
+        if alert:
+            self.submit_alert(alert, now=now)
+        return alert
+    
+    def render_digest(self, severity: str, entries: list) -> dict:
+        """把一個窗口內的警報合併成一條摘要"""
+        if len(entries) == 1 and entries[0]['count'] == 1:
+            return entries[0]['alert']
+        
+        lines = []
+        for entry in entries:
+            alert = entry['alert']
+            repeat = f"（×{entry['count']}）" if entry['count'] > 1 else ""
+            lines.append(f"• {alert['title']}{repeat}：{alert['description']}")
+        
+        total = sum(entry['count'] for entry in entries)
+        
+        return {
+            'alert_id': f"digest_{severity}_{int(datetime.now(HK_TZ).timestamp())}",
+            'alert_type': 'digest',
+            'severity': severity,
+            'title': f"{len(entries)} 項警報摘要（共 {total} 次）",
+            'description': "\n".join(lines),
+            'timestamp': datetime.now(HK_TZ),
+            'metadata': {
+                'alerts': [entry['alert']['alert_id'] for entry in entries],
+                'count': total
+            }
+        }
+    
+    def flush(self, now: float = None, force: bool = False) -> list:
+        """發送窗口已結束的摘要（每個頻道、每個嚴重級別一條），返回發送結果"""
+        now = time.monotonic() if now is None else now
+        results = []
+        
+        with self._lock:
+            due = [
+                key for key, bucket in self.pending.items()
+                if force or now - bucket['started'] >= self.coalesce_window
+            ]
+            due.sort(key=lambda key: SEVERITY_ORDER.index(key[1]) if key[1] in SEVERITY_ORDER else len(SEVERITY_ORDER))
+            buckets = [(key, self.pending.pop(key)) for key in due]
+        
+        for (channel, severity), bucket in buckets:
+            digest = self.render_digest(severity, list(bucket['entries'].values()))
+            results.extend(self.dispatch(digest, channels=[channel]))
+        
+        return results
+    
     def send_alert(self, alert_type: str, **kwargs):
-        """發送警報"""
+        """發送警報（嚴重警報立即發送，其他警報經合併窗口以摘要發送）"""
         # 生成警報
         alert = self.generate_alert(alert_type, **kwargs)
         if not alert:
@@ -246,16 +472,13 @@ class AlertManager:
         print(f"描述：{alert['description']}")
         print()
         
-        # 發送警報
-        results = []
-        
-        if 'telegram' in self.channels:
-            telegram_result = self.send_telegram_alert(alert)
-            results.append(telegram_result)
+        # 提交警報
+        results = self.submit_alert(alert)
         
-        if 'email' in self.channels:
-            email_result = self.send_email_alert(alert)
-            results.append(email_result)
+        if not results:
+            print(f"警報已加入合併窗口（{self.coalesce_window:g} 秒後以摘要發送）")
+            print()
+            return alert
         
         # 顯示結果
         print("發送結果：")
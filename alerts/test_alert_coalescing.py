@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+測試警報合併窗口
+"""
+
+import gc
+import sys
+import time
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/alerts')
+
+import alert_manager
+from alert_manager import AlertManager
+
+
+class RecordingAlertManager(AlertManager):
+    """記錄發送而不真正發送"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+
+    def send_telegram_alert(self, alert):
+        self.sent.append(('telegram', alert))
+        return {'channel': 'telegram', 'status': 'sent'}
+
+    def send_email_alert(self, alert):
+        self.sent.append(('email', alert))
+        return {'channel': 'email', 'status': 'sent'}
+
+
+def weather_alert(alert_type, severity, location='HKO'):
+    """生成天氣警報"""
+    return {
+        'alert_id': f"{alert_type}_{location}",
+        'alert_type': alert_type,
+        'severity': severity,
+        'title': alert_type,
+        'description': f"{alert_type} at {location}",
+        'metadata': {'location': location}
+    }
+
+
+def test_storm_digest():
+    """測試同一窗口內的警報合併成每頻道一條摘要"""
+    manager = RecordingAlertManager(coalesce_window=60)
+
+    for cycle in range(5):
+        manager.submit_alert(weather_alert('heat_warning', 'high'), now=cycle)
+        manager.submit_alert(weather_alert('rainstorm_warning', 'high'), now=cycle)
+        manager.submit_alert(weather_alert('strong_wind_warning', 'high'), now=cycle)
+        manager.submit('agent_down', now=cycle, agent_name='Chat', agent_id='chat', fail_count=5 + cycle)
+
+    # 窗口未結束不發送
+    assert manager.flush(now=30) == []
+    assert manager.sent == []
+
+    manager.flush(now=60)
+
+    # 20 個警報 × 2 頻道 → 每頻道一條摘要
+    assert [channel for channel, _ in manager.sent] == ['telegram', 'email']
+    digest = manager.sent[0][1]
+    assert digest['alert_type'] == 'digest'
+    assert digest['metadata']['count'] == 20
+    assert len(digest['metadata']['alerts']) == 4
+    assert '（×5）' in digest['description']
+    assert manager.pending == {}
+    print("  ✅ 摘要合併正確")
+
+
+def test_critical_bypass():
+    """測試嚴重警報不經過窗口"""
+    manager = RecordingAlertManager(coalesce_window=60)
+
+    results = manager.submit_alert(weather_alert('rainstorm_warning', 'severe'), now=0)
+    assert len(results) == 2
+    assert [alert['alert_type'] for _, alert in manager.sent] == ['rainstorm_warning'] * 2
+
+    # database_down 模板為 severe
+    manager.submit('database_down', now=0, component='PostgreSQL', fail_count=3)
+    assert len(manager.sent) == 4
+    assert manager.pending == {}
+    print("  ✅ 嚴重警報直接發送")
+
+
+def test_grouping_by_severity_and_subject():
+    """測試按嚴重級別分組、按對象去重"""
+    manager = RecordingAlertManager(coalesce_window=10)
+    manager.channels = ['telegram']
+
+    manager.submit_alert(weather_alert('heat_warning', 'high', location='沙田'), now=0)
+    manager.submit_alert(weather_alert('heat_warning', 'high', location='屯門'), now=0)
+    manager.submit_alert(weather_alert('heat_warning', 'moderate', location='觀塘'), now=0)
+
+    manager.flush(force=True)
+
+    digests = [alert for _, alert in manager.sent]
+    assert [d['severity'] for d in digests] == ['high', 'moderate']
+    assert digests[0]['metadata']['count'] == 2
+    # 單個警報不包裝成摘要
+    assert digests[1]['alert_type'] == 'heat_warning'
+    print("  ✅ 分組和去重正確")
+
+
+def test_send_alert_flushed_by_timer():
+    """測試 send_alert 經過合併窗口，窗口結束時由定時器發送摘要"""
+    manager = RecordingAlertManager(coalesce_window=0.2)
+    manager.channels = ['telegram']
+
+    for agent_id in ('chat', 'coding', 'weather'):
+        manager.send_alert('agent_slow', agent_name=agent_id, agent_id=agent_id, response_time=4.0, threshold=3.0)
+    assert manager.sent == []
+
+    deadline = time.monotonic() + 5
+    while not manager.sent and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert len(manager.sent) == 1
+    assert manager.sent[0][1]['metadata']['count'] == 3
+    assert manager.pending == {} and manager._flush_timer is None
+
+    # 嚴重警報仍然立即發送
+    manager.send_alert('database_down', component='PostgreSQL', fail_count=3)
+    assert len(manager.sent) == 2
+    manager.close()
+    print("  ✅ 定時器發送摘要正確")
+
+
+def test_exit_flush_registered_once():
+    """測試退出時的發送只註冊一次，不延長已關閉或不再使用的實例壽命"""
+    manager = RecordingAlertManager(coalesce_window=60)
+    manager.channels = ['telegram']
+    manager.submit_alert(weather_alert('heat_warning', 'moderate'))
+
+    # 進程退出前發送未結束窗口內的警報
+    alert_manager._flush_open_managers()
+    assert len(manager.sent) == 1 and manager not in alert_manager._open_managers
+
+    before = len(alert_manager._open_managers)
+    for _ in range(5):
+        RecordingAlertManager()
+    gc.collect()
+    assert len(alert_manager._open_managers) == before
+    print("  ✅ 退出發送註冊正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("警報合併窗口測試")
+    print("=" * 60)
+    print()
+
+    test_storm_digest()
+    test_critical_bypass()
+    test_grouping_by_severity_and_subject()
+    test_send_alert_flushed_by_timer()
+    test_exit_flush_registered_once()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+測試警報模板不可變和渲染成本恆定
+"""
+
+import sys
+import time
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/alerts')
+
+from alert_manager import AlertManager
+
+ALERT_COUNT = 100_000
+SAMPLE = 10_000
+
+
+def test_templates_immutable():
+    """測試生成警報不會修改模板"""
+    manager = AlertManager()
+    template = manager.alert_types['agent_down']['template']
+
+    first = manager.generate_alert('agent_down', agent_name='Main', agent_id='main', fail_count=1)
+    second = manager.generate_alert('agent_down', agent_name='Main', agent_id='main', fail_count=2)
+
+    assert manager.alert_types['agent_down']['template'] == template
+    assert first['message'].count('建議措施') == 1
+    assert second['message'].count('1. 檢查 Agent 進程狀態') == 1
+
+    try:
+        manager.alert_types['agent_down']['template'] = ''
+        assert False, "模板應該不可修改"
+    except TypeError:
+        pass
+    print("  ✅ 模板不可變")
+
+
+def test_constant_cost_over_100k_alerts():
+    """測試 10 萬個警報的單個成本恆定（消息長度不增長，後段不比前段慢）"""
+    manager = AlertManager()
+    timings = []
+    lengths = set()
+
+    for i in range(ALERT_COUNT):
+        start = time.perf_counter()
+        # 每個警報參數不同，繞過渲染緩存
+        alert = manager.generate_alert('agent_slow', agent_name='Chat', agent_id='chat',
+                                       response_time=i, threshold=5.0)
+        timings.append(time.perf_counter() - start)
+        if i % SAMPLE == 0:
+            lengths.add(len(alert['message']) - len(str(i)) * 2)
+
+    first = sorted(timings[:SAMPLE])[SAMPLE // 2]
+    last = sorted(timings[-SAMPLE:])[SAMPLE // 2]
+
+    assert len(lengths) == 1
+    assert last < first * 2
+    print(f"  ✅ 單個警報成本恆定（中位數 {first * 1e6:.1f}µs → {last * 1e6:.1f}µs）")
+
+
+def test_render_cache():
+    """測試相同參數直接使用緩存"""
+    manager = AlertManager()
+    kwargs = {'component': 'PostgreSQL', 'fail_count': 3}
+
+    first = manager.render('database_down', **kwargs)
+    assert manager.render('database_down', **kwargs) is first
+    assert len(manager._render_cache) == 1
+
+    # 不可哈希的參數不緩存但仍可渲染
+    description, _ = manager.render('database_down', component=['PostgreSQL'], fail_count=3)
+    assert "['PostgreSQL']" in description
+    assert len(manager._render_cache) == 1
+    print("  ✅ 渲染緩存正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("警報模板測試")
+    print("=" * 60)
+    print()
+
+    test_templates_immutable()
+    test_constant_cost_over_100k_alerts()
+    test_render_cache()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+向量索引基準測試
+對比精確搜索和 int8 量化 + 精確重排：recall@k、查詢延遲和內存佔用；
+--hnsw 時測試 HNSW 圖的構建時間和不同 ef 下的 recall@k / 查詢延遲
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, Any
+
+import numpy as np
+
+from vector_index import VectorIndex, write_index
+from vector_quantizer import recall_at_k, memory_footprint
+from hnsw_index import HNSWIndex, DEFAULT_M, DEFAULT_EF_CONSTRUCTION
+
+
+def make_dataset(count: int, dim: int, queries: int, seed: int = 0):
+    """生成帶聚類結構的測試向量（比純隨機更接近真實嵌入）"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    query_vectors = vectors[rng.choice(count, queries, replace=False)] + 0.1 * rng.standard_normal((queries, dim)).astype(np.float32)
+    return vectors, query_vectors
+
+
+def run_benchmark(count: int = 100000, dim: int = 384, queries: int = 100, k: int = 10,
+                  rerank_factor: int = 10, root: Path = None) -> Dict[str, Any]:
+    """運行基準測試"""
+    vectors, query_vectors = make_dataset(count, dim, queries)
+    metadata = [{'id': i} for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(root or tmp_dir)
+        write_index(vectors, metadata, root=root, quantize=True)
+        index = VectorIndex.open(root)
+
+        def timed(search):
+            ids = []
+            start = time.perf_counter()
+            for q in query_vectors:
+                ids.append([i for i, _ in search(q)])
+            return ids, (time.perf_counter() - start) * 1000 / queries
+
+        exact_ids, exact_ms = timed(lambda q: index.search(q, k, exact=True))
+        approx_ids, approx_ms = timed(lambda q: index.search(q, k, rerank_factor=1))
+        rerank_ids, rerank_ms = timed(lambda q: index.search(q, k, rerank_factor=rerank_factor))
+        index.close()
+
+    return {
+        'count': count,
+        'dim': dim,
+        'k': k,
+        'rerank_factor': rerank_factor,
+        'recall_int8': recall_at_k(exact_ids, approx_ids, k),
+        'recall_rerank': recall_at_k(exact_ids, rerank_ids, k),
+        'exact_ms': exact_ms,
+        'int8_ms': approx_ms,
+        'rerank_ms': rerank_ms,
+        'memory': memory_footprint(count, dim)
+    }
+
+
+def run_hnsw_benchmark(count: int = 20000, dim: int = 384, queries: int = 100, k: int = 10,
+                       M: int = DEFAULT_M, ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+                       efs=(16, 32, 64, 128, 256)) -> Dict[str, Any]:
+    """HNSW 基準測試（以暴力搜索為基準計算 recall）"""
+    vectors, query_vectors = make_dataset(count, dim, queries)
+
+    start = time.perf_counter()
+    index = HNSWIndex(dim, M=M, ef_construction=ef_construction, capacity=count)
+    for v in vectors:
+        index.add(v)
+    build_s = time.perf_counter() - start
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    start = time.perf_counter()
+    exact_ids = [VectorIndex._top(normalized @ (q / np.linalg.norm(q)), k).tolist() for q in query_vectors]
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+
+    results = []
+    for ef in efs:
+        start = time.perf_counter()
+        ids = [[n for n, _ in index.search(q, k, ef=ef)] for q in query_vectors]
+        results.append({
+            'ef': ef,
+            'recall': recall_at_k(exact_ids, ids, k),
+            'ms': (time.perf_counter() - start) * 1000 / queries
+        })
+
+    return {
+        'count': count,
+        'dim': dim,
+        'k': k,
+        'M': M,
+        'ef_construction': ef_construction,
+        'build_s': build_s,
+        'exact_ms': exact_ms,
+        'results': results
+    }
+
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description='向量索引基準測試')
+    parser.add_argument('--count', type=int, default=100000, help='向量數量')
+    parser.add_argument('--dim', type=int, default=384, help='向量維度')
+    parser.add_argument('--queries', type=int, default=100, help='查詢數量')
+    parser.add_argument('--k', type=int, default=10, help='top-k')
+    parser.add_argument('--rerank-factor', type=int, default=10, help='精確重排候選倍數')
+    parser.add_argument('--hnsw', action='store_true', help='測試 HNSW 圖索引')
+    parser.add_argument('--M', type=int, default=DEFAULT_M, help='HNSW 每層鄰居數')
+    parser.add_argument('--ef-construction', type=int, default=DEFAULT_EF_CONSTRUCTION, help='HNSW 構建時的候選數')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("向量索引基準測試")
+    print("=" * 60)
+    print()
+    print(f"向量：{args.count} × {args.dim}，查詢：{args.queries}，k = {args.k}")
+    print()
+
+    if args.hnsw:
+        result = run_hnsw_benchmark(args.count, args.dim, args.queries, args.k, args.M, args.ef_construction)
+        print(f"  構建（M = {args.M}，ef_construction = {args.ef_construction}）："
+              f"{result['build_s']:.1f} 秒，{result['build_s'] * 1000 / args.count:.2f} ms/向量")
+        print(f"  暴力搜索：{result['exact_ms']:.2f} ms/查詢")
+        for row in result['results']:
+            print(f"  ef = {row['ef']:>4}：{row['ms']:.2f} ms/查詢，recall@{args.k} = {row['recall']:.3f}")
+        return 0 if max(row['recall'] for row in result['results']) >= 0.95 else 1
+
+    result = run_benchmark(args.count, args.dim, args.queries, args.k, args.rerank_factor)
+
+    print(f"  精確搜索（float32）：{result['exact_ms']:.2f} ms/查詢")
+    print(f"  int8 近似：          {result['int8_ms']:.2f} ms/查詢，recall@{args.k} = {result['recall_int8']:.3f}")
+    print(f"  int8 + 重排 ×{args.rerank_factor}：    {result['rerank_ms']:.2f} ms/查詢，recall@{args.k} = {result['recall_rerank']:.3f}")
+    print()
+
+    print("內存佔用：")
+    for name, size in result['memory'].items():
+        print(f"  {name}: {size / 1024 / 1024:.1f} MB")
+
+    return 0 if result['recall_rerank'] >= 0.95 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
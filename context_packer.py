@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+上下文打包
+把候選內容（系統提示、最近對話、檢索段落、記憶）按 token 預算打包：
+必選內容先放入，其餘按每 token 效用從高到低放入，近似重複的內容只保留一份，並報告丟棄了甚麼
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable
+
+from passage_chunker import count_tokens
+
+# 各對話狀態的上下文預算（token）
+CONTEXT_BUDGETS = {
+    'new_conversation': 1024,
+    'continuation': 2048,
+    'topic_change': 1024
+}
+DEFAULT_BUDGET = 1024
+
+# 各類內容的基礎效用和輸出順序
+KIND_UTILITY = {
+    'system': 1.0,
+    'summary': 0.9,
+    'turn': 1.0,
+    'passage': 0.8,
+    'memory': 0.6
+}
+KIND_ORDER = ('system', 'summary', 'memory', 'passage', 'turn')
+
+# 越早的對話效用越低（每往前一輪乘一次）
+TURN_DECAY = 0.85
+
+# 字符二元組 Jaccard 相似度超過此值視為近似重複
+DUPLICATE_THRESHOLD = 0.8
+
+_NORMALIZE_RE = re.compile(r'[\W_]+')
+
+
+@lru_cache(maxsize=8192)
+def cached_token_count(text: str) -> int:
+    """token 數（按文本緩存，系統提示等重複內容只計算一次）"""
+    return count_tokens(text)
+
+
+def budget_for_state(conversation_state: str) -> int:
+    """對話狀態對應的上下文預算"""
+    return CONTEXT_BUDGETS.get(conversation_state, DEFAULT_BUDGET)
+
+
+@lru_cache(maxsize=4096)
+def _shingles(text: str) -> frozenset:
+    normalized = _NORMALIZE_RE.sub('', text.lower())
+    if len(normalized) < 2:
+        return frozenset([normalized])
+    return frozenset(normalized[i:i + 2] for i in range(len(normalized) - 1))
+
+
+def similarity(a: str, b: str) -> float:
+    """兩段文本的字符二元組 Jaccard 相似度"""
+    sa, sb = _shingles(a), _shingles(b)
+    return len(sa & sb) / len(sa | sb) if sa or sb else 1.0
+
+
+def make_pieces(system_prompt: str = '', turns: Iterable[Dict[str, Any]] = (),
+                passages: Iterable[Dict[str, Any]] = (), memories: Iterable[Dict[str, Any]] = (),
+                summary: str = '') -> List[Dict[str, Any]]:
+    """
+    把各類候選內容轉成打包用的片段
+    turns 為按時間順序的 {'role', 'content'}，最後一輪（當前輸入）必選；
+    passages 為檢索結果（按 score 排序），memories 帶 importance（1-5）
+    """
+    pieces = []
+    if system_prompt:
+        pieces.append({'kind': 'system', 'text': system_prompt, 'required': True})
+    if summary:
+        pieces.append({'kind': 'summary', 'text': summary, 'utility': KIND_UTILITY['summary']})
+
+    memories = list(memories)
+    for i, memory in enumerate(memories):
+        pieces.append({
+            'kind': 'memory',
+            'id': memory.get('id'),
+            'text': f"{memory.get('title', '')}：{memory.get('content', '')}",
+            'utility': KIND_UTILITY['memory'] * (memory.get('importance') or 3) / 5
+        })
+
+    passages = list(passages)
+    for rank, passage in enumerate(passages):
+        pieces.append({
+            'kind': 'passage',
+            'id': passage.get('passage_id') or passage.get('id'),
+            'text': f"{passage.get('heading') or passage.get('title', '')}\n{passage.get('content', '')}",
+            'utility': KIND_UTILITY['passage'] / (1 + 0.2 * rank)
+        })
+
+    turns = list(turns)
+    for age, turn in enumerate(reversed(turns)):
+        pieces.append({
+            'kind': 'turn',
+            'id': len(turns) - 1 - age,
+            'text': f"{turn['role']}: {turn['content']}",
+            'required': age == 0,
+            'utility': KIND_UTILITY['turn'] * TURN_DECAY ** age
+        })
+
+    return pieces
+
+
+class ContextPacker:
+    """按 token 預算打包上下文"""
+
+    def __init__(self, budget: int = DEFAULT_BUDGET, token_counter=cached_token_count,
+                 duplicate_threshold: float = DUPLICATE_THRESHOLD):
+        self.budget = budget
+        self.token_counter = token_counter
+        self.duplicate_threshold = duplicate_threshold
+
+    def pack(self, pieces: List[Dict[str, Any]], budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        打包，返回：
+        pieces（保留的片段，按輸出順序）、tokens、budget、
+        dropped（丟棄的片段及原因：duplicate / budget）、tokens_by_kind
+        """
+        budget = self.budget if budget is None else budget
+        candidates = []
+        for position, piece in enumerate(pieces):
+            tokens = self.token_counter(piece['text'])
+            candidates.append({**piece, 'tokens': tokens, 'position': position,
+                               'density': piece.get('utility', 0.0) / max(tokens, 1)})
+
+        # 對話只能保留最近連續的若干輪：每輪的排序密度不高於更新的一輪
+        turns = sorted((p for p in candidates if p['kind'] == 'turn'), key=lambda p: p['id'], reverse=True)
+        for newer, older in zip(turns, turns[1:]):
+            older['density'] = min(older['density'], newer['density'])
+
+        # 必選在前，其餘按每 token 效用排序（同密度時較新的對話在前）
+        candidates.sort(key=lambda p: (not p.get('required'), -p['density'],
+                                       -p['id'] if p['kind'] == 'turn' else 0))
+
+        kept, dropped, used = [], [], 0
+        oldest_turn = None
+        for piece in candidates:
+            if piece['kind'] == 'turn' and oldest_turn is not None and piece['id'] < oldest_turn:
+                dropped.append(self._dropped(piece, 'budget'))
+                continue
+            duplicate = next((k for k in kept if piece['kind'] != 'turn' and k['kind'] != 'turn'
+                              and similarity(piece['text'], k['text']) >= self.duplicate_threshold), None)
+            if duplicate is not None and not piece.get('required'):
+                dropped.append(self._dropped(piece, 'duplicate', duplicate))
+                continue
+            if not piece.get('required') and used + piece['tokens'] > budget:
+                dropped.append(self._dropped(piece, 'budget'))
+                if piece['kind'] == 'turn':
+                    oldest_turn = piece['id']
+                continue
+            kept.append(piece)
+            used += piece['tokens']
+
+        kept.sort(key=lambda p: (KIND_ORDER.index(p['kind']) if p['kind'] in KIND_ORDER else len(KIND_ORDER),
+                                 p['id'] if p['kind'] == 'turn' else p['position']))
+
+        tokens_by_kind: Dict[str, int] = {}
+        for piece in kept:
+            tokens_by_kind[piece['kind']] = tokens_by_kind.get(piece['kind'], 0) + piece['tokens']
+
+        return {
+            'pieces': kept,
+            'tokens': used,
+            'budget': budget,
+            'over_budget': used > budget,
+            'dropped': dropped,
+            'tokens_by_kind': tokens_by_kind
+        }
+
+    @staticmethod
+    def _dropped(piece: Dict[str, Any], reason: str, duplicate_of: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        item = {'kind': piece['kind'], 'id': piece.get('id'), 'tokens': piece['tokens'], 'reason': reason}
+        if duplicate_of is not None:
+            item['duplicate_of'] = {'kind': duplicate_of['kind'], 'id': duplicate_of.get('id')}
+        return item
+
+    @staticmethod
+    def render(packed: Dict[str, Any]) -> str:
+        """拼接成提示文本"""
+        return '\n\n'.join(piece['text'] for piece in packed['pieces'])
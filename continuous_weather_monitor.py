@@ -9,6 +9,8 @@ import os
 import time
 from datetime import datetime, timezone, timedelta
 
+from weather_buffer import WeatherRingBuffer, DEFAULT_SNAPSHOT_FILE
+
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
@@ -16,10 +18,11 @@ HK_TZ = timezone(timedelta(hours=8))
 class MockDatabase:
     """模擬數據庫"""
     
-    def __init__(self):
+    def __init__(self, weather_buffer=None):
         self.alerts_history = []
         self.alerts_sent = 0
-        self.weather_data_history = []
+        # 固定容量的觀測緩衝區（取代無限增長的列表）
+        self.weather_buffer = weather_buffer or WeatherRingBuffer()
         
     def save_log(self, log_id, level, category, message, agent_id, context=None, metadata=None):
         """保存日誌"""
@@ -39,24 +42,22 @@ class MockDatabase:
     
     def save_weather_data(self, data_id, observation_time, temperature, humidity, rainfall, wind_speed, weather_condition, location='HKO', source='HKO', metadata=None):
         """保存天氣數據"""
-        weather_entry = {
-            'data_id': data_id,
-            'observation_time': observation_time.isoformat() if isinstance(observation_time, datetime) else observation_time,
-            'temperature': temperature,
-            'humidity': humidity,
-            'rainfall': rainfall,
-            'wind_speed': wind_speed,
-            'weather_condition': weather_condition,
-            'location': location,
-            'source': source,
-            'metadata': metadata
-        }
-        self.weather_data_history.append(weather_entry)
+        latest = self.weather_buffer.latest()
+        
+        # 監控器已寫入同一觀測時不重複寫入
+        if not latest or latest['observation_time'] != observation_time:
+            self.weather_buffer.append({
+                'observation_time': observation_time,
+                'temperature': temperature,
+                'humidity': humidity,
+                'rainfall': rainfall,
+                'wind_speed': wind_speed
+            })
         print(f"[DATA] 天氣數據已保存：{temperature}度, {rainfall}mm")
     
     def get_recent_weather(self, limit=24):
-        """獲取最近的天氣數據"""
-        return self.weather_data_history[-limit:]
+        """獲取最近的天氣數據（讀取環形緩衝區）"""
+        return self.weather_buffer.recent(limit)
 
 
 class HKOAPIClient:
@@ -189,12 +190,17 @@ class HKOAPIClient:
 class WeatherMonitor:
     """天氣監控器 - 持續監控"""
     
-    def __init__(self, db, api_client):
+    def __init__(self, db, api_client, weather_buffer=None, snapshot_file=DEFAULT_SNAPSHOT_FILE):
         self.db = db
         self.api = api_client
         self.last_alert_time = {}
         self.running = False
         
+        # 觀測緩衝區（與數據庫共用，警告規則直接讀取）
+        self.buffer = weather_buffer or getattr(db, 'weather_buffer', None) or WeatherRingBuffer()
+        self.snapshot_file = snapshot_file
+        self.current_observation = None
+        
         # 監控配置
         self.check_interval = 300  # 5 分鐘（秒）
         self.forecast_hours = 24
@@ -204,10 +210,22 @@ class WeatherMonitor:
         self.alerts_count = 0
         self.weather_updates = 0
     
+    def record_observation(self, weather: dict) -> None:
+        """記錄一次觀測到緩衝區，並保存快照（Weather Agent 讀取快照回答查詢）"""
+        self.current_observation = weather
+        self.buffer.append(weather)
+        self.buffer.snapshot(self.snapshot_file)
+    
+    def get_current_observation(self) -> dict:
+        """獲取最新觀測（讀取緩衝區，不重複請求 API）"""
+        if self.current_observation is None:
+            self.record_observation(self.api.fetch_current_weather())
+        return self.current_observation
+    
     def check_heat_warning(self) -> dict:
         """檢查酷熱警告"""
-        weather = self.api.fetch_current_weather()
-        temp = weather['temperature']
+        weather = self.get_current_observation()
+        temp = self.buffer.latest()['temperature']
         
         if temp >= 33:
             severity = 'high' if temp > 35 else 'moderate'
@@ -227,6 +245,7 @@ class WeatherMonitor:
                     'location': '香港天文台',
                     'metadata': {
                         'temperature': temp,
+                        'temperature_max': self.buffer.stats('temperature')['max'],
                         'condition': '酷熱'
                     }
                 }
@@ -261,8 +280,8 @@ class WeatherMonitor:
     
     def check_rainstorm_warning(self) -> dict:
         """檢查暴雨警告"""
-        weather = self.api.fetch_current_weather()
-        rainfall = weather['rainfall']
+        weather = self.get_current_observation()
+        rainfall = self.buffer.latest()['rainfall']
         
         if rainfall >= 30:
             severity = 'severe' if rainfall > 50 else 'high'
@@ -282,6 +301,7 @@ class WeatherMonitor:
                     'location': '香港天文台',
                     'metadata': {
                         'rainfall': rainfall,
+                        'rainfall_1h': self.buffer.rainfall_1h(),
                         'condition': '暴雨'
                     }
                 }
@@ -316,8 +336,8 @@ class WeatherMonitor:
     
     def check_strong_wind_warning(self) -> dict:
         """檢查強風警告"""
-        weather = self.api.fetch_current_weather()
-        wind_speed = weather['wind_speed']
+        weather = self.get_current_observation()
+        wind_speed = self.buffer.latest()['wind_speed']
         
         if wind_speed >= 40:
             severity = 'severe' if wind_speed > 60 else 'high'
@@ -336,6 +356,7 @@ class WeatherMonitor:
                     'location': '香港天文台',
                     'metadata': {
                         'wind_speed': wind_speed,
+                        'wind_speed_mean': self.buffer.stats('wind_speed')['mean'],
                         'condition': '強風'
                     }
                 }
@@ -422,6 +443,8 @@ class WeatherMonitor:
         print("=" * 60)
         print()
         
+        self.running = True
+        
         while self.running:
             try:
                 check_time = datetime.now(HK_TZ).strftime('%Y-%m-%d %H:%M:%S')
@@ -431,6 +454,7 @@ class WeatherMonitor:
                 # 1. 獲取當前天氣
                 print("  [1/3] 獲取當前天氣...")
                 weather = self.api.fetch_current_weather()
+                self.record_observation(weather)
                 
                 print(f"      溫度：{weather['temperature']}度")
                 print(f"      濕度：{weather['humidity']}%")
@@ -440,6 +464,10 @@ class WeatherMonitor:
                 print(f"      天氣：{weather['weather_condition']}")
                 print(f"      時間：{weather['observation_time'].strftime('%H:%M:%S')}")
                 
+                temp_stats = self.buffer.stats('temperature')
+                print(f"      滾動溫度：平均 {temp_stats['mean']}度（{temp_stats['min']} - {temp_stats['max']}）")
+                print(f"      一小時雨量：{self.buffer.rainfall_1h()}mm")
+                
                 self.weather_updates += 1
                 print()
                 
@@ -508,6 +536,10 @@ class WeatherMonitor:
                 print(f"[ERROR] 監控過程出錯：{e}")
                 time.sleep(60)
         
+        # 保存觀測快照，下次啟動時恢復
+        if self.buffer.snapshot(self.snapshot_file):
+            print(f"觀測快照已保存：{self.snapshot_file}")
+        
         print("監控系統已退出")
 
 
@@ -525,8 +557,11 @@ def main():
     print("=" * 60)
     print()
     
+    # 恢復上次的觀測快照
+    weather_buffer = WeatherRingBuffer.restore(DEFAULT_SNAPSHOT_FILE)
+    
     # 創建數據庫連接
-    db = MockDatabase()
+    db = MockDatabase(weather_buffer=weather_buffer)
     
     # 創建 API 客戶端
     api_client = HKOAPIClient()
@@ -4,33 +4,182 @@
 提供當日天氣、全球重點新聞、香港新聞、港股與美股整體走勢
 """
 
+import os
+import json
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+from news_feed import NewsStore, NEWS_FEEDS, format_news_items
+from report_artifacts import ReportArtifactStore, build_artifact
 
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+SECTION_CACHE_DIR = WORKSPACE / "reports" / "sections"
+
+# 所有欄目共享的截止時間（秒）
+REPORT_DEADLINE = 20
+
+# 每個新聞欄目的條數
+NEWS_ITEMS = 5
+
 
 class DailyReportGenerator:
     """每日簡報生成器"""
     
-    def __init__(self):
+    def __init__(self, deadline: float = REPORT_DEADLINE, cache_dir: Path = SECTION_CACHE_DIR,
+                 news_store: NewsStore = None, artifact_store: ReportArtifactStore = None):
+        self.deadline = deadline
+        self.cache_dir = Path(cache_dir)
+        self.report_metadata = {}
+        self._news_store = news_store
+        self.artifact_store = artifact_store or ReportArtifactStore()
+        
         self.api_keys = {
             'weather': '',  # 香港天文台 API Key（如果有）
             'news': '',    # 新聞 API Key（如果有）
             'stock': ''    # 股票 API Key（如果有）
         }
         
-        self.news_sources = {
-            'hong_kong': [
-                'https://news.google.com/rss/topics/hong%20kong',
-                'https://www.hongkongfp.com/rss'
-            ],
-            'global': [
-                'https://news.google.com/rss/topics/world',
-                'https://news.google.com/rss/topics/business'
-            ]
+        # 新聞來源由 news_feed.py 定時採集到本地新聞庫
+        self.news_sources = NEWS_FEEDS
+        
+        # 欄目：(名稱, 顯示名稱, 獲取函數)
+        self.sections = [
+            ('weather', '天氣', self.get_weather_report),
+            ('global_news', '全球新聞', self.get_global_news_report),
+            ('hong_kong_news', '香港新聞', self.get_hong_kong_news_report),
+            ('stock', '股市', self.get_stock_market_report)
+        ]
+    
+    def load_cached_section(self, name: str):
+        """讀取欄目上次成功的版本"""
+        cache_file = self.cache_dir / f"{name}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def save_cached_section(self, name: str, report: dict):
+        """保存欄目成功的版本（原子替換）"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self.cache_dir / f"{name}.json"
+            tmp_file = cache_file.with_suffix('.tmp')
+            
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({**report, 'cached_at': datetime.now(HK_TZ).isoformat()}, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"  ⚠️ 保存欄目緩存失敗：{e}")
+    
+    @staticmethod
+    def _timed(fetch):
+        """執行欄目獲取並計時"""
+        start = time.perf_counter()
+        report = fetch()
+        return report, time.perf_counter() - start
+    
+    def fetch_sections(self, deadline: float = None) -> dict:
+        """並發獲取所有欄目（共享截止時間，超時或失敗時使用上次緩存）"""
+        deadline = self.deadline if deadline is None else deadline
+        start = time.perf_counter()
+        
+        executor = ThreadPoolExecutor(max_workers=len(self.sections))
+        futures = {name: executor.submit(self._timed, fetch) for name, _, fetch in self.sections}
+        wait(futures.values(), timeout=deadline)
+        
+        # 不等待超時的欄目
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        reports = {}
+        timings = {}
+        
+        for name, label, _ in self.sections:
+            future = futures[name]
+            report = None
+            elapsed = None
+            
+            if future.done() and future.exception() is None:
+                report, elapsed = future.result()
+                if report.get('status') == 'success':
+                    self.save_cached_section(name, report)
+                    reports[name] = report
+                    timings[name] = {'status': 'success', 'source': 'live', 'elapsed': round(elapsed, 3)}
+                    continue
+            
+            # 超時或失敗：使用上次的版本
+            reason = 'timeout' if not future.done() else 'error'
+            cached = self.load_cached_section(name)
+            
+            # 緩存沒有內容時當作沒有緩存
+            if cached and cached.get('content'):
+                cached['status'] = 'cached'
+                cached['content'] = [f"（實時數據不可用，使用 {cached.get('cached_at', '')[:16]} 的版本）\n" + cached['content'][0]]
+                reports[name] = cached
+                source = 'cache'
+            else:
+                reports[name] = report or {
+                    'title': label,
+                    'date': datetime.now(HK_TZ).strftime('%Y-%m-%d'),
+                    'content': [f"獲取{label}超時"],
+                    'status': 'error'
+                }
+                source = 'none'
+            
+            timings[name] = {
+                'status': reason,
+                'source': source,
+                'elapsed': round(elapsed, 3) if elapsed is not None else None
+            }
+        
+        self.report_metadata = {
+            'generated_at': datetime.now(HK_TZ).isoformat(),
+            'deadline': deadline,
+            'wall_time': round(time.perf_counter() - start, 3),
+            'sections': timings
         }
+        
+        return reports
+    
+    @property
+    def news_store(self) -> NewsStore:
+        """本地新聞庫（首次使用時打開）"""
+        if self._news_store is None:
+            self._news_store = NewsStore()
+        return self._news_store
+    
+    def get_news_report(self, title: str, category: str, label: str) -> dict:
+        """從本地新聞庫生成新聞簡報（不訪問網絡）"""
+        report = {
+            'title': title,
+            'date': datetime.now(HK_TZ).strftime('%Y-%m-%d'),
+            'content': []
+        }
+        
+        try:
+            news_data = self.news_store.latest(category, NEWS_ITEMS)
+            
+            if not news_data:
+                report['content'].append(f"本地新聞庫暫無{label}（請先運行 news_feed.py）")
+                report['status'] = 'error'
+                return report
+            
+            content = f"**{label}**\n\n" + format_news_items(news_data)
+            
+            report['content'].append(content)
+            report['status'] = 'success'
+            return report
+            
+        except Exception as e:
+            report['content'].append(f"獲取{label}失敗：{str(e)}")
+            report['status'] = 'error'
+            return report
     
     def get_weather_report(self):
         """獲取天氣簡報"""
@@ -110,105 +259,11 @@ class DailyReportGenerator:
     
     def get_global_news_report(self):
         """獲取全球重點新聞簡報"""
-        report = {
-            'title': '🌍 全球重點新聞',
-            'date': datetime.now(HK_TZ).strftime('%Y-%m-%d'),
-            'content': []
-        }
-        
-        try:
-            # 模擬全球新聞數據（實際上應該調用新聞 API）
-            news_data = [
-                {
-                    'title': 'AI 技術突破',
-                    'summary': '研究人員開發出新一代 AI 芯片，運算效率提升 50%',
-                    'source': 'TechNews',
-                    'time': '10:30'
-                },
-                {
-                    'title': '全球氣候變化',
-                    'summary': '聯合國發布最新氣候變化報告，強調減少碳排放的重要性',
-                    'source': 'UN News',
-                    'time': '09:15'
-                },
-                {
-                    'title': '科技股大漲',
-                    'summary': '由於 AI 技術突破，全球科技股大漲，市場情緒樂觀',
-                    'source': 'Financial Times',
-                    'time': '11:45'
-                }
-            ]
-            
-            # 生成全球新聞簡報
-            content = "**全球重點新聞**\n\n"
-            
-            for i, news in enumerate(news_data, 1):
-                content += f"{i}. {news['title']}\n"
-                content += f"   {news['summary']}\n"
-                content += f"   來源：{news['source']} | 時間：{news['time']}\n\n"
-            
-            report['content'].append(content)
-            report['status'] = 'success'
-            return report
-            
-        except Exception as e:
-            return {
-                'title': '🌍 全球重點新聞',
-                'date': datetime.now(HK_TZ).strftime('%Y-%m-%d'),
-                'content': [f"獲取全球新聞失敗：{str(e)}"],
-                'status': 'error'
-            }
+        return self.get_news_report('🌍 全球重點新聞', 'global', '全球新聞')
     
     def get_hong_kong_news_report(self):
         """獲取香港新聞簡報"""
-        report = {
-            'title': '🇭🇰 香港新聞',
-            'date': datetime.now(HK_TZ).strftime('%Y-%m-%d'),
-            'content': []
-        }
-        
-        try:
-            # 模擬香港新聞數據（實際上應該調用新聞 API）
-            news_data = [
-                {
-                    'title': '香港房價持續上漲',
-                    'summary': '香港最新房價指數顯示，住宅和商業物業價格持續上漲',
-                    'source': 'Hong Kong Economic Journal',
-                    'time': '10:00'
-                },
-                {
-                    'title': '香港政府推出新政策',
-                    'summary': '香港政府宣布推出新的刺激經濟政策，重點支持創科產業',
-                    'source': 'Hong Kong Government',
-                    'time': '14:30'
-                },
-                {
-                    'title': '香港醫療系統升級',
-                    'summary': '香港醫管局宣布醫療系統將進行大規模升級，提升服務效率',
-                    'source': 'Hong Kong Hospital Authority',
-                    'time': '16:00'
-                }
-            ]
-            
-            # 生成香港新聞簡報
-            content = "**香港新聞**\n\n"
-            
-            for i, news in enumerate(news_data, 1):
-                content += f"{i}. {news['title']}\n"
-                content += f"   {news['summary']}\n"
-                content += f"   來源：{news['source']} | 時間：{news['time']}\n\n"
-            
-            report['content'].append(content)
-            report['status'] = 'success'
-            return report
-            
-        except Exception as e:
-            return {
-                'title': '🇭🇰 香港新聞',
-                'date': datetime.now(HK_TZ).strftime('%Y-%m-%d'),
-                'content': [f"獲取香港新聞失敗：{str(e)}"],
-                'status': 'error'
-            }
+        return self.get_news_report('🇭🇰 香港新聞', 'hong_kong', '香港新聞')
     
     def get_stock_market_report(self):
         """獲取港股與美股整體走勢簡報"""
@@ -264,6 +319,40 @@ class DailyReportGenerator:
                 'status': 'error'
             }
     
+    def precompute(self, force: bool = False) -> dict:
+        """預計算：獲取欄目並渲染所有版本（只重新渲染內容變化的欄目）"""
+        date = datetime.now(HK_TZ).strftime('%Y-%m-%d')
+        reports = self.fetch_sections()
+        previous = self.artifact_store.latest(date)
+        
+        summary = []
+        for name, label, _ in self.sections:
+            elapsed = self.report_metadata['sections'][name]['elapsed']
+            timing = f"（{elapsed}s）" if elapsed is not None else "（超時）"
+            summary.append(f"- {label}：{reports[name]['status']}{timing}")
+        
+        artifact = build_artifact(
+            date,
+            [(name, label, reports[name]) for name, label, _ in self.sections],
+            summary,
+            metadata=self.report_metadata,
+            previous=None if force else previous
+        )
+        
+        # 所有欄目都沒變，繼續使用當前版本
+        if previous and not force and not artifact['rendered']:
+            return {**previous, 'rendered': []}
+        
+        self.artifact_store.save(artifact)
+        return artifact
+    
+    def serve(self, variant: str = 'markdown') -> str:
+        """讀取今日簡報（沒有預計算產物時才生成）"""
+        artifact = self.artifact_store.latest(datetime.now(HK_TZ).strftime('%Y-%m-%d'))
+        if artifact is None:
+            artifact = self.precompute()
+        return artifact['variants'][variant]
+    
     def generate_daily_report(self):
         """生成每日簡報"""
         print("=" * 60)
@@ -273,101 +362,33 @@ class DailyReportGenerator:
         print(f"簡報日期：{datetime.now(HK_TZ).strftime('%Y-%m-%d %H:%M:%S')}")
         print()
         
-        # 獲取所有報告
-        reports = []
-        
-        # 1. 天氣簡報
-        print("[1/5] 獲取天氣簡報...")
-        weather_report = self.get_weather_report()
-        reports.append(weather_report)
+        # 1. 並發獲取所有欄目並預渲染
+        print(f"[1/2] 並發獲取 {len(self.sections)} 個欄目（截止 {self.deadline} 秒）...")
+        artifact = self.precompute()
         
-        if weather_report['status'] == 'success':
-            print(f"  天氣簡報：✅ 成功")
-        else:
-            print(f"  天氣簡報：⚠️ 失敗 - {weather_report['content'][0]}")
-        
-        print()
-        
-        # 2. 全球新聞簡報
-        print("[2/5] 獲取全球重點新聞...")
-        global_news_report = self.get_global_news_report()
-        reports.append(global_news_report)
-        
-        if global_news_report['status'] == 'success':
-            print(f"  全球新聞：✅ 成功")
-        else:
-            print(f"  全球新聞：⚠️ 失敗 - {global_news_report['content'][0]}")
-        
-        print()
-        
-        # 3. 香港新聞簡報
-        print("[3/5] 獲取香港新聞...")
-        hk_news_report = self.get_hong_kong_news_report()
-        reports.append(hk_news_report)
-        
-        if hk_news_report['status'] == 'success':
-            print(f"  香港新聞：✅ 成功")
-        else:
-            print(f"  香港新聞：⚠️ 失敗 - {hk_news_report['content'][0]}")
+        for name, label, _ in self.sections:
+            timing = self.report_metadata['sections'][name]
+            elapsed = f"{timing['elapsed']}s" if timing['elapsed'] is not None else "超時"
+            
+            if timing['status'] == 'success':
+                print(f"  {label}：✅ 成功（{elapsed}）")
+            elif timing['source'] == 'cache':
+                print(f"  {label}：⚠️ {timing['status']}，使用緩存（{elapsed}）")
+            else:
+                print(f"  {label}：⚠️ 失敗")
         
+        print(f"  總耗時：{self.report_metadata['wall_time']}s")
         print()
         
-        # 4. 股市簡報
-        print("[4/5] 獲取股市走勢...")
-        stock_report = self.get_stock_market_report()
-        reports.append(stock_report)
-        
-        if stock_report['status'] == 'success':
-            print(f"  股市走勢：✅ 成功")
+        # 2. 保存簡報產物
+        print("[2/2] 保存簡報產物...")
+        if artifact['rendered']:
+            print(f"  版本 {artifact['version']}：重新渲染 {', '.join(artifact['rendered'])}")
         else:
-            print(f"  股市走勢：⚠️ 失敗 - {stock_report['content'][0]}")
-        
+            print(f"  版本 {artifact['version']}：內容沒有變化")
         print()
         
-        # 5. 生成完整簡報
-        print("[5/5] 生成完整簡報...")
-        
-        daily_report = f"""# 每日簡報
-**日期：{datetime.now(HK_TZ).strftime('%Y-%m-%d')}**
-**時間：{datetime.now(HK_TZ).strftime('%H:%M:%S')}**
-
----
-
-{weather_report['title']}
-{weather_report['content'][0]}
-
----
-
-{global_news_report['title']}
-{global_news_report['content'][0]}
-
----
-
-{hk_news_report['title']}
-{hk_news_report['content'][0]}
-
----
-
-{stock_report['title']}
-{stock_report['content'][0]}
-
----
-
-**簡報摘要**
-- 天氣：{weather_report['status']}
-- 全球新聞：{global_news_report['status']}
-- 香港新聞：{hk_news_report['status']}
-- 股市：{stock_report['status']}
-
-**生成時間：{datetime.now(HK_TZ).strftime('%H:%M:%S')}**
-
----
-
-**系統助手 - 技術支援系統**
-"""
-        
-        print("  簡報生成成功")
-        print()
+        daily_report = artifact['variants']['markdown']
         
         print("=" * 60)
         print("每日簡報生成完成")
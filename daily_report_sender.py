@@ -4,9 +4,12 @@
 """
 
 import os
-import requests
+import sys
 from datetime import datetime, timezone, timedelta
 
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/notifications')
+from telegram_queue import TelegramQueue, drain
+
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
@@ -20,9 +23,12 @@ class DailyReportSender:
         self.email_sender = os.environ.get('EMAIL_SENDER', '')
         self.email_receiver = os.environ.get('EMAIL_RECEIVER', '')
         self.email_password = os.environ.get('EMAIL_PASSWORD', '')
+        
+        # Telegram 發送隊列（持久化，限速，自動重試）
+        self.telegram_queue = TelegramQueue()
     
     def send_telegram_report(self, report: str) -> bool:
-        """發送 Telegram 簽報"""
+        """發送 Telegram 簽報（report 為預渲染的 Telegram-HTML 版本）"""
         try:
             if not self.telegram_bot_token or not self.telegram_chat_id:
                 print("[Telegram] Bot Token 或 Chat ID 未設置")
@@ -40,22 +46,24 @@ class DailyReportSender:
 <b>系統助手 - 技術支援系統</b>
 """
             
-            # 發送
-            url = f"https://api.telegram.org/bot{self.telegram_bot_token}/sendMessage"
-            data = {
-                'chat_id': self.telegram_chat_id,
-                'text': message,
-                'parse_mode': 'HTML',
-                'disable_web_page_preview': True
-            }
+            # 加入發送隊列（同一天的簡報只發一次），然後立即發送
+            key, _ = self.telegram_queue.enqueue(
+                self.telegram_chat_id,
+                message,
+                idempotency_key=f"daily_report_{datetime.now(HK_TZ).strftime('%Y-%m-%d')}"
+            )
             
-            response = requests.post(url, json=data, timeout=10)
+            drain(self.telegram_bot_token, self.telegram_queue)
             
-            if response.status_code == 200:
-                print(f"[Telegram] 每日簡報已發送")
+            message_state = self.telegram_queue.get(key)
+            if message_state['status'] == 'sent':
+                print("[Telegram] 每日簡報已發送")
                 return True
+            elif message_state['status'] == 'failed':
+                print(f"[Telegram] 發送失敗：{message_state['last_error']}")
+                return False
             else:
-                print(f"[Telegram] 發送失敗：{response.status_code}")
+                print("[Telegram] 發送未完成，已留在隊列中，由 telegram_queue.py --drain（cron 每分鐘）重試")
                 return False
         
         except Exception as e:
@@ -92,8 +100,8 @@ class DailyReportSender:
             print(f"[Email] 錯誤：{e}")
             return False
     
-    def send_daily_report(self, report: str):
-        """發送每日簡報（所有渠道）"""
+    def send_daily_report(self, report: str, telegram_report: str = None):
+        """發送每日簡報（所有渠道，telegram_report 為 Telegram-HTML 版本）"""
         print("=" * 60)
         print("發送每日簡報")
         print("=" * 60)
@@ -105,7 +113,7 @@ class DailyReportSender:
         
         # 1. 發送 Telegram 簽報
         print("[1/2] 發送 Telegram 簽報...")
-        telegram_result = self.send_telegram_report(report)
+        telegram_result = self.send_telegram_report(telegram_report or report)
         results.append(telegram_result)
         
         if telegram_result:
@@ -165,14 +173,15 @@ def main():
     # 創建簡報發送器
     sender = DailyReportSender()
     
-    # 生成每日簡報
+    # 讀取預渲染的每日簡報（沒有產物時才生成）
     from daily_report_generator import DailyReportGenerator
     
     generator = DailyReportGenerator()
-    daily_report = generator.generate_daily_report()
+    daily_report = generator.serve('markdown')
+    telegram_report = generator.serve('telegram')
     
     # 發送簡報
-    sender.send_daily_report(daily_report)
+    sender.send_daily_report(daily_report, telegram_report=telegram_report)
 
 
 if __name__ == "__main__":
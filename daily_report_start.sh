@@ -3,8 +3,9 @@
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] 每日簡報啟動中..." >> /home/jarvis/.openclaw/workspace/logs/daily_report.log
 
-# 運行每日簡報生成腳本
+# 預計算每日簡報產物，然後發送（發送只讀產物）
 cd /home/jarvis/.openclaw/workspace
 python3 daily_report_generator.py >> /home/jarvis/.openclaw/workspace/logs/daily_report.log 2>&1
+python3 daily_report_sender.py >> /home/jarvis/.openclaw/workspace/logs/daily_report.log 2>&1
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] 每日簡報完成" >> /home/jarvis/.openclaw/workspace/logs/daily_report.log
@@ -13,13 +13,13 @@ from datetime import datetime, timezone
 try:
     import psycopg2
     from psycopg2 import sql
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
 except ImportError:
     print("⚠️  psycopg2 未安裝，正在安裝...")
     os.system("pip3 install psycopg2-binary --user")
     import psycopg2
     from psycopg2 import sql
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
 
 
 class PostgreSQLConnector:
@@ -82,6 +82,21 @@ class PostgreSQLConnector:
             self.connection.rollback()
             return False
 
+    def execute_values(self, query: str, rows: List[tuple], template: str = None,
+                       page_size: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        """批量執行（VALUES %s 展開為單一語句，單一事務），返回 RETURNING 結果"""
+        try:
+            results = execute_values(
+                self.cursor, query, rows,
+                template=template, page_size=page_size, fetch=True
+            )
+            self.connection.commit()
+            return results
+        except Exception as e:
+            print(f"❌ 執行批量更新失敗: {e}")
+            self.connection.rollback()
+            return None
+
     def __enter__(self):
         """上下文管理器入口"""
         self.connect()
@@ -95,9 +110,12 @@ class PostgreSQLConnector:
 class AgentDatabase:
     """Agent 數據庫操作類"""
 
-    def __init__(self):
+    def __init__(self, summarize_conversations: bool = True):
         self.db = PostgreSQLConnector()
 
+        # 保存消息後在後台更新對話的滾動摘要（見 conversation_summarizer）
+        self.summarize_conversations = summarize_conversations
+
     def get_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """獲取 Agent 信息"""
         with self.db:
@@ -158,18 +176,30 @@ class AgentDatabase:
     def save_message(self, message_id: str, conversation_id: str,
                    role: str, content: str, agent_id: str = None,
                    token_count: int = 0, metadata: Dict[str, Any] = None) -> bool:
-        """保存消息"""
+        """保存消息（保存後在後台更新對話的滾動摘要）"""
         with self.db:
             query = """
                 INSERT INTO messages (message_id, conversation_id, role, content, agent_id, token_count, metadata)
                 VALUES (%s, %s, %s, %s, %s, %s, %s::jsonb)
                 ON CONFLICT (message_id) DO NOTHING
             """
-            return self.db.execute_update(query, (
+            saved = self.db.execute_update(query, (
                 message_id, conversation_id, role, content, 
                 agent_id, token_count, json.dumps(metadata or {})
             ))
 
+        if saved and self.summarize_conversations:
+            self.schedule_summary(conversation_id)
+        return saved
+
+    def schedule_summary(self, conversation_id: str) -> None:
+        """安排後台摘要更新（不阻塞；窗口外未累積足夠消息時後台直接跳過）"""
+        try:
+            from conversation_summarizer import shared_summarizer
+            shared_summarizer().maybe_update(conversation_id)
+        except Exception as e:
+            print(f"⚠️  安排對話摘要更新失敗: {e}")
+
     def get_conversation_messages(self, conversation_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """獲取對話消息"""
         with self.db:
@@ -181,6 +211,47 @@ class AgentDatabase:
             """
             return self.db.execute_query(query, (conversation_id, limit))
 
+    # ==================== CONTEXT SUMMARY ====================
+
+    def get_summary_state(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """獲取對話的滾動摘要、版本、已折疊的消息數和消息總數"""
+        with self.db:
+            query = """
+                SELECT c.context_summary, c.context_summary_version, c.context_summary_messages,
+                       (SELECT COUNT(*) FROM messages m WHERE m.conversation_id = c.conversation_id) AS message_count
+                FROM conversations c
+                WHERE c.conversation_id = %s
+            """
+            results = self.db.execute_query(query, (conversation_id,))
+            return results[0] if results else None
+
+    def get_messages_range(self, conversation_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """按時間順序獲取第 offset 條起的 limit 條消息"""
+        with self.db:
+            query = """
+                SELECT role, content, created_at FROM messages
+                WHERE conversation_id = %s
+                ORDER BY created_at, id
+                OFFSET %s LIMIT %s
+            """
+            return self.db.execute_query(query, (conversation_id, offset, limit))
+
+    def update_context_summary(self, conversation_id: str, summary: str,
+                               expected_version: int, summarized_messages: int) -> bool:
+        """更新滾動摘要（版本號不符時不寫入，返回 False）"""
+        with self.db:
+            query = """
+                UPDATE conversations
+                SET context_summary = %s,
+                    context_summary_version = context_summary_version + 1,
+                    context_summary_messages = %s,
+                    updated_at = NOW()
+                WHERE conversation_id = %s AND context_summary_version = %s
+            """
+            if not self.db.execute_update(query, (summary, summarized_messages, conversation_id, expected_version)):
+                return False
+            return self.db.cursor.rowcount == 1
+
     # ==================== KNOWLEDGE BASE ====================
 
     def save_knowledge(self, entry_id: str, category: str, title: str,
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+天氣數據批量寫入基準測試
+比較逐行寫入和批量寫入（execute_values）的耗時
+"""
+
+import sys
+import time
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+
+from agent_db_connector import PostgreSQLConnector
+from weather_db_operations import WeatherDatabase
+from datetime import datetime, timezone, timedelta
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+ROW_COUNTS = [10, 100, 1000]
+
+
+def make_rows(prefix, count):
+    """生成測試觀測數據"""
+    start = datetime.now(HK_TZ).replace(second=0, microsecond=0)
+    return [
+        {
+            'data_id': f"bench_{prefix}_{i}",
+            'observation_time': start - timedelta(minutes=i),
+            'temperature': 25.0 + (i % 10) * 0.5,
+            'humidity': 70 + i % 20,
+            'rainfall': float(i % 5),
+            'wind_speed': 10.0 + i % 15,
+            'wind_direction': 'ESE',
+            'weather_condition': '多雲',
+            'metadata': {'benchmark': True}
+        }
+        for i in range(count)
+    ]
+
+
+def cleanup(db):
+    """刪除基準測試數據"""
+    with db:
+        db.execute_update("DELETE FROM weather_data WHERE data_id LIKE %s", ('bench_%',))
+
+
+def bench_per_row(weather_db, rows):
+    """逐行寫入"""
+    start = time.perf_counter()
+    for row in rows:
+        weather_db.save_weather_data(**row)
+    return time.perf_counter() - start
+
+
+def bench_bulk(weather_db, rows):
+    """批量寫入"""
+    start = time.perf_counter()
+    statuses = weather_db.save_weather_data_bulk(rows)
+    elapsed = time.perf_counter() - start
+
+    errors = [s for s in statuses if s['status'] == 'error']
+    if errors:
+        print(f"  ⚠️  批量寫入有 {len(errors)} 行失敗")
+    return elapsed
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("天氣數據批量寫入基準測試")
+    print("=" * 60)
+    print()
+
+    db = PostgreSQLConnector()
+    weather_db = WeatherDatabase(db)
+
+    cleanup(db)
+
+    try:
+        for count in ROW_COUNTS:
+            per_row = bench_per_row(weather_db, make_rows(f"row{count}", count))
+            bulk = bench_bulk(weather_db, make_rows(f"bulk{count}", count))
+
+            print(f"[{count} 行]")
+            print(f"  逐行寫入: {per_row * 1000:.1f} ms ({count / per_row:.0f} 行/秒)")
+            print(f"  批量寫入: {bulk * 1000:.1f} ms ({count / bulk:.0f} 行/秒)")
+            print(f"  加速: {per_row / bulk:.1f}x")
+            print()
+    finally:
+        cleanup(db)
+
+    print("基準測試完成")
+
+
+if __name__ == "__main__":
+    main()
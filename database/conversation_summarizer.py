@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+對話滾動摘要
+實時窗口以外的舊消息在後台折疊進 conversations.context_summary（每新增 N 條更新一次），
+用版本號做樂觀鎖，多個 Agent 同時更新時只有一個生效；長對話的提示大小保持固定
+"""
+
+import sys
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import requests
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+sys.path.insert(0, str(WORKSPACE))
+sys.path.insert(0, str(WORKSPACE / "heartbeat"))
+
+from passage_chunker import count_tokens
+from circuit_breaker import circuit_breaker, CircuitOpenError
+
+OLLAMA_URL = "http://localhost:11434"
+SUMMARY_MODEL = "qwen2.5:1.5b"
+REQUEST_TIMEOUT = 60
+
+# 最近 LIVE_WINDOW 條消息原樣發給模型，更早的折疊進摘要
+LIVE_WINDOW = 8
+# 窗口外累積 SUMMARY_EVERY 條消息時更新一次摘要
+SUMMARY_EVERY = 6
+# 摘要的 token 上限
+SUMMARY_MAX_TOKENS = 300
+
+# 共用連接池（沒有傳入 session 時使用）
+_session = requests.Session()
+
+SUMMARY_PROMPT = """你負責維護一段對話的滾動摘要。
+把「新消息」中的重要事實、用戶偏好、未完成的事項併入「現有摘要」，刪去寒暄和重複內容。
+只輸出更新後的摘要（繁體中文，不超過 {max_tokens} 字）。
+
+現有摘要：
+{summary}
+
+新消息：
+{messages}
+"""
+
+
+def format_messages(messages: List[Dict[str, Any]]) -> str:
+    """消息轉為 role: content 行"""
+    return '\n'.join(f"{m['role']}: {m['content']}" for m in messages)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """保留末尾不超過 max_tokens 的行（較新的內容優先）"""
+    lines, total = [], 0
+    for line in reversed(text.splitlines()):
+        tokens = count_tokens(line)
+        if total + tokens > max_tokens:
+            break
+        lines.insert(0, line)
+        total += tokens
+    return '\n'.join(lines)
+
+
+def extractive_summary(summary: str, messages: List[Dict[str, Any]], max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """不調用模型的後備摘要：每條消息取開頭，整體截到 token 上限"""
+    lines = [summary] if summary else []
+    lines += [f"{m['role']}: {m['content'][:60]}" for m in messages]
+    return truncate_tokens('\n'.join(lines), max_tokens)
+
+
+@circuit_breaker('ollama', fail_threshold=3, reset_timeout=60)
+def _post_summary(session, payload: Dict[str, Any]):
+    """調用 Ollama（經過熔斷器，Ollama 不可用時快速失敗）"""
+    response = session.post(f"{OLLAMA_URL}/api/generate", json=payload, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def ollama_summary(summary: str, messages: List[Dict[str, Any]], max_tokens: int = SUMMARY_MAX_TOKENS,
+                   session: Optional[requests.Session] = None) -> str:
+    """用本地模型更新摘要（失敗時用後備摘要）"""
+    prompt = SUMMARY_PROMPT.format(max_tokens=max_tokens, summary=summary or '（無）',
+                                   messages=format_messages(messages))
+    try:
+        response = _post_summary(session or _session, {
+            'model': SUMMARY_MODEL,
+            'prompt': prompt,
+            'stream': False,
+            'options': {'temperature': 0.2, 'num_predict': max_tokens * 2}
+        })
+        text = response.json().get('response', '').strip()
+    except (requests.RequestException, ValueError, CircuitOpenError) as e:
+        print(f"⚠️  摘要模型調用失敗，使用後備摘要: {e}")
+        return extractive_summary(summary, messages, max_tokens)
+
+    return truncate_tokens(text, max_tokens) if text else extractive_summary(summary, messages, max_tokens)
+
+
+class ConversationSummarizer:
+    """後台維護對話滾動摘要"""
+
+    def __init__(self, db=None, summarize: Callable[[str, List[Dict[str, Any]]], str] = None,
+                 live_window: int = LIVE_WINDOW, every: int = SUMMARY_EVERY):
+        """
+        db 需提供 get_summary_state / get_messages_range / update_context_summary（見 AgentDatabase），
+        只在後台線程中使用
+        """
+        if db is None:
+            from agent_db_connector import AgentDatabase
+            db = AgentDatabase()
+
+        self.db = db
+        self.summarize = summarize or ollama_summary
+        self.live_window = live_window
+        self.every = every
+
+        # 單個後台線程執行：同一個 db 連接不跨線程使用；
+        # 守護線程，進程退出時不等待排隊中的更新（下次保存消息時會重新檢查）
+        self._queue = queue.Queue()
+        self._worker = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def due(self, state: Dict[str, Any]) -> int:
+        """可以折疊的消息數（未達 every 時返回 0）"""
+        foldable = state['message_count'] - state['context_summary_messages'] - self.live_window
+        return foldable if foldable >= self.every else 0
+
+    def maybe_update(self, conversation_id: str) -> Optional[Future]:
+        """
+        保存消息後調用（不阻塞）：在後台檢查並更新摘要
+        同一對話已有排隊中的更新時直接返回
+        """
+        future = Future()
+        with self._lock:
+            if conversation_id in self._pending:
+                return None
+            self._pending.add(conversation_id)
+
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name='summarizer', daemon=True)
+                self._worker.start()
+            self._queue.put((conversation_id, future))
+
+        return future
+
+    def _work(self):
+        """後台線程：按順序執行排隊中的更新，收到 None 時退出"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            conversation_id, future = item
+            if future.set_running_or_notify_cancel():
+                future.set_result(self._run(conversation_id))
+
+    def _run(self, conversation_id: str) -> bool:
+        with self._lock:
+            self._pending.discard(conversation_id)
+        try:
+            return self.update(conversation_id)
+        except Exception as e:
+            print(f"❌ 更新對話摘要失敗 {conversation_id}: {e}")
+            return False
+
+    def update(self, conversation_id: str, force: bool = False) -> bool:
+        """
+        把窗口外的新消息折疊進摘要
+        返回是否寫入（版本已被其他 Agent 更新時放棄，避免覆蓋）
+        """
+        state = self.db.get_summary_state(conversation_id)
+        if state is None:
+            return False
+
+        count = self.due(state)
+        if force:
+            count = max(0, state['message_count'] - state['context_summary_messages'] - self.live_window)
+        if not count:
+            return False
+
+        messages = self.db.get_messages_range(conversation_id, state['context_summary_messages'], count)
+        if not messages:
+            return False
+
+        summary = self.summarize(state['context_summary'] or '', messages)
+        return self.db.update_context_summary(
+            conversation_id, summary,
+            expected_version=state['context_summary_version'],
+            summarized_messages=state['context_summary_messages'] + len(messages)
+        )
+
+    def context(self, conversation_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """提示用的上下文：(摘要, 摘要之後的消息)"""
+        state = self.db.get_summary_state(conversation_id)
+        if state is None:
+            return '', []
+
+        folded = state['context_summary_messages']
+        return state['context_summary'] or '', self.db.get_messages_range(
+            conversation_id, folded, state['message_count'] - folded)
+
+    def close(self, wait: bool = True):
+        """停止後台線程（wait 時先完成排隊中的更新）"""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        self._queue.put(None)
+        if wait:
+            worker.join()
+
+
+_shared_summarizer: Optional[ConversationSummarizer] = None
+_shared_lock = threading.Lock()
+
+
+def shared_summarizer(factory: Callable[[], ConversationSummarizer] = None) -> ConversationSummarizer:
+    """進程內共用的摘要器（AgentDatabase.save_message 使用；有自己的數據庫連接和後台線程）"""
+    global _shared_summarizer
+    with _shared_lock:
+        if _shared_summarizer is None:
+            if factory is None:
+                from agent_db_connector import AgentDatabase
+                factory = lambda: ConversationSummarizer(AgentDatabase(summarize_conversations=False))
+            _shared_summarizer = factory()
+        return _shared_summarizer
+
+
+def main():
+    """主函數"""
+    if len(sys.argv) < 2:
+        print("使用方法: python3 conversation_summarizer.py <conversation_id>")
+        return 1
+
+    summarizer = ConversationSummarizer()
+    conversation_id = sys.argv[1]
+
+    if summarizer.update(conversation_id, force=True):
+        summary, recent = summarizer.context(conversation_id)
+        print(f"✅ 摘要已更新（{count_tokens(summary)} tokens，其後 {len(recent)} 條消息）")
+        print(summary)
+    else:
+        print("ℹ️  沒有需要折疊的消息，或摘要已被其他 Agent 更新")
+
+    summarizer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
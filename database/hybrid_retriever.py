@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+混合檢索
+知識庫和記憶的條目載入內存並切成段落，並行執行 BM25 詞法檢索和向量檢索，
+用倒數排名融合（RRF）合併，再按重要度和新近度加權，返回去重後的單一排序列表
+"""
+
+import re
+import sys
+import math
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import numpy as np
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+sys.path.insert(0, str(WORKSPACE / "heartbeat"))
+sys.path.insert(0, str(WORKSPACE))
+
+from latency_sketch import LatencySketch
+from passage_chunker import chunk_text
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+TABLES = ('knowledge_base', 'memory')
+
+# RRF 常數（排名 r 的貢獻為 1 / (RRF_K + r)）
+RRF_K = 60
+# 每個檢索階段取的候選數
+CANDIDATES = 50
+
+EMBEDDING_DIM = 256
+
+# 重要度 1-5（知識庫條目沒有重要度，按默認值計）
+DEFAULT_IMPORTANCE = 3
+IMPORTANCE_WEIGHT = 0.5
+# 新近度按半衰期衰減
+RECENCY_HALF_LIFE_DAYS = 30
+RECENCY_WEIGHT = 0.3
+
+_TOKEN_RE = re.compile(r'[a-z0-9_]+|[\u3400-\u9fff\uf900-\ufaff]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """分詞：英文數字按單詞，中文按相鄰兩字（單字詞保留單字）"""
+    tokens = []
+    for run in _TOKEN_RE.findall((text or '').lower()):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def _hash_token(token: str, dim: int) -> Tuple[int, float]:
+    digest = hashlib.md5(token.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'little') % dim, 1.0 if digest[4] & 1 else -1.0
+
+
+def hash_embedding(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """特徵哈希向量（詞袋投影到固定維度，L2 歸一化；可換成真實嵌入模型）"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        index, sign = _hash_token(token, dim)
+        vector[index] += sign
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class BM25:
+    """BM25 詞法索引（倒排表）"""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.count = len(documents)
+        self.lengths = np.array([len(doc) for doc in documents], dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if self.count else 0.0
+
+        postings: Dict[str, Dict[int, int]] = {}
+        for i, doc in enumerate(documents):
+            for token in doc:
+                tf = postings.setdefault(token, {})
+                tf[i] = tf.get(i, 0) + 1
+
+        self.postings = {
+            token: (np.fromiter(tf.keys(), dtype=np.int64, count=len(tf)),
+                    np.fromiter(tf.values(), dtype=np.float32, count=len(tf)))
+            for token, tf in postings.items()
+        }
+
+    def scores(self, query_tokens: List[str]) -> np.ndarray:
+        """每個文檔的 BM25 分數"""
+        scores = np.zeros(self.count, dtype=np.float32)
+        if not self.count:
+            return scores
+
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.avg_length or 1.0))
+        for token in set(query_tokens):
+            if token not in self.postings:
+                continue
+            docs, tf = self.postings[token]
+            idf = math.log(1 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        return scores
+
+
+class Corpus:
+    """一個表的內存索引（條目切成段落，BM25 + 向量矩陣按段落建立）"""
+
+    def __init__(self, table: str, rows: List[Dict[str, Any]], embed: Callable[[str], np.ndarray]):
+        self.table = table
+        self.rows = rows
+
+        # 段落：(條目位置, 段落序號, 段落文本)
+        self.passages: List[Tuple[int, int, str]] = []
+        for i, row in enumerate(rows):
+            for n, passage in enumerate(chunk_text(row.get('content') or '') or ['']):
+                self.passages.append((i, n, passage))
+
+        texts = [self.passage_text(rows[i], passage) for i, _, passage in self.passages]
+        self.bm25 = BM25([tokenize(text) for text in texts])
+        self.matrix = (np.vstack([embed(text) for text in texts]).astype(np.float32)
+                       if texts else np.zeros((0, EMBEDDING_DIM), dtype=np.float32))
+        self.categories = np.array([rows[i].get('category') or '' for i, _, _ in self.passages], dtype=object)
+
+    @staticmethod
+    def passage_text(row: Dict[str, Any], passage: str) -> str:
+        """參與檢索的文本（標題、摘要、標籤和段落）"""
+        parts = [row.get('title'), row.get('summary'), ' '.join(row.get('tags') or []), passage]
+        return '\n'.join(part for part in parts if part)
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+
+class HybridRetriever:
+    """知識庫 + 記憶的混合檢索器"""
+
+    def __init__(self, source, embed: Callable[[str], np.ndarray] = hash_embedding,
+                 candidates: int = CANDIDATES, rrf_k: int = RRF_K,
+                 importance_weight: float = IMPORTANCE_WEIGHT, recency_weight: float = RECENCY_WEIGHT,
+                 half_life_days: float = RECENCY_HALF_LIFE_DAYS, tables=TABLES):
+        """
+        source 需提供 fetch_documents(table) 和 corpus_version(table)（見 RAGIntegration）
+        """
+        self.source = source
+        self.embed = embed
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.importance_weight = importance_weight
+        self.recency_weight = recency_weight
+        self.half_life_days = half_life_days
+        self.tables = tuple(tables)
+
+        self._corpora: Dict[str, Corpus] = {}
+        self._versions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(self.tables))
+
+        self.metrics: Dict[str, LatencySketch] = {}
+        self.last_metrics: Dict[str, float] = {}
+
+    def _record(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            self.metrics.setdefault(stage, LatencySketch()).add(elapsed_ms)
+            self.last_metrics[stage] = round(elapsed_ms, 3)
+
+    def _timed(self, stage: str, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._record(stage, (time.perf_counter() - start) * 1000)
+
+    def corpus(self, table: str) -> Corpus:
+        """表的內存索引（數據版本變化時重建）"""
+        version = self.source.corpus_version(table)
+        if table not in self._corpora or self._versions.get(table) != version:
+            self._corpora[table] = Corpus(table, self.source.fetch_documents(table), self.embed)
+            self._versions[table] = version
+        return self._corpora[table]
+
+    def _rank(self, scores: np.ndarray, mask: Optional[np.ndarray]) -> List[int]:
+        """分數大於 0 的前 candidates 個位置（降序）"""
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        positive = np.flatnonzero(scores > 0)
+        if len(positive) > self.candidates:
+            positive = positive[np.argpartition(-scores[positive], self.candidates - 1)[:self.candidates]]
+        return positive[np.argsort(-scores[positive], kind='stable')].tolist()
+
+    def _lexical(self, corpus: Corpus, tokens: List[str], mask) -> List[int]:
+        return self._rank(corpus.bm25.scores(tokens), mask)
+
+    def _vector(self, corpus: Corpus, query_vector: np.ndarray, mask) -> List[int]:
+        return self._rank(corpus.matrix @ query_vector, mask) if len(corpus) else []
+
+    def weight(self, row: Dict[str, Any], now: datetime) -> float:
+        """重要度和新近度權重"""
+        importance = row.get('importance') or DEFAULT_IMPORTANCE
+        factor = 1 + self.importance_weight * (importance - DEFAULT_IMPORTANCE) / 2
+
+        timestamp = row.get('updated_at') or row.get('created_at')
+        if isinstance(timestamp, datetime):
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=HK_TZ)
+            age_days = max(0.0, (now - timestamp).total_seconds() / 86400)
+            factor *= (1 - self.recency_weight) + self.recency_weight * 0.5 ** (age_days / self.half_life_days)
+
+        return factor
+
+    def search(self, query: str, top_k: int = 5, category: Optional[str] = None,
+               now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        混合檢索，返回按融合分數排序的去重段落
+        （content 為命中的段落，帶條目元數據、source / score / 各階段排名）
+        """
+        start = time.perf_counter()
+        now = now or datetime.now(HK_TZ)
+
+        corpora = self._timed('refresh', lambda: {table: self.corpus(table) for table in self.tables})
+        tokens = tokenize(query)
+        query_vector = self.embed(query)
+
+        # 詞法和向量檢索在兩個表上並行
+        futures = {}
+        for table, corpus in corpora.items():
+            mask = corpus.categories == category if category else None
+            futures[(table, 'lexical')] = self._executor.submit(
+                self._timed, f'lexical_{table}', self._lexical, corpus, tokens, mask)
+            futures[(table, 'vector')] = self._executor.submit(
+                self._timed, f'vector_{table}', self._vector, corpus, query_vector, mask)
+        rankings = {key: future.result() for key, future in futures.items()}
+
+        results = self._timed('fusion', self._fuse, corpora, rankings, top_k, now)
+        self._record('total', (time.perf_counter() - start) * 1000)
+        return results
+
+    def _fuse(self, corpora: Dict[str, Corpus], rankings, top_k: int, now: datetime) -> List[Dict[str, Any]]:
+        """倒數排名融合 + 權重 + 去重"""
+        fused: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for (table, stage), ranking in rankings.items():
+            for rank, i in enumerate(ranking, 1):
+                item = fused.setdefault((table, i), {'rrf': 0.0})
+                item['rrf'] += 1.0 / (self.rrf_k + rank)
+                item[f'{stage}_rank'] = rank
+
+        scored = []
+        for (table, i), item in fused.items():
+            corpus = corpora[table]
+            row_index, passage, text = corpus.passages[i]
+            row = corpus.rows[row_index]
+            scored.append({
+                **row,
+                'content': text,
+                'passage': passage,
+                'source': table,
+                'lexical_rank': item.get('lexical_rank'),
+                'vector_rank': item.get('vector_rank'),
+                'rrf': item['rrf'],
+                'score': item['rrf'] * self.weight(row, now)
+            })
+        scored.sort(key=lambda r: r['score'], reverse=True)
+
+        # 同一內容（知識庫和記憶中重複保存的段落）只保留分數最高的一條
+        results, seen = [], set()
+        for row in scored:
+            key = hashlib.md5(' '.join(tokenize(f"{row.get('title')} {row.get('content')}")).encode('utf-8')).hexdigest()
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append(row)
+            if len(results) >= top_k:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各階段延遲匯總（毫秒）"""
+        with self._lock:
+            return {stage: sketch.summary() for stage, sketch in self.metrics.items()}
+
+    def close(self):
+        """關閉線程池"""
+        self._executor.shutdown(wait=False)
@@ -31,6 +31,9 @@ CREATE TABLE IF NOT EXISTS conversations (
     user_id VARCHAR(100),
     title TEXT,
     status VARCHAR(20) DEFAULT 'active',
+    context_summary TEXT,
+    context_summary_version INTEGER DEFAULT 0,
+    context_summary_messages INTEGER DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     metadata JSONB DEFAULT '{}'::jsonb
@@ -47,6 +47,8 @@ def init_conversation_tables():
                     message_count INT DEFAULT 0,
                     agent_id VARCHAR(50) DEFAULT 'main',
                     context_summary TEXT,
+                    context_summary_version INT DEFAULT 0,
+                    context_summary_messages INT DEFAULT 0,
                     metadata JSONB DEFAULT '{}'::jsonb,
                     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -54,6 +56,11 @@ def init_conversation_tables():
             """
             
             db.execute_update(query, ())
+            
+            # 舊表補上滾動摘要的版本和進度字段
+            db.execute_update("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS context_summary TEXT", ())
+            db.execute_update("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS context_summary_version INT DEFAULT 0", ())
+            db.execute_update("ALTER TABLE conversations ADD COLUMN IF NOT EXISTS context_summary_messages INT DEFAULT 0", ())
             print("  ✅ conversations 表創建成功")
             print()
             
@@ -22,6 +22,7 @@ class RAGIntegration:
         self.db_user = db_user
         self.db_password = db_password
         self.connection = None
+        self._retriever = None
     
     def connect(self):
         """連接到數據庫"""
@@ -119,6 +120,62 @@ class RAGIntegration:
             print(f"❌ 獲取記憶失敗: {e}")
             return []
     
+    def fetch_documents(self, table: str) -> list:
+        """讀取知識庫或記憶的全部有效條目（供混合檢索建立內存索引）"""
+        queries = {
+            'knowledge_base': """
+                SELECT entry_id AS id, category, title, content, summary, tags,
+                       NULL::integer AS importance, created_at, updated_at
+                FROM knowledge_base
+            """,
+            'memory': """
+                SELECT memory_id AS id, category, title, content, NULL::text AS summary,
+                       NULL::text[] AS tags, importance, created_at, updated_at
+                FROM memory
+                WHERE is_active = TRUE
+            """
+        }
+        if not self.connection:
+            if not self.connect():
+                return []
+        
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(queries[table])
+                columns = [desc[0] for desc in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor]
+        except Exception as e:
+            print(f"❌ 讀取 {table} 失敗: {e}")
+            self.connection.rollback()
+            return []
+    
+    def corpus_version(self, table: str) -> tuple:
+        """表的數據版本（行數 + 最後更新時間，變化時重建檢索索引）"""
+        if not self.connection:
+            if not self.connect():
+                return (0, None)
+        
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*), MAX(updated_at) FROM {table}")
+                return tuple(cursor.fetchone())
+        except Exception as e:
+            print(f"❌ 讀取 {table} 版本失敗: {e}")
+            self.connection.rollback()
+            return (0, None)
+    
+    def retrieve(self, query: str, top_k: int = 5, category: str = None) -> list:
+        """混合檢索知識庫和記憶（BM25 + 向量，RRF 融合，按重要度和新近度加權）"""
+        if self._retriever is None:
+            # 延遲導入：只有混合檢索需要 NumPy 等依賴，search / kb-add / memory-add 不需要
+            from hybrid_retriever import HybridRetriever
+            self._retriever = HybridRetriever(self)
+        return self._retriever.search(query, top_k=top_k, category=category)
+    
+    def retrieval_stats(self) -> dict:
+        """混合檢索各階段延遲"""
+        return self._retriever.stats() if self._retriever else {}
+    
     def add_to_knowledge_base(self, category: str, title: str, 
                             content: str, summary: str = "", 
                             tags: list = []) -> bool:
@@ -233,6 +290,7 @@ OpenClaw RAG 集成腳本
 命令：
     search <query>           搜索知識庫
     memory <query>          搜索記憶
+    retrieve <query>        混合檢索知識庫和記憶
     kb-add <cat> <title>    添加到知識庫
     memory-add <title>    添加到記憶
     logs                    查看日誌
@@ -297,6 +355,25 @@ OpenClaw RAG 集成腳本
         else:
             print("未找到相關記憶")
     
+    elif command == "retrieve":
+        query = sys.argv[2] if len(sys.argv) > 2 else ""
+        print(f"\n🔎 混合檢索: {query}")
+        results = rag.retrieve(query, top_k=limit, category=category)
+        
+        if results:
+            print(f"\n找到 {len(results)} 個結果:\n")
+            for i, result in enumerate(results, 1):
+                source = "知識庫" if result['source'] == 'knowledge_base' else "記憶"
+                print(f"{i}. [{source}/{(result['category'] or '').upper()}] {result['title']} (分數: {result['score']:.4f})")
+                print(f"   內容: {result['content'][:100]}")
+        else:
+            print("未找到相關結果")
+        
+        print("\n各階段延遲 (ms):")
+        for stage, ms in rag._retriever.last_metrics.items():
+            print(f"   {stage}: {ms}")
+        rag.disconnect()
+    
     elif command == "kb-add":
         if len(sys.argv) < 4:
             print("❌ kb-add 需要: <category> <title> <content>")
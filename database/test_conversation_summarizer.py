@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+測試對話滾動摘要
+"""
+
+import sys
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+
+import time
+import threading
+import subprocess
+
+import requests
+
+import circuit_breaker
+import conversation_summarizer
+from conversation_summarizer import (
+    ConversationSummarizer, extractive_summary, ollama_summary, shared_summarizer, SUMMARY_MAX_TOKENS
+)
+from passage_chunker import count_tokens
+
+
+class FakeDB:
+    """模擬 AgentDatabase 的摘要相關接口（版本號樂觀鎖）"""
+
+    def __init__(self):
+        self.conversations = {}
+        self.messages = {}
+        self.lock = threading.Lock()
+
+    def add_message(self, conversation_id, role, content):
+        self.conversations.setdefault(conversation_id, {
+            'context_summary': None, 'context_summary_version': 0, 'context_summary_messages': 0})
+        self.messages.setdefault(conversation_id, []).append({'role': role, 'content': content})
+
+    def get_summary_state(self, conversation_id):
+        if conversation_id not in self.conversations:
+            return None
+        return {**self.conversations[conversation_id], 'message_count': len(self.messages[conversation_id])}
+
+    def get_messages_range(self, conversation_id, offset, limit):
+        return self.messages[conversation_id][offset:offset + limit]
+
+    def update_context_summary(self, conversation_id, summary, expected_version, summarized_messages):
+        with self.lock:
+            row = self.conversations[conversation_id]
+            if row['context_summary_version'] != expected_version:
+                return False
+            row.update(context_summary=summary, context_summary_version=expected_version + 1,
+                       context_summary_messages=summarized_messages)
+            return True
+
+
+def joined_summary(summary, messages):
+    return (summary + ' | ' if summary else '') + ','.join(m['content'] for m in messages)
+
+
+def test_folds_every_n_messages():
+    """測試窗口外累積 N 條時才折疊，窗口內消息保持原樣"""
+    db = FakeDB()
+    summarizer = ConversationSummarizer(db, summarize=joined_summary, live_window=4, every=3)
+
+    for i in range(6):
+        db.add_message('c1', 'user', f'm{i}')
+    assert not summarizer.update('c1')
+
+    db.add_message('c1', 'user', 'm6')
+    assert summarizer.update('c1')
+    summary, recent = summarizer.context('c1')
+    assert summary == 'm0,m1,m2'
+    assert [m['content'] for m in recent] == ['m3', 'm4', 'm5', 'm6']
+    assert db.conversations['c1']['context_summary_version'] == 1
+    summarizer.close()
+    print("  ✅ 按 N 條折疊正確")
+
+
+def test_background_update_coalesced():
+    """測試後台更新不阻塞，同一對話排隊中的更新只執行一次"""
+    db = FakeDB()
+    gate = threading.Event()
+    calls = []
+
+    def slow_summary(summary, messages):
+        gate.wait(5)
+        calls.append(len(messages))
+        return joined_summary(summary, messages)
+
+    summarizer = ConversationSummarizer(db, summarize=slow_summary, live_window=2, every=2)
+    for i in range(6):
+        db.add_message('c1', 'user', f'm{i}')
+
+    first = summarizer.maybe_update('c1')
+    # 第一個已在執行，第二個排隊，第三個合併到排隊中的那個
+    second = summarizer.maybe_update('c1')
+    third = summarizer.maybe_update('c1')
+    assert first is not None and (second is None or third is None)
+    gate.set()
+    summarizer.close()
+
+    assert calls[0] == 4 and sum(calls) == 4
+    assert db.conversations['c1']['context_summary_messages'] == 4
+    print("  ✅ 後台更新合併正確")
+
+
+def test_version_conflict():
+    """測試另一個 Agent 已更新摘要時不覆蓋"""
+    db = FakeDB()
+    for i in range(10):
+        db.add_message('c1', 'user', f'm{i}')
+
+    def racing_summary(summary, messages):
+        # 模擬另一個 Agent 在模型生成期間先寫入
+        db.update_context_summary('c1', 'other agent', 0, 5)
+        return joined_summary(summary, messages)
+
+    summarizer = ConversationSummarizer(db, summarize=racing_summary, live_window=2, every=2)
+    assert not summarizer.update('c1')
+    assert db.conversations['c1']['context_summary'] == 'other agent'
+    assert db.conversations['c1']['context_summary_version'] == 1
+    summarizer.close()
+    print("  ✅ 版本衝突不覆蓋")
+
+
+def test_prompt_size_constant():
+    """測試長對話的摘要 + 窗口大小保持有界"""
+    db = FakeDB()
+    summarizer = ConversationSummarizer(db, summarize=extractive_summary, live_window=6, every=4)
+
+    sizes = []
+    for i in range(200):
+        db.add_message('c1', 'user' if i % 2 == 0 else 'assistant', f'第 {i} 條消息：今日天氣多雲，氣溫二十八度。' * 2)
+        summarizer.update('c1')
+        summary, recent = summarizer.context('c1')
+        sizes.append(count_tokens(summary) + sum(count_tokens(m['content']) for m in recent))
+
+    assert count_tokens(summarizer.context('c1')[0]) <= SUMMARY_MAX_TOKENS
+    assert max(sizes[100:]) <= max(sizes[:60]) * 1.2
+    summarizer.close()
+    print(f"  ✅ 提示大小有界（最大 {max(sizes)} tokens）")
+
+
+def test_shared_summarizer():
+    """測試保存消息路徑使用的進程內共用摘要器"""
+    db = FakeDB()
+    for i in range(5):
+        db.add_message('c1', 'user', f'm{i}')
+
+    try:
+        summarizer = shared_summarizer(lambda: ConversationSummarizer(db, summarize=joined_summary,
+                                                                      live_window=2, every=2))
+        assert shared_summarizer() is summarizer
+        assert summarizer.maybe_update('c1').result(timeout=5)
+        assert db.conversations['c1']['context_summary'] == 'm0,m1,m2'
+        summarizer.close()
+    finally:
+        conversation_summarizer._shared_summarizer = None
+    print("  ✅ 共用摘要器正確")
+
+
+def test_exit_does_not_wait_for_update():
+    """測試進程退出時不等待後台的摘要更新"""
+    script = (
+        "import time, test_conversation_summarizer as t\n"
+        "db = t.FakeDB()\n"
+        "[db.add_message('c1', 'user', f'm{i}') for i in range(5)]\n"
+        "s = t.ConversationSummarizer(db, summarize=lambda summary, messages: time.sleep(30), "
+        "live_window=2, every=2)\n"
+        "s.maybe_update('c1')\n"
+        "time.sleep(0.2)\n"
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=20,
+                   cwd=conversation_summarizer.__file__.rsplit('/', 1)[0] or '.')
+    assert time.perf_counter() - start < 10
+    print("  ✅ 退出時不等待後台更新")
+
+
+def test_model_failure_fallback():
+    """測試模型不可用時使用後備摘要"""
+    class DownSession:
+        def post(self, *args, **kwargs):
+            raise requests.ConnectionError("ollama down")
+
+    messages = [{'role': 'user', 'content': '記住我住在沙田'}]
+    try:
+        assert ollama_summary('舊摘要', messages, session=DownSession()) == '舊摘要\nuser: 記住我住在沙田'
+
+        # 連續失敗後熔斷：不再調用模型，直接用後備摘要
+        class CountingSession(DownSession):
+            calls = 0
+
+            def post(self, *args, **kwargs):
+                CountingSession.calls += 1
+                return super().post(*args, **kwargs)
+
+        for _ in range(4):
+            assert ollama_summary('', messages, session=CountingSession()) == 'user: 記住我住在沙田'
+        assert CountingSession.calls == 2
+    finally:
+        circuit_breaker._breakers.pop('ollama', None)
+    print("  ✅ 後備摘要正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("對話滾動摘要測試")
+    print("=" * 60)
+    print()
+
+    test_folds_every_n_messages()
+    test_background_update_coalesced()
+    test_version_conflict()
+    test_prompt_size_constant()
+    test_shared_summarizer()
+    test_exit_does_not_wait_for_update()
+    test_model_failure_fallback()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+測試混合檢索（BM25 + 向量，RRF 融合）
+"""
+
+import sys
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+
+from datetime import datetime, timezone, timedelta
+
+from hybrid_retriever import HybridRetriever, BM25, tokenize
+
+HK_TZ = timezone(timedelta(hours=8))
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=HK_TZ)
+
+
+class FakeSource:
+    """模擬 RAGIntegration 的數據接口"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.fetches = 0
+
+    def fetch_documents(self, table):
+        self.fetches += 1
+        return list(self.tables[table])
+
+    def corpus_version(self, table):
+        return (len(self.tables[table]), max((r['updated_at'] for r in self.tables[table]), default=None))
+
+
+def kb(id, title, content, category='code', days=1):
+    return {'id': id, 'category': category, 'title': title, 'content': content, 'summary': '', 'tags': [],
+            'importance': None, 'created_at': NOW - timedelta(days=days), 'updated_at': NOW - timedelta(days=days)}
+
+
+def mem(id, title, content, importance=3, days=1):
+    return {'id': id, 'category': 'general', 'title': title, 'content': content, 'summary': None, 'tags': None,
+            'importance': importance, 'created_at': NOW - timedelta(days=days), 'updated_at': NOW - timedelta(days=days)}
+
+
+def make_source():
+    return FakeSource({
+        'knowledge_base': [
+            kb('kb1', 'Ollama 配置', '設置 Ollama 模型 qwen2.5 並預熱'),
+            kb('kb2', '天氣警告', '天文台發出八號風球時的處理流程', category='data'),
+            kb('kb3', 'Python 優化', '使用緩存減少重複計算'),
+        ],
+        'memory': [
+            mem('m1', '系統設置', '完成 Ollama 配置，Classifier 使用 qwen2.5:1.5b', importance=5),
+            mem('m2', '舊的 Ollama 筆記', 'Ollama 配置', importance=1, days=300),
+            mem('m3', 'Python 優化', '使用緩存減少重複計算'),
+        ]
+    })
+
+
+def test_tokenize_and_bm25():
+    """測試中英文分詞和 BM25 排序"""
+    assert tokenize('Ollama 配置模型') == ['ollama', '配置', '置模', '模型']
+    bm25 = BM25([tokenize('天氣 警告'), tokenize('Python 緩存'), tokenize('天氣 天氣 預報')])
+    scores = bm25.scores(tokenize('天氣'))
+    assert scores[1] == 0 and scores[2] > scores[0] > 0
+    print("  ✅ 分詞和 BM25 正確")
+
+
+def test_fused_ranking():
+    """測試兩個表的結果融合成一個排序列表，重要度和新近度生效"""
+    retriever = HybridRetriever(make_source())
+    results = retriever.search('Ollama 配置', top_k=5, now=NOW)
+
+    assert {r['source'] for r in results} == {'knowledge_base', 'memory'}
+    ids = [r['id'] for r in results]
+    # 重要且新的記憶排在舊的、不重要的記憶前面
+    assert ids.index('m1') < ids.index('m2')
+    assert all(r['lexical_rank'] or r['vector_rank'] for r in results)
+    assert results == sorted(results, key=lambda r: r['score'], reverse=True)
+    print("  ✅ 融合排序正確")
+
+
+def test_dedup_and_category():
+    """測試重複內容去重和類別過濾"""
+    retriever = HybridRetriever(make_source())
+    results = retriever.search('Python 緩存', top_k=5, now=NOW)
+    assert [r['title'] for r in results].count('Python 優化') == 1
+
+    results = retriever.search('天氣 風球', top_k=5, category='data', now=NOW)
+    assert [r['id'] for r in results] == ['kb2']
+    print("  ✅ 去重和類別過濾正確")
+
+
+def test_long_memory_returns_passage():
+    """測試長內容切成段落，只返回命中的段落"""
+    long_content = '天文台發出強烈季候風信號，海面有大浪。' * 40 + '颱風假期間伺服器自動備份。'
+    source = make_source()
+    source.tables['memory'].append(mem('m5', '颱風筆記', long_content))
+
+    retriever = HybridRetriever(source)
+    result = retriever.search('伺服器 自動備份', top_k=1, now=NOW)[0]
+    assert result['id'] == 'm5' and result['passage'] > 0
+    assert '自動備份' in result['content'] and len(result['content']) < len(long_content)
+    print("  ✅ 長內容按段落返回")
+
+
+def test_corpus_cache_and_metrics():
+    """測試數據未變時不重建索引，並記錄各階段延遲"""
+    source = make_source()
+    retriever = HybridRetriever(source)
+    retriever.search('Ollama', now=NOW)
+    retriever.search('天氣', now=NOW)
+    assert source.fetches == 2
+
+    source.tables['memory'].append(mem('m4', '新記憶', '天氣預報', days=0))
+    retriever.search('天氣', now=NOW)
+    assert source.fetches == 3
+
+    stats = retriever.stats()
+    for stage in ('refresh', 'lexical_knowledge_base', 'vector_knowledge_base',
+                  'lexical_memory', 'vector_memory', 'fusion', 'total'):
+        assert stats[stage]['count'] == 3
+    retriever.close()
+    print("  ✅ 索引緩存和延遲指標正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("混合檢索測試")
+    print("=" * 60)
+    print()
+
+    test_tokenize_and_bm25()
+    test_fused_ranking()
+    test_dedup_and_category()
+    test_long_memory_returns_passage()
+    test_corpus_cache_and_metrics()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
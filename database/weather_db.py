@@ -4,9 +4,14 @@
 完整的上下文管理器和天氣數據庫操作
 """
 
+import sys
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+
 from datetime import datetime, timezone, timedelta
 import json
 
+from weather_db_operations import WeatherDatabase as _OperationsDatabase
+
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
@@ -118,6 +123,10 @@ class WeatherDatabase:
             print(f"[DB_ERROR] 保存預報失敗: {e}")
             return False
     
+    # 批量寫入與 weather_db_operations 共用同一實現
+    save_weather_data_bulk = _OperationsDatabase.save_weather_data_bulk
+    save_weather_forecast_bulk = _OperationsDatabase.save_weather_forecast_bulk
+    
     def get_latest_weather(self, location='HKO', limit=24):
         """獲取最近的天氣數據"""
         
@@ -14,6 +14,45 @@ import json
 HK_TZ = timezone(timedelta(hours=8))
 
 
+def _dedupe_bulk_rows(rows, key_field):
+    """批量寫入前去重（同一語句中同一主鍵只能出現一次，保留最後一行）"""
+    rows = list(rows)
+    statuses = [{'id': row.get(key_field), 'status': None} for row in rows]
+    
+    last_index = {}
+    for i, row in enumerate(rows):
+        if row.get(key_field) is None:
+            statuses[i]['status'] = 'invalid'
+            continue
+        if row[key_field] in last_index:
+            statuses[last_index[row[key_field]]]['status'] = 'duplicate'
+        last_index[row[key_field]] = i
+    
+    unique_rows = [rows[i] for i in sorted(last_index.values())]
+    return unique_rows, statuses
+
+
+def _bulk_row_status(statuses, results, missing_status):
+    """根據 RETURNING 結果填寫每行狀態"""
+    if results is None:
+        returned = None
+    else:
+        returned = {
+            result['row_id']: 'inserted' if result['inserted'] else 'updated'
+            for result in results
+        }
+    
+    for status in statuses:
+        if status['status'] is not None:
+            continue
+        if returned is None:
+            status['status'] = 'error'
+        else:
+            status['status'] = returned.get(status['id'], missing_status)
+    
+    return statuses
+
+
 class WeatherDatabase:
     """天氣數據庫操作類"""
     
@@ -140,6 +179,98 @@ class WeatherDatabase:
             print(f"[DB_ERROR] 保存預報失敗: {e}")
             return False
     
+    def save_weather_data_bulk(self, rows) -> list:
+        """批量保存天氣數據（單一語句、單一事務），返回每行狀態"""
+        
+        unique_rows, statuses = _dedupe_bulk_rows(rows, 'data_id')
+        if not unique_rows:
+            return statuses
+        
+        results = None
+        try:
+            with self.db:
+                query = """
+                    INSERT INTO weather_data 
+                    (data_id, observation_time, temperature, humidity, rainfall, 
+                     wind_speed, wind_direction, weather_condition, location, source, metadata)
+                    VALUES %s
+                    ON CONFLICT (data_id) DO UPDATE SET
+                        temperature = EXCLUDED.temperature,
+                        humidity = EXCLUDED.humidity,
+                        rainfall = EXCLUDED.rainfall,
+                        wind_speed = EXCLUDED.wind_speed,
+                        wind_direction = EXCLUDED.wind_direction,
+                        weather_condition = EXCLUDED.weather_condition,
+                        metadata = EXCLUDED.metadata,
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING data_id AS row_id, (xmax = 0) AS inserted
+                """
+                
+                values = [(
+                    row['data_id'],
+                    row['observation_time'],
+                    row.get('temperature'),
+                    row.get('humidity'),
+                    row.get('rainfall'),
+                    row.get('wind_speed'),
+                    row.get('wind_direction'),
+                    row.get('weather_condition'),
+                    row.get('location', 'HKO'),
+                    row.get('source', 'HKO'),
+                    json.dumps(row.get('metadata') or {})
+                ) for row in unique_rows]
+                
+                results = self.db.execute_values(
+                    query, values,
+                    template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)"
+                )
+        except Exception as e:
+            print(f"[DB_ERROR] 批量保存天氣數據失敗: {e}")
+        
+        return _bulk_row_status(statuses, results, missing_status='updated')
+    
+    def save_weather_forecast_bulk(self, rows) -> list:
+        """批量保存天氣預報（單一語句、單一事務），返回每行狀態"""
+        
+        unique_rows, statuses = _dedupe_bulk_rows(rows, 'forecast_id')
+        if not unique_rows:
+            return statuses
+        
+        results = None
+        try:
+            with self.db:
+                query = """
+                    INSERT INTO weather_forecast 
+                    (forecast_id, forecast_time, temperature_min, temperature_max, 
+                     weather_condition, humidity, rainfall_probability, location, source, metadata)
+                    VALUES %s
+                    ON CONFLICT (forecast_id) DO NOTHING
+                    RETURNING forecast_id AS row_id, TRUE AS inserted
+                """
+                
+                values = [(
+                    row['forecast_id'],
+                    row['forecast_time'],
+                    row.get('temperature_min'),
+                    row.get('temperature_max'),
+                    row.get('weather_condition'),
+                    row.get('humidity'),
+                    row.get('rainfall_probability'),
+                    row.get('location', 'HKO'),
+                    row.get('source', 'HKO'),
+                    json.dumps(row.get('metadata') or {})
+                ) for row in unique_rows]
+                
+                results = self.db.execute_values(
+                    query, values,
+                    template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)"
+                )
+        except Exception as e:
+            print(f"[DB_ERROR] 批量保存預報失敗: {e}")
+        
+        # DO NOTHING 時已存在的預報不會返回
+        return _bulk_row_status(statuses, results, missing_status='skipped')
+    
     def save_setting(self, setting_id, setting_key, setting_value, 
                      setting_type='string', description=None, metadata=None):
         """保存用戶設置到 weather_settings 表"""
@@ -300,7 +431,59 @@ class WeatherDatabase:
         except Exception as e:
             print(f"[DB_ERROR] 更新警告狀態失敗: {e}")
             return False
-    
+
+    def save_warning_alerts(self, alerts, location='HKO') -> bool:
+        """
+        根據警告變化寫入 weather_alerts（alerts 由 hko_warning_diff.event_to_alert 生成，
+        嚴重級別和標題與發出的警報一致；只寫入變化，無需 check_alert_sent）
+        """
+
+        if not alerts:
+            return True
+
+        try:
+            with self.db:
+                deactivate_query = """
+                    UPDATE weather_alerts
+                    SET is_active = FALSE,
+                        effect_end_time = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE alert_type = %s AND location = %s AND is_active = TRUE
+                """
+
+                insert_query = """
+                    INSERT INTO weather_alerts
+                    (alert_id, alert_type, severity, title, description,
+                     effect_start_time, location, sent_at, metadata)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, %s::jsonb)
+                    ON CONFLICT (alert_id) DO NOTHING
+                """
+
+                for alert in alerts:
+                    # 同類舊警告失效（取消、升級、降級都適用）
+                    if not self.db.execute_update(deactivate_query, (alert['alert_type'], location)):
+                        return False
+
+                    if alert['metadata']['event'] == 'cancelled':
+                        continue
+
+                    if not self.db.execute_update(insert_query, (
+                        alert['alert_id'],
+                        alert['alert_type'],
+                        alert['severity'],
+                        alert['title'],
+                        alert['description'],
+                        alert['metadata'].get('issue_time') or alert['effect_start_time'],
+                        location,
+                        json.dumps(alert['metadata'], ensure_ascii=False, default=str)
+                    )):
+                        return False
+
+                return True
+        except Exception as e:
+            print(f"[DB_ERROR] 保存警告變化失敗: {e}")
+            return False
+
     def get_weather_statistics(self, location='HKO', hours=24):
         """獲取天氣統計數據"""
         
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+熔斷器
+包裝 Agent 之間和 LLM 的調用：連續失敗達到閾值後熔斷（快速失敗），
+冷卻後半開放行少量探測請求，成功則恢復
+"""
+
+import time
+import threading
+from functools import wraps
+from typing import Callable, Dict, Any, Optional
+
+from health_registry import HealthRegistry
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """熔斷中，調用被拒絕"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 熔斷中，{retry_after:.1f} 秒後重試")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """熔斷器（可選讀取共享健康登記表，Heartbeat 判定故障時直接熔斷）"""
+
+    def __init__(self, name: str, fail_threshold: int = 3, reset_timeout: float = 30,
+                 half_open_max_calls: int = 1, registry: Optional[HealthRegistry] = None):
+        self.name = name
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.registry = registry
+
+        self.state = CLOSED
+        self.fail_count = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.half_open_calls = 0
+
+    def _before_call(self) -> None:
+        """判斷是否放行（不放行時拋出 CircuitOpenError）"""
+        with self._lock:
+            # Heartbeat 已判定故障：未熔斷時立即熔斷
+            if self.state == CLOSED and self.registry is not None and self.registry.is_down(self.name):
+                self._open()
+
+            if self.state == OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+                self.state = HALF_OPEN
+                self.half_open_calls = 0
+
+            if self.state == HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self.half_open_calls += 1
+
+    def record_success(self) -> None:
+        """記錄成功"""
+        with self._lock:
+            self.state = CLOSED
+            self.fail_count = 0
+            self.half_open_calls = 0
+
+    def record_failure(self) -> None:
+        """記錄失敗"""
+        with self._lock:
+            self.fail_count += 1
+            if self.state == HALF_OPEN or self.fail_count >= self.fail_threshold:
+                self._open()
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """通過熔斷器調用"""
+        self._before_call()
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """熔斷器狀態"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'fail_count': self.fail_count
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """獲取進程內共享的熔斷器（同名只創建一次）"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def circuit_breaker(name: str, **kwargs) -> Callable:
+    """熔斷器裝飾器"""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **call_kwargs):
+            return get_breaker(name, **kwargs).call(func, *args, **call_kwargs)
+        return wrapper
+    return decorator
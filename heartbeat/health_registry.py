@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+共享健康狀態登記表
+Heartbeat 寫入各 Agent 的最新狀態，任何進程都可以讀取（文件放在 /dev/shm，原子替換）
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+
+# 優先使用共享內存（tmpfs），沒有時退回工作目錄
+if Path("/dev/shm").is_dir():
+    DEFAULT_REGISTRY_FILE = Path("/dev/shm") / "jarvis_agent_health.json"
+else:
+    DEFAULT_REGISTRY_FILE = WORKSPACE / "heartbeat" / "agent_health.json"
+
+# 超過這個時間沒有更新的狀態視為未知
+STALE_AFTER = 300
+
+
+class HealthRegistry:
+    """Agent 健康狀態登記表（讀取時按 mtime 緩存）"""
+
+    def __init__(self, path: Path = DEFAULT_REGISTRY_FILE):
+        self.path = Path(path)
+        self._states = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """讀取登記表（文件未變化時使用緩存）"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        if mtime != self._mtime:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._states = json.load(f)
+                self._mtime = mtime
+            except (OSError, ValueError):
+                # 讀取失敗時保留上次的狀態
+                pass
+
+        return self._states
+
+    def update(self, agent_id: str, status: str, fail_count: int, fail_threshold: int,
+               response_time: Optional[float] = None) -> None:
+        """更新 Agent 狀態（Heartbeat 調用）"""
+        with self._lock:
+            states = dict(self._load())
+            states[agent_id] = {
+                'status': status,
+                'fail_count': fail_count,
+                'fail_threshold': fail_threshold,
+                'response_time': response_time,
+                'updated_at': datetime.now(HK_TZ).timestamp()
+            }
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(states, f)
+            os.replace(tmp_file, self.path)
+
+            self._states = states
+            self._mtime = self.path.stat().st_mtime_ns
+
+    def get(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """讀取 Agent 狀態（過期或不存在時返回 None）"""
+        with self._lock:
+            state = self._load().get(agent_id)
+
+        if state is None:
+            return None
+        if datetime.now(HK_TZ).timestamp() - state['updated_at'] > STALE_AFTER:
+            return None
+        return state
+
+    def is_down(self, agent_id: str) -> bool:
+        """Agent 是否已達到故障閾值"""
+        state = self.get(agent_id)
+        return bool(state) and state['status'] != 'healthy' and state['fail_count'] >= state['fail_threshold']
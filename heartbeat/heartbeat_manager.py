@@ -4,14 +4,28 @@ Heartbeat Manager
 核心協調器 - 監控所有 Agents
 """
 
+import sys
 import time
+import random
+import asyncio
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
+
+from latency_sketch import LatencyTracker
+from health_registry import HealthRegistry
 
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
+# 自適應探測間隔
+MIN_INTERVAL = 5          # 最短探測間隔（秒）
+FAILURE_FACTOR = 0.25     # 故障後按配置間隔的 1/4 探測
+RECOVERY_FACTOR = 2.0     # 每次健康結果間隔翻倍，直到回到配置間隔
+JITTER = 0.1              # 只向下抖動，最壞檢測時間不超過配置間隔
+
 
 class HeartbeatManager:
     """Heartbeat 管理器"""
@@ -25,6 +39,7 @@ class HeartbeatManager:
                 'timeout': 5,
                 'interval': 30,
                 'fail_threshold': 3,
+                'slo': {'p95': 1.0, 'p99': 2.0},
                 'enabled': True
             },
             'chat': {
@@ -33,6 +48,7 @@ class HeartbeatManager:
                 'timeout': 10,
                 'interval': 60,
                 'fail_threshold': 5,
+                'slo': {'p95': 3.0, 'p99': 6.0},
                 'enabled': True
             },
             'coding': {
@@ -41,6 +57,7 @@ class HeartbeatManager:
                 'timeout': 10,
                 'interval': 60,
                 'fail_threshold': 5,
+                'slo': {'p95': 3.0, 'p99': 6.0},
                 'enabled': True
             },
             'system-admin': {
@@ -49,6 +66,7 @@ class HeartbeatManager:
                 'timeout': 10,
                 'interval': 30,
                 'fail_threshold': 3,
+                'slo': {'p95': 1.0, 'p99': 2.0},
                 'enabled': True
             },
             'weather': {
@@ -57,6 +75,7 @@ class HeartbeatManager:
                 'timeout': 10,
                 'interval': 60,
                 'fail_threshold': 5,
+                'slo': {'p95': 3.0, 'p99': 6.0},
                 'enabled': True
             }
         }
@@ -67,9 +86,43 @@ class HeartbeatManager:
         # Heartbeat 狀態
         self.running = False
         self.last_check_time = {}
+        
+        # 當前探測間隔（健康時逐步回到配置的 interval，故障後加快）
+        self.current_intervals = {agent_id: agent['interval'] for agent_id, agent in self.agents.items()}
+        
+        # 延遲分位數追蹤（5 分鐘滑動窗口）
+        self.latency = LatencyTracker(window_minutes=5)
+        self.slo_alert_time = {}
+        self.alert_manager = None
+        self._alert_lock = threading.Lock()
+        
+        # 共享健康登記表（供其他進程的熔斷器讀取）
+        self.registry = HealthRegistry()
+        
+        # 共享 keep-alive 連接池
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=len(self.agents), pool_maxsize=len(self.agents)))
     
     def check_agent_health(self, agent_id: str) -> dict:
-        """檢查 Agent 健康狀態"""
+        """檢查 Agent 健康狀態，並發布到共享健康登記表"""
+        result = self._probe_agent(agent_id)
+        
+        if result['status'] != 'disabled':
+            try:
+                self.registry.update(
+                    agent_id,
+                    status=result['status'],
+                    fail_count=result['fail_count'],
+                    fail_threshold=self.agents[agent_id]['fail_threshold'],
+                    response_time=result['response_time']
+                )
+            except OSError as e:
+                print(f"❌ 更新健康登記表失敗: {e}")
+        
+        return result
+    
+    def _probe_agent(self, agent_id: str) -> dict:
+        """探測 Agent 健康端點"""
         agent = self.agents.get(agent_id)
         if not agent or not agent['enabled']:
             return {
@@ -82,11 +135,12 @@ class HeartbeatManager:
         start_time = time.time()
         
         try:
-            response = requests.get(
+            response = self.session.get(
                 agent['url'],
                 timeout=agent['timeout']
             )
             response_time = time.time() - start_time
+            self.latency.record(agent_id, response_time)
             
             if response.status_code == 200:
                 # 重置故障計數
@@ -117,6 +171,9 @@ class HeartbeatManager:
                 }
         
         except requests.Timeout:
+            # 超時按超時值計入延遲分位數
+            self.latency.record(agent_id, agent['timeout'])
+            
             # 故障計數
             self.fail_counts[agent_id] = self.fail_counts.get(agent_id, 0) + 1
             self.last_check_time[agent_id] = datetime.now(HK_TZ)
@@ -146,16 +203,140 @@ class HeartbeatManager:
                 'fail_count': self.fail_counts[agent_id]
             }
     
+    async def check_agent_health_async(self, agent_id: str) -> dict:
+        """非同步檢查 Agent 健康狀態（在線程中執行，不阻塞其他 Agents）"""
+        return await asyncio.to_thread(self.check_agent_health, agent_id)
+    
+    async def check_all_agents_async(self) -> List[dict]:
+        """並發檢查所有 Agents（總耗時約等於最慢的一個）"""
+        agent_ids = [agent_id for agent_id, agent in self.agents.items() if agent['enabled']]
+        return list(await asyncio.gather(*(self.check_agent_health_async(agent_id) for agent_id in agent_ids)))
+    
     def check_all_agents(self) -> List[dict]:
         """檢查所有 Agents"""
-        results = []
+        return asyncio.run(self.check_all_agents_async())
+    
+    def next_interval(self, agent_id: str, result: dict) -> float:
+        """根據探測結果調整探測間隔（故障後加快，持續健康時退回配置間隔）"""
+        base = self.agents[agent_id]['interval']
         
-        for agent_id, agent in self.agents.items():
-            if agent['enabled']:
-                result = self.check_agent_health(agent_id)
-                results.append(result)
+        if result['status'] == 'healthy':
+            interval = min(base, self.current_intervals[agent_id] * RECOVERY_FACTOR)
+        else:
+            interval = max(MIN_INTERVAL, base * FAILURE_FACTOR)
         
-        return results
+        self.current_intervals[agent_id] = interval
+        return interval
+    
+    def next_delay(self, agent_id: str, result: dict) -> float:
+        """下一次探測前的等待時間（帶抖動，避免所有 Agents 同時探測）"""
+        interval = self.next_interval(agent_id, result)
+        return interval * (1 - random.uniform(0, JITTER))
+    
+    def check_latency_slo(self, agent_id: str) -> Optional[dict]:
+        """窗口 p95 / p99 超出 SLO 時發出 agent_slow 警報（每個窗口最多一次）"""
+        agent = self.agents[agent_id]
+        breach = self.latency.check_slo(agent_id, agent.get('slo', {}))
+        if not breach:
+            return None
+        
+        # 各 Agent 的探測循環在線程中並發調用
+        with self._alert_lock:
+            now = datetime.now(HK_TZ)
+            last_alert = self.slo_alert_time.get(agent_id)
+            if last_alert and now - last_alert < timedelta(minutes=self.latency.window_minutes):
+                return None
+            self.slo_alert_time[agent_id] = now
+            
+            if self.alert_manager is None:
+                sys.path.insert(0, '/home/jarvis/.openclaw/workspace/alerts')
+                from alert_manager import AlertManager
+                self.alert_manager = AlertManager()
+        
+        return self.alert_manager.send_alert(
+            'agent_slow',
+            agent_name=agent['name'],
+            agent_id=agent_id,
+            response_time=breach['value'],
+            threshold=breach['threshold'],
+            percentile=breach['percentile'],
+            window_minutes=breach['window_minutes']
+        )
+    
+    def persist_latency_summaries(self) -> int:
+        """把已結束分鐘的延遲匯總寫入 system_metrics"""
+        summaries = self.latency.flush_summaries()
+        if not summaries:
+            return 0
+        
+        try:
+            sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+            from agent_db_connector import AgentDatabase
+            
+            db = AgentDatabase()
+            for summary in summaries:
+                minute = summary.pop('minute')
+                db.save_metric(
+                    metric_id=f"latency_{summary['agent_id']}_{minute.strftime('%Y%m%d%H%M')}",
+                    metric_name='heartbeat_latency_p95',
+                    metric_value=summary['p95'],
+                    metric_type='latency',
+                    agent_id=summary['agent_id'],
+                    metadata={**summary, 'minute': minute.isoformat()}
+                )
+            
+            return len(summaries)
+        except Exception as e:
+            print(f"❌ 保存延遲匯總失敗: {e}")
+            return 0
+    
+    async def _agent_loop(self, agent_id: str, on_result: Optional[Callable[[dict], None]]):
+        """單個 Agent 的探測循環（按自己的間隔調度）"""
+        # 啟動時錯開探測
+        await asyncio.sleep(random.uniform(0, JITTER * self.agents[agent_id]['interval']))
+        
+        while self.running:
+            result = await self.check_agent_health_async(agent_id)
+            
+            if on_result:
+                on_result(result)
+            
+            # 警報發送和數據庫寫入是阻塞 I/O，在線程中執行，不阻塞其他 Agents 的探測
+            await asyncio.to_thread(self.check_latency_slo, agent_id)
+            await asyncio.to_thread(self.persist_latency_summaries)
+            
+            await asyncio.sleep(self.next_delay(agent_id, result))
+    
+    async def run_forever(self, on_result: Optional[Callable[[dict], None]] = None):
+        """持續探測所有 Agents（每個 Agent 獨立調度）"""
+        self.running = True
+        
+        tasks = [
+            asyncio.create_task(self._agent_loop(agent_id, on_result))
+            for agent_id, agent in self.agents.items() if agent['enabled']
+        ]
+        
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.running = False
+    
+    def stop(self):
+        """停止持續探測"""
+        self.running = False
+    
+    def print_result(self, result: dict):
+        """打印單次探測結果"""
+        check_time = result['timestamp'].strftime('%H:%M:%S')
+        status_emoji = "✅" if result['status'] == 'healthy' else "❌"
+        interval = self.current_intervals[result['agent_id']]
+        
+        if result['status'] == 'healthy':
+            print(f"[{check_time}] {status_emoji} {result['agent_name']} {result['response_time']}s（下次 {interval:.0f}s 內）")
+        else:
+            print(f"[{check_time}] {status_emoji} {result['agent_name']} {result['error']}（故障 {result['fail_count']} 次）")
     
     def run_heartbeat_check(self):
         """運行一次 Heartbeat 檢查"""
@@ -217,6 +398,14 @@ def main():
     # 創建管理器
     manager = HeartbeatManager()
     
+    # 持續監控模式
+    if '--watch' in sys.argv:
+        try:
+            asyncio.run(manager.run_forever(on_result=manager.print_result))
+        except KeyboardInterrupt:
+            print("\n🛑 Heartbeat 已停止")
+        return
+    
     # 運行檢查
     results = manager.run_heartbeat_check()
     
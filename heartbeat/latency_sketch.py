@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+延遲分位數追蹤
+對數分桶的流式分位數草圖（DDSketch 風格，相對誤差有上界），
+按分鐘匯總、按滑動窗口計算 p95 / p99 並檢查 SLO
+"""
+
+import math
+import threading
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Any, Optional
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+QUANTILES = {'p50': 0.50, 'p95': 0.95, 'p99': 0.99}
+
+
+class LatencySketch:
+    """流式分位數草圖（分位數估計的相對誤差不超過 relative_accuracy）"""
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float) -> None:
+        """加入一個樣本"""
+        if value <= self.min_value:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'LatencySketch') -> None:
+        """合併另一個草圖（需相同精度）"""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估計分位數"""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """緊湊匯總（用於持久化）"""
+        summary = {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 4) if self.count else None,
+            'min': round(self.min, 4) if self.min is not None else None,
+            'max': round(self.max, 4) if self.max is not None else None
+        }
+        for name, q in QUANTILES.items():
+            value = self.quantile(q)
+            summary[name] = round(value, 4) if value is not None else None
+        return summary
+
+
+class LatencyTracker:
+    """每個 Agent 的延遲追蹤（每分鐘一個草圖，窗口內合併計算分位數）"""
+
+    def __init__(self, window_minutes: int = 5, min_samples: int = 10):
+        self.window_minutes = window_minutes
+        self.min_samples = min_samples
+
+        self._minutes = {}      # agent_id -> deque[(minute, LatencySketch)]
+        self._completed = []    # 已結束分鐘的匯總，等待持久化
+        self._lock = threading.Lock()
+
+    def record(self, agent_id: str, latency: float, timestamp: datetime = None) -> None:
+        """記錄一次探測延遲（秒）"""
+        minute = (timestamp or datetime.now(HK_TZ)).replace(second=0, microsecond=0)
+
+        with self._lock:
+            minutes = self._minutes.setdefault(agent_id, deque())
+
+            if not minutes or minutes[-1][0] != minute:
+                # 上一分鐘結束，加入待持久化匯總
+                if minutes:
+                    self._complete(agent_id, *minutes[-1])
+                minutes.append((minute, LatencySketch()))
+
+            while minutes and minutes[0][0] <= minute - timedelta(minutes=self.window_minutes):
+                minutes.popleft()
+
+            minutes[-1][1].add(latency)
+
+    def _complete(self, agent_id: str, minute: datetime, sketch: LatencySketch) -> None:
+        """記錄已結束分鐘的匯總"""
+        summary = sketch.summary()
+        summary['agent_id'] = agent_id
+        summary['minute'] = minute
+        self._completed.append(summary)
+
+    def window_sketch(self, agent_id: str, now: datetime = None) -> LatencySketch:
+        """合併滑動窗口內的草圖"""
+        now = now or datetime.now(HK_TZ)
+        start = now.replace(second=0, microsecond=0) - timedelta(minutes=self.window_minutes - 1)
+        merged = LatencySketch()
+
+        with self._lock:
+            for minute, sketch in self._minutes.get(agent_id, ()):
+                if minute >= start:
+                    merged.merge(sketch)
+
+        return merged
+
+    def window_quantiles(self, agent_id: str, now: datetime = None) -> Dict[str, Any]:
+        """滑動窗口內的分位數"""
+        return self.window_sketch(agent_id, now).summary()
+
+    def check_slo(self, agent_id: str, slo: Dict[str, float], now: datetime = None) -> Optional[Dict[str, Any]]:
+        """檢查窗口分位數是否超出 SLO（樣本不足時不判斷）"""
+        summary = self.window_quantiles(agent_id, now)
+        if summary['count'] < self.min_samples:
+            return None
+
+        for name in ('p99', 'p95'):
+            threshold = slo.get(name)
+            if threshold is not None and summary[name] > threshold:
+                return {
+                    'agent_id': agent_id,
+                    'percentile': name,
+                    'value': summary[name],
+                    'threshold': threshold,
+                    'window_minutes': self.window_minutes,
+                    'summary': summary
+                }
+
+        return None
+
+    def flush_summaries(self) -> List[Dict[str, Any]]:
+        """取出已結束分鐘的匯總"""
+        with self._lock:
+            completed, self._completed = self._completed, []
+        return completed
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+測試熔斷器和共享健康登記表
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/heartbeat')
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN
+from health_registry import HealthRegistry
+
+
+def failing():
+    raise ConnectionError("agent down")
+
+
+def ok():
+    return "ok"
+
+
+def test_open_and_fail_fast():
+    """測試達到閾值後熔斷並快速失敗"""
+    breaker = CircuitBreaker('chat', fail_threshold=3, reset_timeout=60)
+
+    for _ in range(3):
+        try:
+            breaker.call(failing)
+        except ConnectionError:
+            pass
+    assert breaker.state == OPEN
+
+    calls = []
+    start = time.monotonic()
+    try:
+        breaker.call(lambda: calls.append(1))
+        assert False, "應該快速失敗"
+    except CircuitOpenError as e:
+        assert e.retry_after > 59
+    assert calls == []
+    assert time.monotonic() - start < 0.01
+    print("  ✅ 熔斷和快速失敗正確")
+
+
+def test_half_open_probe():
+    """測試冷卻後半開：只放行一個探測，成功恢復，失敗重新熔斷"""
+    breaker = CircuitBreaker('coding', fail_threshold=1, reset_timeout=0.05)
+
+    try:
+        breaker.call(failing)
+    except ConnectionError:
+        pass
+    time.sleep(0.06)
+
+    # 探測失敗：重新熔斷
+    try:
+        breaker.call(failing)
+    except ConnectionError:
+        pass
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.call(ok) == "ok"
+    assert breaker.state == CLOSED
+    print("  ✅ 半開探測正確")
+
+
+def test_registry_shared_state():
+    """測試 Heartbeat 寫入的故障狀態令其他進程的熔斷器直接熔斷"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "health.json"
+
+        # Heartbeat 進程寫入
+        writer = HealthRegistry(path)
+        writer.update('weather', status='timeout', fail_count=5, fail_threshold=5)
+
+        # 其他進程讀取
+        reader = HealthRegistry(path)
+        assert reader.is_down('weather')
+
+        breaker = CircuitBreaker('weather', registry=reader, reset_timeout=60)
+        try:
+            breaker.call(ok)
+            assert False, "應該快速失敗"
+        except CircuitOpenError:
+            pass
+
+        # 恢復後其他熔斷器不受影響
+        writer.update('weather', status='healthy', fail_count=0, fail_threshold=5)
+        assert not reader.is_down('weather')
+        assert CircuitBreaker('weather', registry=reader).call(ok) == "ok"
+    print("  ✅ 共享健康狀態正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("熔斷器測試")
+    print("=" * 60)
+    print()
+
+    test_open_and_fail_fast()
+    test_half_open_probe()
+    test_registry_shared_state()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+測試 Heartbeat 並發探測和自適應間隔
+"""
+
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/heartbeat')
+
+from heartbeat_manager import HeartbeatManager, MIN_INTERVAL
+from health_registry import HealthRegistry
+
+REGISTRY_DIR = tempfile.mkdtemp()
+
+
+def make_manager():
+    """創建使用臨時健康登記表的管理器"""
+    manager = HeartbeatManager()
+    manager.registry = HealthRegistry(Path(REGISTRY_DIR) / "health.json")
+    return manager
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """模擬 keep-alive 連接（每個請求固定延遲）"""
+
+    def __init__(self, delay, failing=()):
+        self.delay = delay
+        self.failing = failing
+
+    def get(self, url, timeout):
+        time.sleep(self.delay)
+        port = int(url.split(':')[2].split('/')[0])
+        return FakeResponse(500 if port in self.failing else 200)
+
+
+def test_concurrent_probes():
+    """測試所有 Agents 並發探測"""
+    manager = make_manager()
+    manager.session = FakeSession(delay=0.2, failing=(8003,))
+
+    start = time.monotonic()
+    results = manager.check_all_agents()
+    elapsed = time.monotonic() - start
+
+    # 5 個 Agents 各 0.2 秒，順序探測需要 1 秒
+    assert len(results) == 5
+    assert elapsed < 0.6
+    assert [r['status'] for r in results if r['agent_id'] == 'system-admin'] == ['unhealthy']
+    print(f"  ✅ 並發探測正確（{elapsed:.2f}s）")
+
+
+def test_adaptive_interval():
+    """測試故障後加快探測、健康後退回配置間隔"""
+    manager = make_manager()
+    healthy = {'status': 'healthy'}
+    failed = {'status': 'timeout'}
+
+    # main 配置間隔 30 秒
+    assert manager.next_interval('main', failed) == max(MIN_INTERVAL, 7.5)
+    assert manager.next_interval('main', healthy) == 15
+    assert manager.next_interval('main', healthy) == 30
+    assert manager.next_interval('main', healthy) == 30
+
+    # 抖動只會縮短間隔
+    for _ in range(100):
+        assert 27 <= manager.next_delay('main', healthy) <= 30
+    print("  ✅ 自適應間隔正確")
+
+
+def test_independent_scheduling():
+    """測試每個 Agent 按自己的間隔調度"""
+    manager = make_manager()
+    manager.session = FakeSession(delay=0)
+    for agent in manager.agents.values():
+        agent['interval'] = 0.05
+    manager.agents['weather']['interval'] = 1
+
+    counts = {}
+
+    def on_result(result):
+        counts[result['agent_id']] = counts.get(result['agent_id'], 0) + 1
+
+    async def run():
+        task = asyncio.create_task(manager.run_forever(on_result))
+        await asyncio.sleep(0.5)
+        manager.stop()
+        await asyncio.wait_for(task, timeout=2)
+
+    asyncio.run(run())
+
+    assert counts['main'] >= 5
+    assert counts['weather'] == 1
+    print("  ✅ 獨立調度正確")
+
+
+def test_slow_alert_does_not_block_loop():
+    """測試一個 Agent 的 SLO 警報發送緩慢時，不阻塞其他 Agents 的探測"""
+    manager = make_manager()
+    manager.session = FakeSession(delay=0)
+    for agent in manager.agents.values():
+        agent['interval'] = 0.05
+    manager.agents['weather']['interval'] = 1
+
+    def slow_slo_check(agent_id):
+        if agent_id == 'weather':
+            time.sleep(0.4)
+
+    manager.check_latency_slo = slow_slo_check
+    counts = {}
+
+    def on_result(result):
+        counts[result['agent_id']] = counts.get(result['agent_id'], 0) + 1
+
+    async def run():
+        task = asyncio.create_task(manager.run_forever(on_result))
+        await asyncio.sleep(0.5)
+        manager.stop()
+        await asyncio.wait_for(task, timeout=2)
+
+    asyncio.run(run())
+
+    assert counts['main'] >= 5
+    print("  ✅ 警報發送不阻塞事件循環")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("Heartbeat 調度測試")
+    print("=" * 60)
+    print()
+
+    test_concurrent_probes()
+    test_adaptive_interval()
+    test_independent_scheduling()
+    test_slow_alert_does_not_block_loop()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
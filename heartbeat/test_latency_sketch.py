@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+測試延遲分位數草圖和 SLO 檢查
+"""
+
+import sys
+import random
+from datetime import datetime, timedelta
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/heartbeat')
+
+from latency_sketch import LatencySketch, LatencyTracker, HK_TZ
+from heartbeat_manager import HeartbeatManager
+
+
+def test_sketch_accuracy():
+    """測試分位數相對誤差在 1% 內"""
+    rng = random.Random(42)
+    values = [rng.lognormvariate(-2, 0.8) for _ in range(20000)]
+
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.011
+
+    # 草圖大小與樣本數無關
+    assert len(sketch.buckets) < 1000
+    print("  ✅ 分位數精度正確")
+
+
+def test_minute_summaries():
+    """測試按分鐘匯總"""
+    tracker = LatencyTracker(window_minutes=5)
+    start = datetime(2026, 3, 1, 9, 0, 10, tzinfo=HK_TZ)
+
+    for i in range(3):
+        for _ in range(10):
+            tracker.record('main', 0.1 * (i + 1), start + timedelta(minutes=i))
+
+    summaries = tracker.flush_summaries()
+    assert [s['minute'].minute for s in summaries] == [0, 1]
+    assert summaries[1]['count'] == 10
+    assert abs(summaries[1]['p95'] - 0.2) < 0.003
+    assert tracker.flush_summaries() == []
+    print("  ✅ 分鐘匯總正確")
+
+
+def test_slo_window():
+    """測試滑動窗口 SLO（單個慢樣本不觸發）"""
+    tracker = LatencyTracker(window_minutes=5, min_samples=10)
+    now = datetime(2026, 3, 1, 9, 10, tzinfo=HK_TZ)
+    slo = {'p95': 1.0, 'p99': 2.0}
+
+    tracker.record('chat', 5.0, now)
+    assert tracker.check_slo('chat', slo, now) is None
+
+    for _ in range(19):
+        tracker.record('chat', 0.2, now)
+    assert tracker.check_slo('chat', slo, now) is None
+
+    for _ in range(5):
+        tracker.record('chat', 1.5, now)
+    breach = tracker.check_slo('chat', slo, now)
+    assert breach['percentile'] == 'p95'
+
+    # 窗口過後舊樣本不再計入
+    later = now + timedelta(minutes=6)
+    assert tracker.check_slo('chat', slo, later) is None
+    print("  ✅ SLO 窗口正確")
+
+
+class FakeAlertManager:
+    def __init__(self):
+        self.sent = []
+
+    def send_alert(self, alert_type, **kwargs):
+        self.sent.append((alert_type, kwargs))
+        return {'alert_type': alert_type}
+
+
+def test_agent_slow_alert():
+    """測試超出 SLO 時發出一次 agent_slow 警報"""
+    manager = HeartbeatManager()
+    manager.alert_manager = FakeAlertManager()
+
+    for _ in range(20):
+        manager.latency.record('main', 2.5)
+
+    assert manager.check_latency_slo('main') == {'alert_type': 'agent_slow'}
+    assert manager.check_latency_slo('main') is None
+
+    alert_type, kwargs = manager.alert_manager.sent[0]
+    assert alert_type == 'agent_slow'
+    assert kwargs['percentile'] == 'p99'
+    assert kwargs['threshold'] == 2.0
+    print("  ✅ agent_slow 警報正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("延遲分位數測試")
+    print("=" * 60)
+    print()
+
+    test_sketch_accuracy()
+    test_minute_summaries()
+    test_slo_window()
+    test_agent_slow_alert()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+香港天文台多站點實時天氣快照
+把 rhrread 的各站溫度、各區雨量轉成列式 NumPy 數組，一次過評估所有站點的警報規則
+"""
+
+import json
+import urllib.request
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+RHRREAD_URL = "https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=rhrread&lang=tc"
+
+# 站點警報規則：(alert_type, 欄位, 方向, 閾值, 嚴重級別, 嚴重閾值)
+STATION_RULES = [
+    ('heat_warning', 'temperature', 'above', 33.0, 'high', 35.0),
+    ('cold_warning', 'temperature', 'below', 12.0, 'moderate', 7.0),
+    ('rainstorm_warning', 'rainfall', 'above', 30.0, 'high', 50.0)
+]
+
+ALERT_TITLES = {
+    'heat_warning': '酷熱天氣',
+    'cold_warning': '寒冷天氣',
+    'rainstorm_warning': '大雨'
+}
+
+FIELD_UNITS = {
+    'temperature': '°C',
+    'rainfall': 'mm'
+}
+
+
+def fetch_rhrread(timeout: int = 10) -> Optional[Dict[str, Any]]:
+    """獲取香港天文台 rhrread 數據"""
+    try:
+        with urllib.request.urlopen(RHRREAD_URL, timeout=timeout) as response:
+            return json.loads(response.read())
+    except Exception as e:
+        print(f"❌ 獲取實時天氣失敗: {e}")
+        return None
+
+
+def _parse_time(value: Optional[str]) -> datetime:
+    """解析 HKO 時間字符串（失敗時使用當前時間）"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.now(HK_TZ)
+
+
+def _column(entries: List[Dict[str, Any]], key: str) -> np.ndarray:
+    """把列表中的數值欄位轉成 float64 數組（缺失值為 NaN）"""
+    return np.fromiter(
+        (entry.get(key) if isinstance(entry.get(key), (int, float)) else np.nan for entry in entries),
+        dtype=np.float64,
+        count=len(entries)
+    )
+
+
+class StationSnapshot:
+    """rhrread 多站點快照（列式存儲）
+
+    places 為溫度站與雨量分區的並集（已排序），temperature / rainfall
+    與 places 按位置對齊，沒有該項數據的地點為 NaN。
+    """
+
+    def __init__(self, places: np.ndarray, temperature: np.ndarray, rainfall: np.ndarray,
+                 observation_time: datetime, humidity: Optional[float] = None):
+        self.places = places
+        self.temperature = temperature
+        self.rainfall = rainfall
+        self.observation_time = observation_time
+        self.humidity = humidity
+        self._index = {place: i for i, place in enumerate(places.tolist())}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'StationSnapshot':
+        """從 rhrread 數據建立快照"""
+        payload = payload or {}
+
+        temp_data = (payload.get('temperature') or {}).get('data') or []
+        rain_data = (payload.get('rainfall') or {}).get('data') or []
+        humidity_data = (payload.get('humidity') or {}).get('data') or []
+
+        temp_places = np.array([entry.get('place', '') for entry in temp_data], dtype=str)
+        rain_places = np.array([entry.get('place', '') for entry in rain_data], dtype=str)
+        temp_values = _column(temp_data, 'value')
+        rain_values = _column(rain_data, 'max')
+
+        # 溫度站和雨量分區名稱不同，合併成同一地點軸
+        places = np.union1d(temp_places, rain_places)
+
+        temperature = np.full(len(places), np.nan)
+        rainfall = np.full(len(places), np.nan)
+        if len(temp_places):
+            temperature[np.searchsorted(places, temp_places)] = temp_values
+        if len(rain_places):
+            rainfall[np.searchsorted(places, rain_places)] = rain_values
+
+        humidity = humidity_data[0].get('value') if humidity_data else None
+        observation_time = _parse_time(
+            (payload.get('temperature') or {}).get('recordTime') or payload.get('updateTime')
+        )
+
+        return cls(places, temperature, rainfall, observation_time, humidity)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def evaluate_alerts(self, rules: List[tuple] = STATION_RULES) -> List[Dict[str, Any]]:
+        """對所有站點評估警報規則（每條規則一次數組比較）"""
+        alerts = []
+
+        with np.errstate(invalid='ignore'):
+            for alert_type, field, direction, threshold, severity, severe_threshold in rules:
+                values = getattr(self, field)
+
+                if direction == 'above':
+                    mask = values >= threshold
+                    severe = values > severe_threshold
+                else:
+                    mask = values <= threshold
+                    severe = values < severe_threshold
+
+                hits = np.flatnonzero(mask)
+                if not len(hits):
+                    continue
+
+                alerts.append(self._make_alert(alert_type, field, severity, hits, severe[hits]))
+
+        return alerts
+
+    def _make_alert(self, alert_type: str, field: str, severity: str,
+                    hits: np.ndarray, severe: np.ndarray) -> Dict[str, Any]:
+        """把命中的站點合併成一個警報"""
+        values = getattr(self, field)[hits]
+        places = self.places[hits].tolist()
+        worst = int(np.argmax(values)) if alert_type != 'cold_warning' else int(np.argmin(values))
+        unit = FIELD_UNITS[field]
+
+        return {
+            'alert_type': alert_type,
+            'severity': 'severe' if severe.any() else severity,
+            'title': f"{ALERT_TITLES[alert_type]}（{len(places)} 個地區）",
+            'description': (
+                f"{'、'.join(places)}錄得{ALERT_TITLES[alert_type]}。"
+                f"最極端為{places[worst]}：{values[worst]:g}{unit}。"
+            ),
+            'effect_start_time': self.observation_time,
+            'metadata': {
+                'field': field,
+                'places': places,
+                'values': values.tolist()
+            }
+        }
+
+    def find_places(self, text: str) -> List[str]:
+        """找出文字中提到的地點（支持省略「區」字）"""
+        found = []
+        for place in self._index:
+            short = place[:-1] if place.endswith('區') and len(place) > 2 else place
+            if place in text or short in text:
+                found.append(place)
+        return found
+
+    def lookup(self, place: str) -> Optional[Dict[str, Any]]:
+        """查詢單個地點的讀數"""
+        i = self._index.get(place)
+        if i is None:
+            return None
+
+        return {
+            'place': place,
+            'temperature': None if np.isnan(self.temperature[i]) else float(self.temperature[i]),
+            'rainfall': None if np.isnan(self.rainfall[i]) else float(self.rainfall[i]),
+            'observation_time': self.observation_time
+        }
+
+    def to_weather_rows(self, source: str = 'HKO') -> List[Dict[str, Any]]:
+        """轉成 weather_data 批量寫入的行（每個地點一行）"""
+        stamp = self.observation_time.strftime('%Y%m%d%H%M')
+        temperature = np.where(np.isnan(self.temperature), None, self.temperature).tolist()
+        rainfall = np.where(np.isnan(self.rainfall), None, self.rainfall).tolist()
+
+        return [
+            {
+                'data_id': f"rhrread_{place}_{stamp}",
+                'observation_time': self.observation_time,
+                'temperature': temperature[i],
+                'humidity': None,
+                'rainfall': rainfall[i],
+                'wind_speed': None,
+                'wind_direction': None,
+                'weather_condition': None,
+                'location': place,
+                'source': source,
+                'metadata': {'dataset': 'rhrread'}
+            }
+            for i, place in enumerate(self.places.tolist())
+        ]
+
+
+def main():
+    """主函數 - 測試多站點快照"""
+    print("=" * 60)
+    print("多站點實時天氣快照測試")
+    print("=" * 60)
+    print()
+
+    payload = fetch_rhrread()
+    if payload is None:
+        print("無法獲取實時天氣")
+        return
+
+    snapshot = StationSnapshot.from_payload(payload)
+    print(f"地點數量：{len(snapshot)}")
+    print(f"觀測時間：{snapshot.observation_time.strftime('%Y-%m-%d %H:%M')}")
+    print()
+
+    alerts = snapshot.evaluate_alerts()
+    if alerts:
+        for alert in alerts:
+            print(f"⚠️  {alert['title']} ({alert['severity']})")
+            print(f"   {alert['description']}")
+    else:
+        print("✅ 所有地點無警報")
+
+
+if __name__ == "__main__":
+    main()
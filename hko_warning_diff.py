@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+香港天文台警告摘要差異引擎
+比較 warnsum 快照，只輸出發出、升級、降級、取消事件
+"""
+
+import os
+import json
+import urllib.request
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_STATE_FILE = WORKSPACE / "weather" / "warnsum_state.json"
+
+WARNSUM_URL = "https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=warnsum&lang=tc"
+
+# 警告信號等級（同一類警告內比較升級 / 降級）
+WARNING_LEVELS = {
+    'WRAINA': 1, 'WRAINR': 2, 'WRAINB': 3,
+    'WFIREY': 1, 'WFIRER': 2,
+    'TC1': 1, 'TC3': 3,
+    'TC8NE': 8, 'TC8SE': 8, 'TC8SW': 8, 'TC8NW': 8,
+    'TC9': 9, 'TC10': 10
+}
+
+# 警告類別對應的 alert_type
+ALERT_TYPES = {
+    'WTCSGNL': 'typhoon_warning',
+    'WRAIN': 'rainstorm_warning',
+    'WHOT': 'heat_warning',
+    'WCOLD': 'cold_warning',
+    'WMSGNL': 'monsoon_warning',
+    'WTS': 'thunderstorm_warning',
+    'WFIRE': 'fire_danger_warning',
+    'WFROST': 'frost_warning',
+    'WL': 'landslip_warning',
+    'WFNTSA': 'flooding_warning',
+    'WTMW': 'tsunami_warning'
+}
+
+# 事件對應的嚴重級別
+EVENT_SEVERITY = {
+    'issued': 'high',
+    'upgraded': 'severe',
+    'downgraded': 'moderate',
+    'cancelled': 'low'
+}
+
+
+def fetch_warning_summary(timeout: int = 10) -> Optional[Dict[str, Any]]:
+    """獲取香港天文台 warnsum 數據"""
+    try:
+        with urllib.request.urlopen(WARNSUM_URL, timeout=timeout) as response:
+            return json.loads(response.read())
+    except Exception as e:
+        print(f"❌ 獲取警告摘要失敗: {e}")
+        return None
+
+
+def normalize_warnsum(payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """把 warnsum 數據轉成 {警告類別: 狀態}（已取消的警告不計入）"""
+    snapshot = {}
+
+    for key, warning in (payload or {}).items():
+        if not isinstance(warning, dict):
+            continue
+        if warning.get('actionCode') == 'CANCEL':
+            continue
+
+        code = warning.get('code') or key
+        snapshot[key] = {
+            'code': code,
+            'name': warning.get('name', key),
+            'level': WARNING_LEVELS.get(code, 1),
+            'issue_time': warning.get('issueTime'),
+            'update_time': warning.get('updateTime')
+        }
+
+    return snapshot
+
+
+class WarningDiffEngine:
+    """警告摘要差異引擎（有狀態，持久化到磁盤）"""
+
+    def __init__(self, state_file: Path = DEFAULT_STATE_FILE):
+        self.state_file = Path(state_file)
+        self.seq = 0
+        self.snapshot = {}
+        self._load_state()
+
+    def _load_state(self) -> None:
+        """加載上次接受的快照和序號"""
+        if not self.state_file.exists():
+            return
+
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.seq = state.get('seq', 0)
+            self.snapshot = state.get('snapshot', {})
+        except Exception as e:
+            print(f"[WARNSUM] 加載狀態失敗，重新開始: {e}")
+
+    def _save_state(self) -> None:
+        """保存快照（原子替換）"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_suffix('.tmp')
+
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'seq': self.seq,
+                'snapshot': self.snapshot,
+                'updated_at': datetime.now(HK_TZ).isoformat()
+            }, f, ensure_ascii=False, indent=2)
+
+        os.replace(tmp_file, self.state_file)
+
+    def diff(self, current: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """比較當前快照和上次接受的快照，返回變化事件（不修改狀態）"""
+        events = []
+        seq = self.seq
+
+        for key in sorted(set(self.snapshot) | set(current)):
+            previous = self.snapshot.get(key)
+            warning = current.get(key)
+
+            if previous and warning and previous['code'] == warning['code']:
+                continue
+
+            if previous is None:
+                event_type = 'issued'
+            elif warning is None:
+                event_type = 'cancelled'
+            elif warning['level'] > previous['level']:
+                event_type = 'upgraded'
+            elif warning['level'] < previous['level']:
+                event_type = 'downgraded'
+            else:
+                # 同級別不同信號（例如 8 號風球轉向）視為重新發出
+                event_type = 'issued'
+
+            seq += 1
+            state = warning or previous
+            events.append({
+                'seq': seq,
+                'event': event_type,
+                'warning': key,
+                'alert_type': ALERT_TYPES.get(key, 'special_weather'),
+                'code': warning['code'] if warning else None,
+                'previous_code': previous['code'] if previous else None,
+                'name': state['name'],
+                'level': warning['level'] if warning else 0,
+                'issue_time': state.get('issue_time'),
+                'detected_at': datetime.now(HK_TZ).isoformat()
+            })
+
+        return events
+
+    def accept(self, current: Dict[str, Dict[str, Any]], events: List[Dict[str, Any]]) -> None:
+        """接受新快照並持久化（下游處理完事件後調用）"""
+        if not events and current == self.snapshot:
+            return
+        if events:
+            self.seq = events[-1]['seq']
+        self.snapshot = current
+        self._save_state()
+
+    def poll(self, payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        處理一次 warnsum 數據，返回 (變化事件, 新快照)（不修改狀態）
+        下游成功處理事件後調用 accept(新快照, 事件)；處理失敗時不調用，下次輪詢會重新產生同樣的事件
+        """
+        current = normalize_warnsum(payload)
+        return self.diff(current), current
+
+
+def event_to_alert(event: Dict[str, Any]) -> Dict[str, Any]:
+    """把變化事件轉成警報格式"""
+    action = {
+        'issued': '發出',
+        'upgraded': '改發',
+        'downgraded': '改發',
+        'cancelled': '取消'
+    }[event['event']]
+
+    return {
+        'alert_id': f"warnsum_{event['warning']}_{event['seq']}",
+        'alert_type': event['alert_type'],
+        'severity': EVENT_SEVERITY[event['event']],
+        'title': f"{event['name']}（{action}）",
+        'description': f"香港天文台{action}{event['name']}。",
+        'effect_start_time': datetime.now(HK_TZ),
+        'metadata': {
+            'seq': event['seq'],
+            'event': event['event'],
+            'code': event['code'],
+            'previous_code': event['previous_code'],
+            'issue_time': event['issue_time']
+        }
+    }
+
+
+def main():
+    """主函數 - 測試差異引擎"""
+    print("=" * 60)
+    print("警告摘要差異引擎測試")
+    print("=" * 60)
+    print()
+
+    payload = fetch_warning_summary()
+    if payload is None:
+        print("無法獲取警告摘要")
+        return
+
+    engine = WarningDiffEngine()
+    events, current = engine.poll(payload)
+
+    if events:
+        print(f"檢測到 {len(events)} 個變化：")
+        for event in events:
+            print(f"  #{event['seq']} {event['event']}: {event['name']} ({event['code']})")
+    else:
+        print("警告無變化")
+
+    engine.accept(current, events)
+
+
+if __name__ == "__main__":
+    main()
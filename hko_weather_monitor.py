@@ -11,6 +11,13 @@ import urllib.request
 import urllib.parse
 from typing import Dict, List, Any
 
+from hko_warning_diff import WarningDiffEngine, fetch_warning_summary, event_to_alert
+try:
+    from hko_station_snapshot import StationSnapshot, fetch_rhrread
+except ImportError:
+    # 多站點快照需要 NumPy（可選依賴）；未安裝時只使用單站天氣
+    StationSnapshot = fetch_rhrread = None
+
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
@@ -23,6 +30,14 @@ class HKOWeatherMonitor:
         self.current_weather = {}
         self.last_alert_time = {}
         self.alert_history = []
+        
+        # 警告摘要差異引擎（狀態持久化，重啟後不重複發送）
+        self.warning_engine = WarningDiffEngine()
+        # 已產生但未保存的警告變化：(新快照, 事件, 警報)
+        self.pending_warning_changes = None
+        
+        # 多站點快照（rhrread 各站溫度、各區雨量）
+        self.station_snapshot = None
 
     def get_current_weather(self) -> Dict[str, Any]:
         """獲取當前天氣（使用公開端點）"""
@@ -104,45 +119,90 @@ class HKOWeatherMonitor:
         
         return None
 
-    def check_typhoon_warning(self) -> Dict[str, Any]:
-        """檢查颱風警告（從 warning message）"""
+    def check_warning_changes(self) -> List[Dict[str, Any]]:
+        """檢查警告摘要變化（只返回發出、升級、降級、取消的警告，包括颱風信號）"""
+        payload = fetch_warning_summary()
+        if payload is None:
+            return []
+        
+        events, current = self.warning_engine.poll(payload)
+        alerts = [event_to_alert(event) for event in events]
+        self.alert_history.extend(alerts)
+        
+        # 保存成功後才接受新快照（見 accept_warning_changes）
+        self.pending_warning_changes = (current, events, alerts)
+        
+        return alerts
+
+    def save_warning_alerts(self, alerts: List[Dict[str, Any]]) -> bool:
+        """把警告變化寫入 weather_alerts"""
         try:
-            url = f"{self.base_url}/weatherAPI/opendata/hko-opendata.json"
-            params = urllib.parse.urlencode({"dataType": "WARN", "lang": "tc"}).encode('utf-8')
-            req = urllib.request.Request(url, data=params, method='GET')
+            import sys
+            sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+            from agent_db_connector import PostgreSQLConnector
+            from weather_db_operations import WeatherDatabase
             
-            with urllib.request.urlopen(req, timeout=30) as response:
-                data = json.loads(response.read())
-                
-                # 檢查是否包含颱風相關關鍵詞
-                warnings = []
-                
-                if isinstance(data, dict) and 'warningMessage' in data:
-                    warning_message = data['warningMessage']
-                    
-                    typhoon_keywords = ['颱風', '熱帶氣旋', '熱帶風暴']
-                    if any(keyword in warning_message for keyword in typhoon_keywords):
-                        alert = {
-                            'alert_type': 'typhoon_warning',
-                            'severity': 'severe',
-                            'title': '颱風警告',
-                            'description': f"香港天文台發出颱風警告：{warning_message}",
-                            'effect_start_time': datetime.now(HK_TZ),
-                            'metadata': {
-                                'warning_message': warning_message,
-                                'condition': '颱風'
-                            }
-                        }
-                        
-                        if self.should_send_alert('typhoon_warning', 'severe'):
-                            self.alert_history.append(alert)
-                            return alert
-                
-                return None
+            return WeatherDatabase(PostgreSQLConnector()).save_warning_alerts(alerts)
+        except Exception as e:
+            print(f"❌ 保存警告變化失敗: {e}")
+            return False
+
+    def accept_warning_changes(self) -> bool:
+        """保存警告變化並接受新快照（保存失敗時不接受，下次輪詢重新產生同樣的事件）"""
+        if self.pending_warning_changes is None:
+            return True
+        
+        current, events, alerts = self.pending_warning_changes
+        if alerts and not self.save_warning_alerts(alerts):
+            return False
+        
+        self.warning_engine.accept(current, events)
+        self.pending_warning_changes = None
+        return True
+
+    def update_station_snapshot(self) -> bool:
+        """獲取 rhrread 並更新多站點快照（未安裝 NumPy 時不更新）"""
+        if StationSnapshot is None:
+            return False
+        
+        payload = fetch_rhrread()
+        if payload is None:
+            return False
+        
+        self.station_snapshot = StationSnapshot.from_payload(payload)
+        return True
+
+    def check_station_alerts(self) -> List[Dict[str, Any]]:
+        """對所有站點評估警報（向量化，一次過處理）"""
+        if self.station_snapshot is None:
+            return []
+        
+        alerts = []
+        for alert in self.station_snapshot.evaluate_alerts():
+            if self.should_send_alert(f"station_{alert['alert_type']}", alert['severity']):
+                self.alert_history.append(alert)
+                alerts.append(alert)
+        
+        return alerts
+
+    def save_station_snapshot(self) -> bool:
+        """批量保存各站點讀數到 weather_data 表"""
+        if self.station_snapshot is None:
+            return False
+        
+        try:
+            import sys
+            sys.path.insert(0, '/home/jarvis/.openclaw/workspace/database')
+            from agent_db_connector import PostgreSQLConnector
+            from weather_db_operations import WeatherDatabase
             
+            weather_db = WeatherDatabase(PostgreSQLConnector())
+            statuses = weather_db.save_weather_data_bulk(self.station_snapshot.to_weather_rows())
+            
+            return all(status['status'] != 'error' for status in statuses)
         except Exception as e:
-            print(f"❌ 獲取颱風警告失敗: {e}")
-            return None
+            print(f"❌ 保存站點數據失敗: {e}")
+            return False
 
     def check_strong_wind_warning(self) -> Dict[str, Any]:
         """檢查強風警告（> 40 km/h）"""
@@ -192,11 +252,10 @@ class HKOWeatherMonitor:
             alerts.append(rain_alert)
             print(f"🌧 檢測到暴雨警告：{self.current_weather['rainfall']}mm/h")
         
-        # 3. 檢查颱風
-        typhoon_alert = self.check_typhoon_warning()
-        if typhoon_alert:
-            alerts.append(typhoon_alert)
-            print(f"🌀 檢測到颱風警告")
+        # 3. 檢查警告摘要變化（颱風、暴雨信號等）
+        for warning_alert in self.check_warning_changes():
+            alerts.append(warning_alert)
+            print(f"🌀 警告變化：{warning_alert['title']}")
         
         # 4. 檢查強風
         wind_alert = self.check_strong_wind_warning()
@@ -204,6 +263,11 @@ class HKOWeatherMonitor:
             alerts.append(wind_alert)
             print(f"💨 檢測到強風警告：{self.current_weather['wind']}km/h")
         
+        # 5. 檢查各站點讀數
+        for station_alert in self.check_station_alerts():
+            alerts.append(station_alert)
+            print(f"📍 站點警報：{station_alert['title']}")
+        
         return alerts
 
     def should_send_alert(self, alert_type: str, severity: str) -> bool:
@@ -238,26 +302,40 @@ class HKOWeatherMonitor:
             
             db = AgentDatabase()
             
+            saved = True
             with db.db:
-                for alert in alerts:
-                    log_id = f"alert_{alert['alert_type']}_{int(datetime.now().timestamp())}"
+                for i, alert in enumerate(alerts):
+                    log_id = f"alert_{alert['alert_type']}_{int(datetime.now().timestamp())}_{i}"
                     
                     # 保存到 logs 表
-                    db.save_log(
+                    saved = db.save_log(
                         log_id=log_id,
                         level="WARNING" if alert['severity'] in ['high', 'severe'] else "INFO",
                         category="weather",
                         message=alert['description'],
                         agent_id="weather",
-                        context=alert,
+                        context=json.loads(json.dumps(alert, ensure_ascii=False, default=str)),
                         metadata={'alert_type': alert['alert_type'], 'severity': alert['severity']}
-                    )
+                    ) and saved
             
-            return True
+            return saved
         except Exception as e:
             print(f"❌ 保存警報到數據庫失敗: {e}")
             return False
 
+    def process_alerts(self) -> List[Dict[str, Any]]:
+        """檢查所有警報並保存（警告摘要和站點讀數不依賴當前天氣，獲取當前天氣失敗時照常檢查）"""
+        alerts = self.check_all_alerts()
+        
+        if alerts:
+            # 保存到數據庫（成功後才接受警告摘要的新快照）
+            if self.save_alerts_to_db(alerts):
+                self.accept_warning_changes()
+        else:
+            self.accept_warning_changes()
+        
+        return alerts
+
     def monitor(self):
         """持續監控"""
         print("=" * 60)
@@ -272,6 +350,10 @@ class HKOWeatherMonitor:
                 
                 self.current_weather = self.get_current_weather()
                 
+                # 更新多站點快照並批量保存
+                if self.update_station_snapshot():
+                    self.save_station_snapshot()
+                
                 if self.current_weather:
                     temp = self.current_weather.get('temperature', {}).get('value')
                     humidity = self.current_weather.get('humidity', {}).get('value')
@@ -285,20 +367,17 @@ class HKOWeatherMonitor:
                     print(f"   雨量：{rainfall}mm")
                     print(f"   風速：{wind_speed}km/h")
                     print()
-                    
-                    # 檢查所有警報
-                    alerts = self.check_all_alerts()
-                    
-                    if alerts:
-                        print(f"⚠️  檢測到 {len(alerts)} 個警報")
-                        
-                        # 保存到數據庫
-                        self.save_alerts_to_db(alerts)
-                    else:
-                        print("✅ 無警報")
                 else:
                     print("❌ 無法獲取天氣數據")
                 
+                # 檢查所有警報
+                alerts = self.process_alerts()
+                
+                if alerts:
+                    print(f"⚠️  檢測到 {len(alerts)} 個警報")
+                else:
+                    print("✅ 無警報")
+                
                 print()
                 print("-" * 40)
                 print()
@@ -335,29 +414,27 @@ def main():
     print()
     
     monitor.current_weather = monitor.get_current_weather()
+    monitor.update_station_snapshot()
     
     if monitor.current_weather:
         print("✅ 天氣數據獲取成功")
-        print()
-        
-        # 檢查所有警報
-        alerts = monitor.check_all_alerts()
-        
-        if alerts:
-            print(f"\n⚠️  檢測到 {len(alerts)} 個警報：\n")
-            
-            for i, alert in enumerate(alerts, 1):
-                print(f"{i}. {alert['title']} ({alert['severity']})")
-                print(f"   描述：{alert['description']}")
-                print(f"   時間：{alert['effect_start_time'].strftime('%Y-%m-%d %H:%M:%S')}")
-                print()
-                
-                # 保存到數據庫
-                monitor.save_alerts_to_db(alerts)
-        else:
-            print("✅ 無警報")
     else:
         print("❌ 無法獲取天氣數據")
+    print()
+    
+    # 檢查所有警報
+    alerts = monitor.process_alerts()
+    
+    if alerts:
+        print(f"\n⚠️  檢測到 {len(alerts)} 個警報：\n")
+        
+        for i, alert in enumerate(alerts, 1):
+            print(f"{i}. {alert['title']} ({alert['severity']})")
+            print(f"   描述：{alert['description']}")
+            print(f"   時間：{alert['effect_start_time'].strftime('%Y-%m-%d %H:%M:%S')}")
+            print()
+    else:
+        print("✅ 無警報")
     
     print()
     print("=" * 60)
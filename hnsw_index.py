@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+HNSW 近似最近鄰索引
+分層可導航小世界圖：鄰居列表用 int32 數組保存，距離用 NumPy 批量計算（餘弦距離）。
+支持增量插入、軟刪除、可調 M / ef，通過內存映射向量索引格式保存和加載
+"""
+
+import heapq
+import math
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from vector_index import VectorIndex, write_index, DEFAULT_INDEX_DIR
+
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 200
+DEFAULT_EF = 64
+
+# 保存到向量索引目錄的附加數組名稱
+LINKS0_ARRAY = "hnsw_links0"
+LEVELS_ARRAY = "hnsw_levels"
+UPPER_ARRAY = "hnsw_upper"
+DELETED_ARRAY = "hnsw_deleted"
+
+
+class HNSWIndex:
+    """HNSW 圖索引（向量先 L2 歸一化，距離 = 1 - 餘弦相似度）"""
+
+    def __init__(self, dim: int, M: int = DEFAULT_M, ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+                 ef: int = DEFAULT_EF, capacity: int = 1024, seed: int = 42):
+        self.dim = dim
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._level_mult = 1.0 / math.log(M)
+        self._rng = np.random.default_rng(seed)
+
+        self.count = 0
+        self.capacity = capacity
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.levels = np.zeros(capacity, dtype=np.int8)
+        # 第 0 層鄰居（每個節點最多 2M 個，-1 為空位）
+        self.links0 = np.full((capacity, self.M0), -1, dtype=np.int32)
+        # 上層鄰居：節點 → (層數, M) 數組，第 l 層在第 l-1 行
+        self.upper: Dict[int, np.ndarray] = {}
+        self.deleted = np.zeros(capacity, dtype=bool)
+
+        self.entry_point = -1
+        self.max_level = -1
+
+        # 訪問標記（每次搜索遞增，避免重置整個數組）
+        self._visited = np.zeros(capacity, dtype=np.uint32)
+        self._visit_tag = 0
+
+        # 元數據：加載的基礎索引按需讀取，新插入的保存在列表
+        self._base: Optional[VectorIndex] = None
+        self._base_count = 0
+        self._metadata: List[Dict[str, Any]] = []
+        self._mapped = False
+
+    def __len__(self) -> int:
+        """未刪除的節點數"""
+        return self.count - int(self.deleted[:self.count].sum())
+
+    # ---------- 存儲 ----------
+
+    def _ensure_capacity(self, needed: int):
+        """擴容（從 mmap 加載的索引第一次寫入時複製到內存）"""
+        if needed <= self.capacity and not self._mapped:
+            return
+
+        capacity = max(needed, self.capacity * 2 if needed > self.capacity else self.capacity)
+
+        def grow(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            return grown
+
+        self.vectors = grow(self.vectors, 0)
+        self.levels = grow(self.levels, 0)
+        self.links0 = grow(self.links0, -1)
+        self.deleted = grow(self.deleted, False)
+        self._visited = np.zeros(capacity, dtype=np.uint32)
+        self._visit_tag = 0
+        self.capacity = capacity
+        self._mapped = False
+
+    def get_metadata(self, node: int) -> Dict[str, Any]:
+        """節點元數據"""
+        if node < self._base_count:
+            return self._base.metadata(node)
+        return self._metadata[node - self._base_count]
+
+    def _neighbors(self, node: int, level: int) -> np.ndarray:
+        row = self.links0[node] if level == 0 else self.upper[node][level - 1]
+        return row[row >= 0]
+
+    def _set_neighbors(self, node: int, level: int, neighbors: List[int]):
+        row = self.links0[node] if level == 0 else self.upper[node][level - 1]
+        row[:] = -1
+        row[:len(neighbors)] = neighbors
+
+    # ---------- 搜索 ----------
+
+    def _next_tag(self) -> int:
+        self._visit_tag += 1
+        if self._visit_tag == np.iinfo(np.uint32).max:
+            self._visited[:] = 0
+            self._visit_tag = 1
+        return self._visit_tag
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        """在一層內搜索，返回按距離升序的 (距離, 節點)"""
+        tag = self._next_tag()
+        visited = self._visited
+        vectors = self.vectors
+
+        entry = np.asarray(entry_points, dtype=np.int64)
+        visited[entry] = tag
+        distances = 1.0 - vectors[entry] @ query
+
+        candidates = list(zip(distances.tolist(), entry.tolist()))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0] and len(results) >= ef:
+                break
+
+            neighbors = self._neighbors(node, level)
+            neighbors = neighbors[visited[neighbors] != tag]
+            if not len(neighbors):
+                continue
+            visited[neighbors] = tag
+
+            distances = 1.0 - vectors[neighbors] @ query
+            worst = -results[0][0]
+            if len(results) >= ef:
+                # 結果已滿時只保留比最差結果更近的鄰居
+                closer = distances < worst
+                distances, neighbors = distances[closer], neighbors[closer]
+
+            for d, n in zip(distances.tolist(), neighbors.tolist()):
+                if len(results) < ef or d < worst:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+                    worst = -results[0][0]
+
+        return sorted((-d, n) for d, n in results)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """啟發式選擇鄰居（優先保留不同方向的節點，不足時用最近的補齊）"""
+        if len(candidates) <= m:
+            return [n for _, n in candidates]
+
+        nodes = np.fromiter((n for _, n in candidates), dtype=np.int64, count=len(candidates))
+        distances = [d for d, _ in candidates]
+        # 候選之間的相似度一次算好
+        similarity = self.vectors[nodes] @ self.vectors[nodes].T
+
+        selected = []
+        discarded = []
+        # 每個候選與已選節點的最大相似度
+        closest = np.full(len(nodes), -np.inf, dtype=np.float32)
+
+        for i in range(len(nodes)):
+            if len(selected) >= m:
+                break
+            if 1.0 - closest[i] < distances[i]:
+                discarded.append(i)
+                continue
+            selected.append(i)
+            np.maximum(closest, similarity[i], out=closest)
+
+        for i in discarded:
+            if len(selected) >= m:
+                break
+            selected.append(i)
+
+        return nodes[selected].tolist()
+
+    def _connect(self, node: int, new: int, level: int):
+        """把新節點加入鄰居的列表（滿了則重新選擇）"""
+        cap = self.M0 if level == 0 else self.M
+        row = self.links0[node] if level == 0 else self.upper[node][level - 1]
+        size = int((row >= 0).sum())
+
+        if size < cap:
+            row[size] = new
+            return
+
+        candidates = np.append(row, new)
+        distances = 1.0 - self.vectors[candidates] @ self.vectors[node]
+        order = np.argsort(distances)
+        self._set_neighbors(node, level, self._select_neighbors(
+            list(zip(distances[order].tolist(), candidates[order].tolist())), cap
+        ))
+
+    def _normalize(self, vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if v.shape[0] != self.dim:
+            raise ValueError(f"向量維度 {v.shape[0]} 與索引維度 {self.dim} 不一致")
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def add(self, vector, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """增量插入，返回節點編號"""
+        v = self._normalize(vector)
+        self._ensure_capacity(self.count + 1)
+
+        node = self.count
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+
+        self.vectors[node] = v
+        self.levels[node] = level
+        if level > 0:
+            self.upper[node] = np.full((level, self.M), -1, dtype=np.int32)
+        self._metadata.append(metadata or {})
+        self.count += 1
+
+        if self.entry_point < 0:
+            self.entry_point = node
+            self.max_level = level
+            return node
+
+        # 上層貪心下降
+        entry = [self.entry_point]
+        for l in range(self.max_level, level, -1):
+            entry = [self._search_layer(v, entry, 1, l)[0][1]]
+
+        for l in range(min(level, self.max_level), -1, -1):
+            candidates = self._search_layer(v, entry, self.ef_construction, l)
+            neighbors = self._select_neighbors(candidates, self.M)
+            self._set_neighbors(node, l, neighbors)
+            for neighbor in neighbors:
+                self._connect(neighbor, node, l)
+            entry = [n for _, n in candidates]
+
+        if level > self.max_level:
+            self.entry_point = node
+            self.max_level = level
+
+        return node
+
+    def delete(self, node: int):
+        """軟刪除（節點仍參與圖導航，但不出現在結果中）"""
+        if not 0 <= node < self.count:
+            raise IndexError(node)
+        if self._mapped:
+            self._ensure_capacity(self.count)
+        self.deleted[node] = True
+
+    def search(self, query, top_k: int = 5, ef: Optional[int] = None) -> List[Tuple[int, float]]:
+        """返回最相似的 (節點, 餘弦相似度)"""
+        if self.entry_point < 0:
+            return []
+
+        q = self._normalize(query)
+        ef = max(ef or self.ef, top_k)
+
+        entry = [self.entry_point]
+        for l in range(self.max_level, 0, -1):
+            entry = [self._search_layer(q, entry, 1, l)[0][1]]
+
+        while True:
+            candidates = self._search_layer(q, entry, ef, 0)
+            results = [(n, 1.0 - d) for d, n in candidates if not self.deleted[n]]
+            # 刪除的節點太多時擴大搜索範圍
+            if len(results) >= top_k or ef >= self.count:
+                return results[:top_k]
+            ef = min(ef * 2, self.count)
+
+    # ---------- 保存 / 加載 ----------
+
+    def save(self, root: Path = DEFAULT_INDEX_DIR, quantize: bool = False, keep_versions: int = 2) -> str:
+        """保存為向量索引的新版本（圖結構作為附加數組），返回版本名"""
+        nodes = sorted(n for n in self.upper if n < self.count)
+        upper = (np.concatenate([self.upper[n] for n in nodes]) if nodes
+                 else np.zeros((0, self.M), dtype=np.int32))
+
+        return write_index(
+            self.vectors[:self.count],
+            [self.get_metadata(i) for i in range(self.count)],
+            root=root,
+            normalize=False,
+            quantize=quantize,
+            keep_versions=keep_versions,
+            extra={'hnsw': {
+                'M': self.M,
+                'ef_construction': self.ef_construction,
+                'ef': self.ef,
+                'entry_point': self.entry_point,
+                'max_level': self.max_level
+            }},
+            arrays={
+                LINKS0_ARRAY: self.links0[:self.count],
+                LEVELS_ARRAY: self.levels[:self.count],
+                UPPER_ARRAY: upper,
+                DELETED_ARRAY: self.deleted[:self.count]
+            }
+        )
+
+    @classmethod
+    def from_vector_index(cls, index: VectorIndex) -> 'HNSWIndex':
+        """從已打開的向量索引加載（向量和第 0 層鄰居保持 mmap，第一次寫入時才複製）"""
+        params = index.manifest.get('hnsw')
+        if params is None:
+            raise ValueError(f"向量索引 {index.version} 沒有 HNSW 圖")
+
+        hnsw = cls(index.dim, M=params['M'], ef_construction=params['ef_construction'],
+                   ef=params['ef'], capacity=max(index.count, 1))
+
+        if index.count:
+            hnsw.vectors = index.vectors
+            hnsw.links0 = index.load_array(LINKS0_ARRAY)
+            hnsw.levels = index.load_array(LEVELS_ARRAY)
+            hnsw.deleted = np.array(index.load_array(DELETED_ARRAY, mmap_mode=None))
+            hnsw._visited = np.zeros(index.count, dtype=np.uint32)
+
+            upper = index.load_array(UPPER_ARRAY, mmap_mode=None)
+            offset = 0
+            for node in np.flatnonzero(np.asarray(hnsw.levels) > 0).tolist():
+                level = int(hnsw.levels[node])
+                hnsw.upper[node] = upper[offset:offset + level].copy()
+                offset += level
+
+            hnsw._mapped = True
+
+        hnsw.count = index.count
+        hnsw.capacity = index.count
+        hnsw.entry_point = params['entry_point']
+        hnsw.max_level = params['max_level']
+        hnsw._base = index
+        hnsw._base_count = index.count
+        return hnsw
+
+    @classmethod
+    def load(cls, root: Path = DEFAULT_INDEX_DIR) -> 'HNSWIndex':
+        """加載當前版本"""
+        return cls.from_vector_index(VectorIndex.open(root))
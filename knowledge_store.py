@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+分段知識庫存儲
+每天一個 JSONL 分段文件 + 一個小的 manifest，寫入只涉及當天分段（臨時文件 + 原子重命名），
+讀取按分段流式迭代，可以只讀需要的日期。knowledge-base.md 只是從分段渲染出來的視圖（每天只追加當天的段落）
+"""
+
+import os
+import re
+import json
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_STORE_DIR = WORKSPACE / "knowledge"
+KB_FILE = WORKSPACE / "knowledge-base.md"
+
+MANIFEST_VERSION = 1
+
+_DATE_RE = re.compile(r'^## (\d{4}-\d{2}-\d{2})')
+
+
+def make_entry_id(category: str, heading: str) -> str:
+    """生成條目 ID（與 RAGCache 相同的格式）"""
+    category_clean = (category or '').lower().replace(' ', '-')
+    heading_clean = (heading or '').lower().replace(' ', '-')[:50]
+    return f"{category_clean}::{heading_clean}"
+
+
+def _atomic_write(path: Path, data: str):
+    """寫入臨時文件後原子重命名"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class KnowledgeStore:
+    """分段知識庫（segments/YYYY-MM-DD.jsonl + manifest.json）"""
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.segment_dir = self.root / "segments"
+        self.manifest_file = self.root / "manifest.json"
+        self._manifest = None
+        self._manifest_mtime = None
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        """manifest（文件變化時重新讀取）"""
+        try:
+            mtime = self.manifest_file.stat().st_mtime_ns
+        except OSError:
+            return {'version': MANIFEST_VERSION, 'segments': {}}
+
+        if self._manifest is None or mtime != self._manifest_mtime:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+
+        return self._manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        _atomic_write(self.manifest_file, json.dumps(manifest, ensure_ascii=False, indent=2))
+        self._manifest = None
+
+    def segments(self) -> List[str]:
+        """所有分段日期（升序）"""
+        return sorted(self.manifest['segments'])
+
+    def _segment_path(self, date: str) -> Path:
+        return self.segment_dir / f"{date}.jsonl"
+
+    def _normalize(self, date: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        category = entry.get('category') or 'uncategorized'
+        heading = entry.get('heading', '')
+        return {
+            'id': entry.get('id') or make_entry_id(category, heading),
+            'date': date,
+            'category': category,
+            'heading': heading,
+            'summary': entry.get('summary', ''),
+            'content': entry.get('content', ''),
+            'tags': list(entry.get('tags') or [])
+        }
+
+    def write_segment(self, date: str, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """寫入（替換）某天的分段，其他分段不受影響"""
+        lines = [json.dumps(self._normalize(date, entry), ensure_ascii=False) for entry in entries]
+        data = "\n".join(lines) + ("\n" if lines else "")
+
+        _atomic_write(self._segment_path(date), data)
+
+        info = {
+            'file': self._segment_path(date).name,
+            'count': len(lines),
+            'bytes': len(data.encode('utf-8')),
+            'sha256': hashlib.sha256(data.encode('utf-8')).hexdigest()[:16],
+            'updated_at': datetime.now().isoformat()
+        }
+
+        manifest = dict(self.manifest)
+        manifest['segments'] = {**manifest['segments'], date: info}
+        manifest['updated_at'] = info['updated_at']
+        self._save_manifest(manifest)
+
+        return info
+
+    def append(self, date: str, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """把條目追加到某天的分段（同 ID 條目以新的為準）"""
+        merged = {entry['id']: entry for entry in self.iter_entries(dates=[date])}
+        for entry in entries:
+            entry = self._normalize(date, entry)
+            merged[entry['id']] = entry
+        return self.write_segment(date, merged.values())
+
+    def iter_entries(self, dates: Optional[Iterable[str]] = None,
+                     since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """按分段流式讀取條目（可指定日期列表或日期範圍）"""
+        known = self.segments()
+        selected = known if dates is None else [d for d in sorted(set(dates)) if d in self.manifest['segments']]
+
+        for date in selected:
+            if since and date < since:
+                continue
+            if until and date > until:
+                continue
+
+            try:
+                with open(self._segment_path(date), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+            except FileNotFoundError:
+                continue
+
+    def count(self) -> int:
+        """條目總數（只讀 manifest）"""
+        return sum(info['count'] for info in self.manifest['segments'].values())
+
+    def _render_day(self, date: str) -> tuple:
+        """渲染某天的視圖段落，返回 (文本, 條目數)"""
+        categorized = {}
+        total = 0
+        for entry in self.iter_entries(dates=[date]):
+            categorized.setdefault(entry['category'], []).append(entry)
+            total += 1
+
+        lines = [f"## {date}", ""]
+        for category, entries in categorized.items():
+            lines.append(f"### {category.upper()}")
+            lines.append("")
+
+            for entry in entries:
+                lines.append(f"#### {entry['heading']}")
+                lines.append(f"**摘要：** {entry['summary'] or entry['heading'][:50]}")
+                lines.append(f"**分類：** {entry['category']}")
+                if entry['tags']:
+                    lines.append(f"**標籤：** {', '.join(entry['tags'])}")
+                lines.append("")
+
+        return "".join(f"{line}\n" for line in lines), total
+
+    def _save_view(self, kb_file: Path, date: Optional[str], offset: int):
+        """在 manifest 記錄視圖最後一天段落的位置（供只重寫最後一天時使用）"""
+        manifest = dict(self.manifest)
+        manifest['view'] = {'file': str(kb_file), 'date': date, 'offset': offset,
+                            'size': kb_file.stat().st_size}
+        self._save_manifest(manifest)
+
+    def render_markdown(self, kb_file: Path = KB_FILE) -> int:
+        """把所有分段渲染成 knowledge-base.md 視圖，返回條目數"""
+        kb_file = Path(kb_file)
+        data = "# 知識庫\n\n"
+        total = 0
+        date, offset = None, len(data.encode('utf-8'))
+
+        for date in self.segments():
+            offset = len(data.encode('utf-8'))
+            section, count = self._render_day(date)
+            data += section
+            total += count
+
+        _atomic_write(kb_file, data)
+        self._save_view(kb_file, date, offset)
+        return total
+
+    def update_markdown(self, date: str, kb_file: Path = KB_FILE) -> int:
+        """
+        只更新視圖中某天的段落，返回該天條目數
+        該天是最新的一天且視圖未被其他程序改動時，只重寫文件末尾；否則整個重新渲染
+        """
+        kb_file = Path(kb_file)
+        view = self.manifest.get('view')
+        segments = self.segments()
+
+        try:
+            size = kb_file.stat().st_size
+        except OSError:
+            size = None
+
+        if (not view or view['file'] != str(kb_file) or size != view['size']
+                or not segments or segments[-1] != date or (view['date'] and date < view['date'])):
+            self.render_markdown(kb_file)
+            return sum(1 for _ in self.iter_entries(dates=[date]))
+
+        offset = view['offset'] if date == view['date'] else size
+        section, count = self._render_day(date)
+
+        with open(kb_file, 'r+b') as f:
+            f.seek(offset)
+            f.truncate()
+            f.write(section.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._save_view(kb_file, date, offset)
+        return count
+
+    def import_markdown(self, kb_file: Path = KB_FILE) -> int:
+        """從舊的 knowledge-base.md 導入分段（已存在的日期不覆蓋），返回導入條目數"""
+        kb_file = Path(kb_file)
+        if not kb_file.exists():
+            return 0
+
+        days = {}
+        date = None
+        category = None
+        entry = None
+
+        with open(kb_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                date_match = _DATE_RE.match(line)
+
+                if date_match:
+                    date = date_match.group(1)
+                    days.setdefault(date, [])
+                    entry = None
+                elif line.startswith('####') and date:
+                    entry = {'category': (category or 'uncategorized').lower(),
+                             'heading': line.replace('####', '').strip(),
+                             'summary': '', 'content': '', 'tags': []}
+                    days[date].append(entry)
+                elif line.startswith('###'):
+                    category = line.replace('###', '').strip()
+                    entry = None
+                elif entry is not None:
+                    if '**摘要：**' in line:
+                        entry['summary'] = line.split('**摘要：**', 1)[1].strip()
+                    elif '**標籤：**' in line:
+                        entry['tags'] = [t.strip() for t in line.split('**標籤：**', 1)[1].split(',') if t.strip()]
+                    elif '**分類：**' in line:
+                        entry['category'] = line.split('**分類：**', 1)[1].strip() or entry['category']
+                    elif line.strip():
+                        entry['content'] = (entry['content'] + '\n' + line).strip('\n')
+
+        imported = 0
+        existing = set(self.segments())
+        for date, entries in days.items():
+            if date not in existing:
+                imported += self.write_segment(date, entries)['count']
+
+        return imported
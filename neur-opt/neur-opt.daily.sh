@@ -16,11 +16,15 @@ mkdir -p "$(dirname "$LOG_FILE")"
 # 設置日期
 TODAY=$(date +%Y-%m-%d)
 
+# 並發數按 CPU 核心數
+WORKERS=$(nproc 2>/dev/null || echo 2)
+
 # 執行日誌
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] 🧠 開始神經元優化..." | tee -a "$LOG_FILE"
 echo "   工作區: $WORKSPACE" | tee -a "$LOG_FILE"
 echo "   腳本: $PYTHON_SCRIPT" | tee -a "$LOG_FILE"
 echo "   日期: $TODAY" | tee -a "$LOG_FILE"
+echo "   並發: $WORKERS" | tee -a "$LOG_FILE"
 echo "" | tee -a "$LOG_FILE"
 
 # 檢查腳本是否存在
@@ -34,7 +38,7 @@ fi
 cd "$WORKSPACE"
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] 🐍 執行神經元優化腳本..." | tee -a "$LOG_FILE"
-python3 "$PYTHON_SCRIPT" --date "$TODAY" >> "$LOG_FILE" 2>&1
+python3 "$PYTHON_SCRIPT" --date "$TODAY" --workers "$WORKERS" >> "$LOG_FILE" 2>&1
 
 # 檢查執行結果
 if [ ${PIPESTATUS[0]} -eq 0 ]; then
@@ -3,20 +3,47 @@
 超簡化的神經元優化腳本 - 使用簡化的 JSON 提取方法
 """
 
+import os
 import sys
 import json
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any
 import re
 
+import requests
+from requests.adapters import HTTPAdapter
+
 
 WORKSPACE = Path.home() / ".openclaw" / "workspace"
 MEMORY_DIR = WORKSPACE / "memory"
 KB_FILE = WORKSPACE / "knowledge-base.md"
 OLLAMA_URL = "http://localhost:11434"
 MODEL = "ollama/qwen2.5:1.5b"
+CLASSIFY_CACHE_FILE = WORKSPACE / "neur-opt" / "classification-cache.json"
+
+CATEGORIES = ('conversation', 'task', 'code', 'system', 'error', 'research')
+
+# 並發數按 CPU 核心數（Ollama 端並行度由 OLLAMA_NUM_PARALLEL 決定）
+DEFAULT_WORKERS = max(1, min(8, os.cpu_count() or 1))
+# 每次請求打包的條目數
+DEFAULT_BATCH_SIZE = 4
+REQUEST_TIMEOUT = 60
+
+# 共享 HTTP 連接池（不再每個條目啟動一個 curl 進程）
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=DEFAULT_WORKERS))
+
+# Ollama 熔斷器（連續失敗後快速失敗，不再逐個等待超時）
+sys.path.insert(0, str(WORKSPACE / "heartbeat"))
+from circuit_breaker import circuit_breaker
+
+# 分段知識庫
+sys.path.insert(0, str(WORKSPACE))
+from knowledge_store import KnowledgeStore
 
 
 def load_daily_log(date_str: str = None) -> str:
@@ -67,72 +94,152 @@ def classify_entries(log_content: str) -> List[Dict[str, Any]]:
     return entries
 
 
-def classify_with_llm(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """使用 LLM 分類每個條目 - 使用簡化的 prompt"""
+def entry_hash(entry: Dict[str, Any]) -> str:
+    """條目哈希（模型或內容變化時重新分類）"""
+    key = f"{MODEL}\n{entry.get('heading', '')}\n{entry.get('content', '')[:300]}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def load_classification_cache(cache_file: Path = CLASSIFY_CACHE_FILE) -> Dict[str, Dict[str, Any]]:
+    """讀取分類緩存"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_classification_cache(cache: Dict[str, Dict[str, Any]], cache_file: Path = CLASSIFY_CACHE_FILE):
+    """保存分類緩存（原子替換）"""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix('.tmp')
+    
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+
+
+def build_batch_prompt(entries: List[Dict[str, Any]]) -> str:
+    """把多個條目打包成一個結構化 prompt"""
+    blocks = []
+    for i, entry in enumerate(entries, 1):
+        blocks.append(f"[{i}] 標題：{entry.get('heading', '')}\n內容：{entry.get('content', '')[:300]}")
     
-    classified_entries = []
+    entries_text = "\n\n".join(blocks)
     
-    for i, entry in enumerate(entries):
-        heading = entry.get('heading', '')
-        content = entry.get('content', '')
-        
-        # 簡化的 prompt - 直接要求 JSON，不要其他解釋
-        prompt = f"""請分析以下日誌條目並返回 JSON。
+    return f"""請分析以下 {len(entries)} 個日誌條目，為每個條目選一個分類。
 
-分類選項（選一個）：
-- conversation
-- task
-- code
-- system
-- error
-- research
+分類選項：{', '.join(CATEGORIES)}
 
-日誌標題：{heading}
-日誌內容：{content[:300]}
+{entries_text}
 
-只返回 JSON，格式如下：
-{{"category":"分類選項"}}
+返回 JSON，格式如下：
+{{"results":[{{"id":1,"category":"分類選項","summary":"一句話摘要"}}]}}"""
 
-只返回 JSON，不要任何其他內容、解釋或標點符號。"""
-        
+
+def parse_batch_result(text: str, count: int) -> Dict[int, Dict[str, Any]]:
+    """解析批量分類結果（返回 id → 分類，無效的條目不返回）"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = extract_simple_json(text)
+    
+    results = data.get('results', []) if isinstance(data, dict) else data
+    if not isinstance(results, list):
+        return {}
+    
+    parsed = {}
+    for item in results:
+        if not isinstance(item, dict):
+            continue
         try:
-            result = call_ollama_llm_simple(prompt)
-            
-            # 嘗試提取 JSON
-            classification = extract_simple_json(result)
-            
-            if classification:
-                classified_entries.append({
-                    'original': entry,
-                    'classification': classification
-                })
-            else:
-                # 使用默認分類
-                classified_entries.append({
-                    'original': entry,
-                    'classification': {
-                        'category': 'system',
-                        'tags': 'uncategorized',
-                        'summary': heading[:50]
-                    }
-                })
+            index = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        
+        category = str(item.get('category', '')).strip().lower()
+        if 1 <= index <= count and category in CATEGORIES:
+            parsed[index] = {'category': category, 'summary': str(item.get('summary', ''))[:100]}
+    
+    return parsed
+
+
+def default_classification(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """默認分類"""
+    return {
+        'category': 'system',
+        'tags': 'uncategorized',
+        'summary': entry.get('heading', '')[:50]
+    }
+
+
+def classify_batch(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """一次請求分類一批條目"""
+    result = call_ollama_llm_simple(build_batch_prompt(entries), json_format=True,
+                                    num_predict=60 * len(entries))
+    parsed = parse_batch_result(result, len(entries))
+    
+    classifications = []
+    for i, entry in enumerate(entries, 1):
+        classification = parsed.get(i) or default_classification(entry)
+        if not classification.get('summary'):
+            classification['summary'] = entry.get('heading', '')[:50]
+        classifications.append(classification)
+    
+    return classifications
+
+
+def classify_with_llm(entries: List[Dict[str, Any]], workers: int = DEFAULT_WORKERS,
+                      batch_size: int = DEFAULT_BATCH_SIZE,
+                      cache_file: Path = CLASSIFY_CACHE_FILE) -> List[Dict[str, Any]]:
+    """使用 LLM 分類條目（按條目哈希緩存，未緩存的條目分批並發請求）"""
+    cache = load_classification_cache(cache_file)
+    
+    hashes = [entry_hash(entry) for entry in entries]
+    classifications = [cache.get(h) for h in hashes]
+    
+    pending = [i for i, classification in enumerate(classifications) if classification is None]
+    if len(pending) < len(entries):
+        print(f"   使用緩存 {len(entries) - len(pending)}/{len(entries)} 個條目")
+    
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    done = 0
+    
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as executor:
+            futures = {
+                executor.submit(classify_batch, [entries[i] for i in batch]): batch
+                for batch in batches
+            }
             
-            # 顯示進度
-            if (i + 1) % 5 == 0:
-                print(f"   已處理 {i + 1}/{len(entries)} 個條目...")
+            for future in as_completed(futures):
+                batch = futures[future]
                 
-        except Exception as e:
-            print(f"⚠️  分類失敗: {e}")
-            classified_entries.append({
-                'original': entry,
-                'classification': {
-                    'category': 'error',
-                    'tags': 'parsing_error',
-                    'summary': str(e)[:100]
-                }
-            })
+                try:
+                    results = future.result()
+                    for i, classification in zip(batch, results):
+                        classifications[i] = classification
+                        # 解析失敗的默認分類不緩存，下次重試
+                        if classification.get('tags') != 'uncategorized':
+                            cache[hashes[i]] = classification
+                except Exception as e:
+                    print(f"⚠️  分類失敗: {e}")
+                    for i in batch:
+                        classifications[i] = {
+                            'category': 'error',
+                            'tags': 'parsing_error',
+                            'summary': str(e)[:100]
+                        }
+                
+                done += len(batch)
+                print(f"   已處理 {done}/{len(pending)} 個條目...")
+        
+        save_classification_cache(cache, cache_file)
     
-    return classified_entries
+    return [
+        {'original': entry, 'classification': classification}
+        for entry, classification in zip(entries, classifications)
+    ]
 
 
 def extract_simple_json(text: str) -> Dict[str, Any]:
@@ -154,94 +261,85 @@ def extract_simple_json(text: str) -> Dict[str, Any]:
     return {}
 
 
-def call_ollama_llm_simple(prompt: str) -> str:
-    """調用 Ollama LLM - 簡化版本"""
-    import subprocess
-    
+@circuit_breaker('ollama', fail_threshold=3, reset_timeout=60)
+def call_ollama_llm_simple(prompt: str, json_format: bool = False, num_predict: int = 50) -> str:
+    """調用 Ollama LLM（共享連接池，json_format 使用 Ollama JSON 模式）"""
     payload = {
         "model": MODEL.replace('ollama/', ''),
         "prompt": prompt,
         "stream": False,
-        "raw": True,  # 只返回文本，不包含標記
         "options": {
             "temperature": 0.1,  # 更低的溫度，使輸出更確定
-            "max_tokens": 50,   # 更少的 tokens
-            "num_predict": 50
+            "num_predict": num_predict
         }
     }
     
-    result = subprocess.run(
-        ['curl', '-s', '-X', 'POST', f'{OLLAMA_URL}/api/generate',
-         '-H', 'Content-Type: application/json',
-         '-d', json.dumps(payload)],
-        capture_output=True,
-        text=True,
-        timeout=30
-    )
+    if json_format:
+        payload["format"] = "json"
+    else:
+        payload["raw"] = True  # 只返回文本，不包含標記
+    
+    try:
+        response = _session.post(f'{OLLAMA_URL}/api/generate', json=payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        text = response.json().get('response', '')
+    except (requests.RequestException, ValueError) as e:
+        raise RuntimeError(f"Ollama 調用失敗 ({e})")
     
-    return result.stdout.strip()
+    if not text.strip():
+        raise RuntimeError("Ollama 調用失敗 (空響應)")
+    
+    return text.strip()
 
 
-def build_knowledge_base(classified_entries: List[Dict[str, Any]], kb_file: Path):
-    """構建知識庫"""
+def build_knowledge_base(classified_entries: List[Dict[str, Any]], kb_file: Path, date_str: str = None):
+    """構建知識庫（只寫入當天分段，再更新 knowledge-base.md 視圖中當天的段落）"""
+    if date_str is None:
+        date_str = datetime.now().strftime('%Y-%m-%d')
     
-    if kb_file.exists():
-        with open(kb_file, 'r', encoding='utf-8') as f:
-            kb_content = f.read()
-    else:
-        kb_content = "# 知識庫\n\n"
+    store = KnowledgeStore()
     
-    # 按類別分組
-    categorized = {}
+    # 首次使用分段存儲時導入舊的 knowledge-base.md
+    if not store.segments():
+        store.import_markdown(kb_file)
+    
+    entries = []
     for entry in classified_entries:
-        cat = entry['classification'].get('category', 'uncategorized')
-        if cat not in categorized:
-            categorized[cat] = []
-        categorized[cat].append(entry)
-    
-    # 構建新內容
-    new_kb = []
-    new_kb.append(f"## {datetime.now().strftime('%Y-%m-%d')}")
-    new_kb.append("")
-    
-    for category, entries in categorized.items():
-        new_kb.append(f"### {category.upper()}")
-        new_kb.append("")
+        original = entry['original']
+        classification = entry['classification']
         
-        for entry in entries:
-            original = entry['original']
-            classification = entry['classification']
-            
-            heading = original.get('heading', '無標題')
-            category_val = classification.get('category', '')
-            summary = classification.get('summary', heading[:50])
-            
-            new_kb.append(f"#### {heading}")
-            new_kb.append(f"**摘要：** {summary}")
-            new_kb.append(f"**分類：** {category_val}")
-            new_kb.append("")
-    
-    # 合併
-    kb_lines = kb_content.split('\n')
-    
-    # 保留最近 30 天
-    last_date_idx = -1
-    for i, line in enumerate(kb_lines):
-        if line.startswith('## 20'):
-            last_date_idx = i
-    
-    if last_date_idx > 0:
-        old_kb_lines = kb_lines[:last_date_idx]
-    else:
-        old_kb_lines = []
+        heading = original.get('heading', '無標題')
+        tags = classification.get('tags', [])
+        
+        entries.append({
+            'category': classification.get('category', 'uncategorized'),
+            'heading': heading,
+            'summary': classification.get('summary', heading[:50]),
+            'content': original.get('content', ''),
+            'tags': [tags] if isinstance(tags, str) else tags
+        })
     
-    full_kb = '\n'.join(old_kb_lines) + '\n' + '\n'.join(new_kb)
+    info = store.write_segment(date_str, entries)
+    store.update_markdown(date_str, kb_file)
     
-    # 保存
-    with open(kb_file, 'w', encoding='utf-8') as f:
-        f.write(full_kb)
+    categories = {entry['category'] for entry in entries}
+    print(f"✓ 知識庫已更新: {len(categories)} 個類別, {info['count']} 個條目（分段 {info['file']}）")
     
-    print(f"✓ 知識庫已更新: {len(categorized)} 個類別, {len(classified_entries)} 個條目")
+    return list(store.iter_entries(dates=[date_str]))
+
+
+def update_rag_index(entries: List[Dict[str, Any]]):
+    """把當天條目增量插入 RAG 向量索引（HNSW）；還沒有索引時從整個知識庫構建"""
+    from rag_cache import RAGCache
+    
+    rag = RAGCache(WORKSPACE)
+    if rag.vector_index is None:
+        rag.build_index()
+        print(f"✓ RAG 索引已構建（版本 {rag.vector_index.version}）")
+        return
+    
+    added = rag.add_entries(entries)
+    print(f"✓ RAG 索引已更新: {added} 個條目（版本 {rag.vector_index.version}）")
 
 
 def update_memory_link(classified_entries: List[Dict[str, Any]]):
@@ -278,15 +376,18 @@ def update_memory_link(classified_entries: List[Dict[str, Any]]):
 def main():
     parser = argparse.ArgumentParser(description='神經元優化 - 簡化版')
     parser.add_argument('--dry-run', action='store_true', help='試運行，不修改文件')
+    parser.add_argument('--date', help='日誌日期（YYYY-MM-DD，默認今天）')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='並發請求數（默認按 CPU 核心數）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每次請求打包的條目數')
     args = parser.parse_args()
     
     print("🧠 神經元優化（Neural Optimization）- 簡化版")
-    print(f"📅 日期: {datetime.now().strftime('%Y-%m-%d')}")
+    print(f"📅 日期: {args.date or datetime.now().strftime('%Y-%m-%d')}")
     print("")
     
     # 1. 讀取今日日誌
     print("1️⃣  讀取今日日誌...")
-    log_content = load_daily_log()
+    log_content = load_daily_log(args.date)
     print(f"   ✓ 日誌已加載 ({len(log_content)} 字符)")
     print("")
     
@@ -297,8 +398,11 @@ def main():
     print("")
     
     # 3. 使用 LLM 分類
-    print("3️⃣  使用 LLM 分類（使用簡化方法）...")
-    classified = classify_with_llm(entries)
+    if args.workers > DEFAULT_WORKERS:
+        _session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=args.workers))
+    
+    print(f"3️⃣  使用 LLM 分類（{args.workers} 個並發，每批 {args.batch_size} 個條目）...")
+    classified = classify_with_llm(entries, workers=args.workers, batch_size=args.batch_size)
     
     # 顯示分類結果
     category_counts = {}
@@ -314,8 +418,12 @@ def main():
     # 4. 構建知識庫
     print("4️⃣  構建知識庫...")
     if not args.dry_run:
-        build_knowledge_base(classified, KB_FILE)
+        kb_entries = build_knowledge_base(classified, KB_FILE, args.date)
         update_memory_link(classified)
+        try:
+            update_rag_index(kb_entries)
+        except Exception as e:
+            print(f"⚠️  RAG 索引更新失敗: {e}")
         print(f"   ✓ 知識庫已更新: {KB_FILE}")
         print(f"   ✓ MEMORY.md 已連接")
     else:
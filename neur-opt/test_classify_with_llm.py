@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+測試批量並發 LLM 分類和條目緩存
+"""
+
+import re
+import sys
+import json
+import time
+import tempfile
+import threading
+import importlib.util
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/heartbeat')
+
+# neur-opt.py 文件名帶連字符，按路徑加載
+_spec = importlib.util.spec_from_file_location('neur_opt', Path(__file__).parent / 'neur-opt.py')
+neur_opt = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(neur_opt)
+
+
+class FakeOllama:
+    """模擬 Ollama JSON 模式（記錄請求數和最大並發數）"""
+
+    def __init__(self, delay=0.05, category='task'):
+        self.delay = delay
+        self.category = category
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, json_format=False, num_predict=50):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+        time.sleep(self.delay)
+        ids = [int(i) for i in re.findall(r'^\[(\d+)\]', prompt, re.MULTILINE)]
+
+        with self._lock:
+            self.active -= 1
+
+        return json.dumps({'results': [{'id': i, 'category': self.category, 'summary': f"條目 {i}"} for i in ids]})
+
+
+def make_entries(count):
+    return [{'heading': f"## 條目 {i}", 'content': f"內容 {i}"} for i in range(count)]
+
+
+def run_classify(fake, entries, cache, **kwargs):
+    """用模擬 Ollama 分類（緩存寫入臨時目錄）"""
+    original_call = neur_opt.call_ollama_llm_simple
+    neur_opt.call_ollama_llm_simple = fake
+    try:
+        return neur_opt.classify_with_llm(entries, cache_file=Path(cache), **kwargs)
+    finally:
+        neur_opt.call_ollama_llm_simple = original_call
+
+
+def test_batched_and_concurrent():
+    """測試條目打包成批並發請求"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fake = FakeOllama()
+        classified = run_classify(fake, make_entries(16), Path(tmp_dir) / "cache.json", workers=4, batch_size=4)
+
+        assert fake.calls == 4
+        assert fake.max_active > 1
+        assert [c['classification']['category'] for c in classified] == ['task'] * 16
+        assert classified[5]['original']['heading'] == '## 條目 5'
+        assert classified[5]['classification']['summary'] == '條目 2'
+    print("  ✅ 批量並發分類正確")
+
+
+def test_cache_skips_unchanged_entries():
+    """測試重跑時只分類變化的條目"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = Path(tmp_dir) / "cache.json"
+        entries = make_entries(6)
+        run_classify(FakeOllama(), entries, cache_file, batch_size=2)
+
+        entries[3] = {'heading': '## 條目 3', 'content': '修改後的內容'}
+        fake = FakeOllama(category='code')
+        classified = run_classify(fake, entries, cache_file, batch_size=2)
+
+        assert fake.calls == 1
+        assert [c['classification']['category'] for c in classified] == ['task'] * 3 + ['code'] + ['task'] * 2
+    print("  ✅ 分類緩存正確")
+
+
+def test_invalid_response_not_cached():
+    """測試無效分類使用默認值且不緩存"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = Path(tmp_dir) / "cache.json"
+        classified = run_classify(FakeOllama(category='unknown'), make_entries(2), cache_file)
+
+        assert [c['classification']['category'] for c in classified] == ['system', 'system']
+        assert neur_opt.load_classification_cache(cache_file) == {}
+        assert neur_opt.parse_batch_result('{"results":[{"id":"2","category":"Code"}]}', 2) == {
+            2: {'category': 'code', 'summary': ''}
+        }
+    print("  ✅ 無效響應處理正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("LLM 分類測試")
+    print("=" * 60)
+    print()
+
+    test_batched_and_concurrent()
+    test_cache_skips_unchanged_entries()
+    test_invalid_response_not_cached()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+RSS 新聞採集服務
+按計劃輪詢 RSS/Atom（ETag / If-Modified-Since 條件請求），流式解析，
+按 GUID 和標準化標題哈希去重，寫入本地 SQLite 新聞庫（每個來源按數量和天數保留）。
+每日簡報和新聞查詢直接讀本地新聞庫，不在請求時訪問網絡
+"""
+
+import re
+import sys
+import html
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator
+from xml.etree import ElementTree
+
+import requests
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_STORE_FILE = WORKSPACE / "news" / "news_items.db"
+
+# 新聞來源（分類 → RSS 地址）
+NEWS_FEEDS = {
+    'hong_kong': [
+        'https://news.google.com/rss/topics/hong%20kong',
+        'https://www.hongkongfp.com/rss'
+    ],
+    'global': [
+        'https://news.google.com/rss/topics/world',
+        'https://news.google.com/rss/topics/business'
+    ]
+}
+
+POLL_INTERVAL = 900        # 每個來源的輪詢間隔（秒）
+REQUEST_TIMEOUT = 15
+MAX_ITEMS_PER_FEED = 200   # 每個來源保留的條目數
+MAX_AGE_DAYS = 7           # 每個來源保留的天數
+SUMMARY_LENGTH = 200
+
+USER_AGENT = "Mozilla/5.0 (compatible; JarvisNewsFeed/1.0)"
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def _local(tag: str) -> str:
+    """去掉 XML 命名空間"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _clean_text(text: Optional[str]) -> str:
+    """去掉 HTML 標籤和多餘空白"""
+    if not text:
+        return ''
+    return _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', text))).strip()
+
+
+def _parse_date(text: Optional[str]) -> Optional[float]:
+    """解析 RFC 822（RSS）或 ISO 8601（Atom）日期，返回時間戳"""
+    if not text:
+        return None
+
+    text = text.strip()
+    try:
+        parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def normalize_title(title: str, source: str = '') -> str:
+    """標準化標題（去掉「 - 來源」後綴、標點、空白和大小寫差異）"""
+    title = unicodedata.normalize('NFKC', title or '').strip()
+
+    if source and title.endswith(f" - {source}"):
+        title = title[:-len(source) - 3]
+
+    return _NON_WORD_RE.sub('', title.lower())
+
+
+def title_hash(title: str, source: str = '') -> str:
+    """標準化標題的哈希（跨來源去重）"""
+    return hashlib.sha1(normalize_title(title, source).encode('utf-8')).hexdigest()
+
+
+def parse_feed(stream) -> Iterator[Dict[str, Any]]:
+    """流式解析 RSS/Atom，逐條產生新聞（解析後立即釋放元素）"""
+    for _, elem in ElementTree.iterparse(stream, events=('end',)):
+        tag = _local(elem.tag)
+        if tag not in ('item', 'entry'):
+            continue
+
+        fields = {}
+        for child in elem:
+            name = _local(child.tag)
+            if name == 'link' and child.get('href'):
+                # Atom：<link href="..."/>
+                if child.get('rel', 'alternate') == 'alternate':
+                    fields['link'] = child.get('href')
+            elif name not in fields:
+                fields[name] = (child.text or '').strip()
+
+        elem.clear()
+
+        title = _clean_text(fields.get('title'))
+        if not title:
+            continue
+
+        link = fields.get('link', '')
+        source = _clean_text(fields.get('source'))
+
+        yield {
+            'guid': fields.get('guid') or fields.get('id') or link or title_hash(title, source),
+            'title': title,
+            'link': link,
+            'summary': _clean_text(fields.get('description') or fields.get('summary'))[:SUMMARY_LENGTH],
+            'source': source,
+            'published': _parse_date(fields.get('pubDate') or fields.get('published') or fields.get('updated'))
+        }
+
+
+class NewsStore:
+    """本地新聞庫（SQLite）"""
+
+    def __init__(self, path: Path = DEFAULT_STORE_FILE,
+                 max_items: int = MAX_ITEMS_PER_FEED, max_age_days: int = MAX_AGE_DAYS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_items = max_items
+        self.max_age_days = max_age_days
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                url TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                last_polled REAL NOT NULL DEFAULT 0,
+                last_status TEXT
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guid TEXT UNIQUE NOT NULL,
+                title_hash TEXT UNIQUE NOT NULL,
+                feed_url TEXT NOT NULL,
+                category TEXT NOT NULL,
+                title TEXT NOT NULL,
+                link TEXT,
+                summary TEXT,
+                source TEXT,
+                published REAL NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_category ON items (category, published DESC);
+            CREATE INDEX IF NOT EXISTS idx_items_feed ON items (feed_url, published DESC);
+        """)
+        self._conn.commit()
+
+    def get_feed(self, url: str) -> Optional[Dict[str, Any]]:
+        """獲取來源的條件請求狀態"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM feeds WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def update_feed(self, url: str, category: str, status: str,
+                    etag: Optional[str] = None, last_modified: Optional[str] = None,
+                    now: Optional[float] = None):
+        """記錄輪詢結果（304 時保留原來的 ETag / Last-Modified）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO feeds (url, category, etag, last_modified, last_polled, last_status)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    category = excluded.category,
+                    etag = COALESCE(excluded.etag, feeds.etag),
+                    last_modified = COALESCE(excluded.last_modified, feeds.last_modified),
+                    last_polled = excluded.last_polled,
+                    last_status = excluded.last_status
+            """, (url, category, etag, last_modified, now, status))
+            self._conn.commit()
+
+    def add_items(self, feed_url: str, category: str, items, now: Optional[float] = None) -> int:
+        """寫入新聞（GUID 或標準化標題重複的忽略），返回新增條數"""
+        now = time.time() if now is None else now
+        rows = [
+            (item['guid'], title_hash(item['title'], item.get('source', '')), feed_url, category,
+             item['title'], item.get('link', ''), item.get('summary', ''), item.get('source', ''),
+             item.get('published') or now, now)
+            for item in items
+        ]
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("""
+                INSERT OR IGNORE INTO items
+                    (guid, title_hash, feed_url, category, title, link, summary, source, published, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def prune(self, feed_url: str, now: Optional[float] = None) -> int:
+        """按數量和天數清理來源的舊新聞，返回刪除條數"""
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age_days * 86400
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("""
+                DELETE FROM items WHERE feed_url = ? AND (
+                    published < ? OR id NOT IN (
+                        SELECT id FROM items WHERE feed_url = ?
+                        ORDER BY published DESC, id DESC LIMIT ?
+                    )
+                )
+            """, (feed_url, cutoff, feed_url, self.max_items))
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def latest(self, category: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """獲取最新新聞（可按分類）"""
+        with self._lock:
+            if category:
+                rows = self._conn.execute(
+                    "SELECT * FROM items WHERE category = ? ORDER BY published DESC, id DESC LIMIT ?",
+                    (category, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM items ORDER BY published DESC, id DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, keyword: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """按關鍵詞搜索標題和摘要"""
+        pattern = f"%{keyword}%"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM items WHERE title LIKE ? OR summary LIKE ? "
+                "ORDER BY published DESC, id DESC LIMIT ?",
+                (pattern, pattern, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """每個分類的新聞數量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT category, COUNT(*) FROM items GROUP BY category").fetchall()
+        return {category: count for category, count in rows}
+
+
+class FeedPoller:
+    """RSS 輪詢器（條件請求 + 流式解析）"""
+
+    def __init__(self, store: NewsStore, feeds: Dict[str, List[str]] = NEWS_FEEDS,
+                 interval: float = POLL_INTERVAL, timeout: float = REQUEST_TIMEOUT, session=None):
+        self.store = store
+        self.feeds = feeds
+        self.interval = interval
+        self.timeout = timeout
+
+        if session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+        self.session = session
+
+        self._running = False
+
+    def poll_feed(self, url: str, category: str) -> Dict[str, Any]:
+        """輪詢單個來源"""
+        start = time.perf_counter()
+        state = self.store.get_feed(url) or {}
+
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        result = {'url': url, 'category': category, 'new': 0, 'pruned': 0}
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                if response.status_code == 304:
+                    result['status'] = 'not_modified'
+                    self.store.update_feed(url, category, 'not_modified')
+                elif response.status_code == 200:
+                    response.raw.decode_content = True
+                    result['new'] = self.store.add_items(url, category, parse_feed(response.raw))
+                    result['pruned'] = self.store.prune(url)
+                    result['status'] = 'updated'
+                    self.store.update_feed(
+                        url, category, 'updated',
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified')
+                    )
+                else:
+                    result['status'] = 'error'
+                    result['error'] = f"HTTP {response.status_code}"
+                    self.store.update_feed(url, category, result['error'])
+            finally:
+                response.close()
+
+        except (requests.RequestException, ElementTree.ParseError) as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+            self.store.update_feed(url, category, f"error: {e}")
+
+        result['elapsed'] = round(time.perf_counter() - start, 3)
+        return result
+
+    def due_feeds(self, now: Optional[float] = None) -> List[tuple]:
+        """到期需要輪詢的來源"""
+        now = time.time() if now is None else now
+        due = []
+
+        for category, urls in self.feeds.items():
+            for url in urls:
+                state = self.store.get_feed(url)
+                if state is None or now - state['last_polled'] >= self.interval:
+                    due.append((url, category))
+
+        return due
+
+    def poll_all(self, force: bool = False) -> List[Dict[str, Any]]:
+        """並發輪詢所有到期來源"""
+        if force:
+            due = [(url, category) for category, urls in self.feeds.items() for url in urls]
+        else:
+            due = self.due_feeds()
+
+        if not due:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(len(due), 4)) as executor:
+            return list(executor.map(lambda feed: self.poll_feed(*feed), due))
+
+    def run_forever(self):
+        """按計劃持續輪詢"""
+        self._running = True
+
+        while self._running:
+            for result in self.poll_all():
+                if result['status'] == 'error':
+                    print(f"[{datetime.now(HK_TZ).strftime('%H:%M:%S')}] ⚠️ {result['url']}：{result['error']}")
+                else:
+                    print(f"[{datetime.now(HK_TZ).strftime('%H:%M:%S')}] {result['url']}："
+                          f"{result['status']}，新增 {result['new']} 條（{result['elapsed']}s）")
+
+            time.sleep(min(60, self.interval))
+
+    def stop(self):
+        """停止輪詢"""
+        self._running = False
+
+
+def format_news_items(items: List[Dict[str, Any]]) -> str:
+    """格式化新聞列表"""
+    content = ""
+
+    for i, news in enumerate(items, 1):
+        published = datetime.fromtimestamp(news['published'], HK_TZ).strftime('%H:%M')
+        content += f"{i}. {news['title']}\n"
+        if news.get('summary'):
+            content += f"   {news['summary']}\n"
+        content += f"   來源：{news.get('source') or '未知'} | 時間：{published}\n\n"
+
+    return content
+
+
+def handle_news_query(query: str, store: Optional[NewsStore] = None, limit: int = 5) -> str:
+    """處理新聞查詢（只讀本地新聞庫）"""
+    store = store or NewsStore()
+
+    if '香港' in query or '本地' in query:
+        category, label = 'hong_kong', '香港新聞'
+    elif any(word in query for word in ('全球', '國際', '世界', '財經')):
+        category, label = 'global', '全球新聞'
+    else:
+        category, label = None, '最新新聞'
+
+    items = store.latest(category, limit)
+    if not items:
+        return "本地新聞庫暫無資料，請稍後再試"
+
+    return f"**{label}**\n\n" + format_news_items(items)
+
+
+def main():
+    """主函數 - 輪詢 RSS 新聞"""
+    print("=" * 60)
+    print("RSS 新聞採集")
+    print("=" * 60)
+    print()
+
+    store = NewsStore()
+    poller = FeedPoller(store)
+
+    if '--watch' in sys.argv:
+        print(f"每 {poller.interval} 秒輪詢一次，按 Ctrl+C 停止")
+        try:
+            poller.run_forever()
+        except KeyboardInterrupt:
+            poller.stop()
+        return
+
+    for result in poller.poll_all(force=True):
+        status = "✅" if result['status'] != 'error' else "⚠️"
+        print(f"  {status} [{result['category']}] {result['url']}")
+        print(f"     {result['status']}，新增 {result['new']} 條，清理 {result['pruned']} 條（{result['elapsed']}s）")
+
+    print()
+    print(f"新聞庫：{store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Telegram 發送隊列
+消息先寫入本地 SQLite（重啟不丟失），再由非同步發送器按速率限制發送：
+每個聊天一個令牌桶 + 全局令牌桶，處理 429 retry_after，指數退避重試，冪等鍵去重，
+超過 4096 字自動分段；已發送和永久失敗的消息保留 SENT_RETENTION_DAYS 天後清理
+"""
+
+import os
+import re
+import sys
+import json
+import fcntl
+import time
+import random
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_QUEUE_FILE = WORKSPACE / "notifications" / "telegram_outbox.db"
+
+TELEGRAM_API = "https://api.telegram.org/bot{token}/sendMessage"
+MESSAGE_LIMIT = 4096
+
+# Telegram 限制：同一聊天約每秒 1 條，全局約每秒 30 條
+CHAT_RATE = 1.0
+GLOBAL_RATE = 30.0
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+
+# 已發送 / 永久失敗的消息保留天數（之後刪除）
+SENT_RETENTION_DAYS = 30
+
+
+_TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*>')
+
+
+def _safe_cut(text: str, cut: int) -> int:
+    """把切分點移到 HTML 標籤和實體之外"""
+    tag_start = text.rfind('<', 0, cut)
+    if tag_start > text.rfind('>', 0, cut):
+        cut = tag_start
+
+    entity_start = text.rfind('&', 0, cut)
+    if entity_start >= 0 and not re.search(r'[;\s]', text[entity_start:cut]):
+        cut = entity_start
+
+    return cut
+
+
+def _open_tags(text: str) -> List[Tuple[str, str]]:
+    """文本末尾仍未關閉的標籤 [(標籤名, 開始標籤)]"""
+    stack = []
+    for match in _TAG_RE.finditer(text):
+        closing, name = match.group(1), match.group(2).lower()
+        if not closing:
+            stack.append((name, match.group(0)))
+        elif stack and stack[-1][0] == name:
+            stack.pop()
+    return stack
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT, parse_mode: Optional[str] = 'HTML') -> List[str]:
+    """
+    按 Telegram 長度限制分段（優先在換行處切分）
+    HTML 模式下不在標籤或實體中間切分，跨段的標籤在段末關閉、下一段開頭重新打開
+    """
+    html = (parse_mode or '').upper() == 'HTML'
+    parts = []
+
+    while len(text) > limit:
+        budget = limit
+        while True:
+            cut = text.rfind('\n', 0, budget)
+            if html and cut > 0:
+                cut = _safe_cut(text, cut)
+            if cut <= 0:
+                cut = _safe_cut(text, budget) if html else budget
+            if cut <= 0:
+                cut = budget
+
+            opened = _open_tags(text[:cut]) if html else []
+            closing = ''.join(f"</{name}>" for name, _ in reversed(opened))
+            if cut + len(closing) <= limit or budget <= limit // 2:
+                break
+            budget -= len(closing)
+
+        parts.append(text[:cut] + closing)
+        text = ''.join(tag for _, tag in opened) + text[cut:].lstrip('\n')
+
+    if text or not parts:
+        parts.append(text)
+
+    return parts
+
+
+def make_idempotency_key(chat_id: str, text: str, scope: str = None) -> str:
+    """默認冪等鍵（同一聊天相同內容在同一範圍內只發一次，範圍默認為當天日期）"""
+    if scope is None:
+        scope = datetime.now(HK_TZ).strftime('%Y-%m-%d')
+    return hashlib.sha256(f"{scope}\n{chat_id}\n{text}".encode('utf-8')).hexdigest()
+
+
+class TelegramQueue:
+    """持久化發送隊列（SQLite）"""
+
+    def __init__(self, path: Path = DEFAULT_QUEUE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT UNIQUE NOT NULL,
+                chat_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                parse_mode TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                parts_sent INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                sent_at REAL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)"
+        )
+        self._conn.commit()
+
+    def enqueue(self, chat_id: str, text: str, parse_mode: Optional[str] = 'HTML',
+                idempotency_key: str = None) -> Tuple[str, bool]:
+        """加入隊列，返回 (冪等鍵, 是否新加入)"""
+        key = idempotency_key or make_idempotency_key(chat_id, text)
+        now = time.time()
+
+        with self._lock:
+            cursor = self._conn.execute("""
+                INSERT OR IGNORE INTO outbox
+                (idempotency_key, chat_id, text, parse_mode, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, str(chat_id), text, parse_mode, now, now))
+            self._conn.commit()
+
+        return key, cursor.rowcount == 1
+
+    def due(self, limit: int = 100, now: float = None) -> List[Dict[str, Any]]:
+        """到期待發送的消息（按加入順序）"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT * FROM outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id
+                LIMIT ?
+            """, (now or time.time(), limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def next_due_in(self) -> Optional[float]:
+        """距離下一條消息到期的秒數（沒有待發送消息時返回 None）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_part_sent(self, message_id: int, parts_sent: int) -> None:
+        """記錄已發送的分段（重試時不重複發送）"""
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET parts_sent = ? WHERE id = ?", (parts_sent, message_id))
+            self._conn.commit()
+
+    def mark_sent(self, message_id: int) -> None:
+        """標記已發送"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                (time.time(), message_id)
+            )
+            self._conn.commit()
+
+    def mark_retry(self, message_id: int, delay: float, error: str) -> None:
+        """安排重試"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE outbox
+                SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+            """, (time.time() + delay, error, message_id))
+            self._conn.commit()
+
+    def mark_failed(self, message_id: int, error: str) -> None:
+        """標記永久失敗"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, message_id)
+            )
+            self._conn.commit()
+
+    def prune(self, retention_days: float = SENT_RETENTION_DAYS, now: float = None) -> int:
+        """刪除超過保留期的已發送和永久失敗消息，返回刪除條數"""
+        cutoff = (now or time.time()) - retention_days * 86400
+        with self._lock:
+            cursor = self._conn.execute("""
+                DELETE FROM outbox
+                WHERE status IN ('sent', 'failed') AND COALESCE(sent_at, created_at) < ?
+            """, (cutoff,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def get(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """按冪等鍵查詢消息"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        """各狀態消息數量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class TokenBucket:
+    """令牌桶（非同步等待）"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def block(self, seconds: float) -> None:
+        """暫停發放令牌（收到 429 時）"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self) -> None:
+        """等待並取得一個令牌"""
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramSender:
+    """非同步發送器（共享連接池）"""
+
+    def __init__(self, token: str, queue: TelegramQueue, session: requests.Session = None,
+                 chat_rate: float = CHAT_RATE, global_rate: float = GLOBAL_RATE,
+                 request_timeout: float = 10):
+        self.token = token
+        self.queue = queue
+        self.chat_rate = chat_rate
+        self.request_timeout = request_timeout
+
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+        self.session = session
+
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_buckets = {}
+        self.running = False
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return self.chat_buckets[chat_id]
+
+    def _post(self, chat_id: str, text: str, parse_mode: Optional[str]) -> Dict[str, Any]:
+        """調用 sendMessage，返回 {'ok', 'retry_after', 'error', 'permanent'}"""
+        data = {
+            'chat_id': chat_id,
+            'text': text,
+            'disable_web_page_preview': True
+        }
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+
+        try:
+            response = self.session.post(
+                TELEGRAM_API.format(token=self.token), json=data, timeout=self.request_timeout
+            )
+        except requests.RequestException as e:
+            return {'ok': False, 'retry_after': None, 'error': str(e), 'permanent': False}
+
+        if response.status_code == 200:
+            return {'ok': True}
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+
+        description = body.get('description', f"HTTP {response.status_code}")
+
+        if response.status_code == 429:
+            retry_after = (body.get('parameters') or {}).get('retry_after', 1)
+            return {'ok': False, 'retry_after': float(retry_after), 'error': description, 'permanent': False}
+
+        # 4xx（除 429）為請求本身有誤，重試無意義
+        permanent = 400 <= response.status_code < 500
+        return {'ok': False, 'retry_after': None, 'error': description, 'permanent': permanent}
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """指數退避（帶抖動）"""
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempts))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _send_message(self, message: Dict[str, Any]) -> bool:
+        """發送一條隊列消息（逐段發送，已發送的分段不重發）"""
+        chat_id = message['chat_id']
+        parts = split_message(message['text'], parse_mode=message['parse_mode'])
+        bucket = self._chat_bucket(chat_id)
+
+        for index in range(message['parts_sent'], len(parts)):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+
+            result = await asyncio.to_thread(self._post, chat_id, parts[index], message['parse_mode'])
+
+            if result['ok']:
+                self.queue.mark_part_sent(message['id'], index + 1)
+                continue
+
+            if result['retry_after'] is not None:
+                bucket.block(result['retry_after'])
+                self.queue.mark_retry(message['id'], result['retry_after'], result['error'])
+            elif result['permanent'] or message['attempts'] + 1 >= MAX_ATTEMPTS:
+                self.queue.mark_failed(message['id'], result['error'])
+            else:
+                self.queue.mark_retry(message['id'], self.backoff(message['attempts']), result['error'])
+
+            print(f"[Telegram] 發送失敗（{chat_id}）：{result['error']}")
+            return False
+
+        self.queue.mark_sent(message['id'])
+        return True
+
+    async def _send_chat(self, messages: List[Dict[str, Any]]) -> int:
+        """按順序發送同一聊天的消息（失敗後該聊天本輪停止，保持順序）"""
+        sent = 0
+        for message in messages:
+            if not await self._send_message(message):
+                break
+            sent += 1
+        return sent
+
+    async def drain_once(self) -> int:
+        """發送所有到期消息（不同聊天並發），返回成功條數"""
+        by_chat = {}
+        for message in self.queue.due():
+            by_chat.setdefault(message['chat_id'], []).append(message)
+
+        if not by_chat:
+            return 0
+
+        results = await asyncio.gather(*(self._send_chat(messages) for messages in by_chat.values()))
+        return sum(results)
+
+    async def run_forever(self, poll_interval: float = 1.0, prune_interval: float = 3600):
+        """持續發送隊列（每 prune_interval 秒清理一次過期消息）"""
+        self.running = True
+        last_prune = None
+        while self.running:
+            await self.drain_once()
+            if last_prune is None or time.monotonic() - last_prune >= prune_interval:
+                self.queue.prune()
+                last_prune = time.monotonic()
+            wait = self.queue.next_due_in()
+            await asyncio.sleep(poll_interval if wait is None else min(max(wait, 0.05), poll_interval))
+
+    def stop(self):
+        """停止發送"""
+        self.running = False
+
+
+class DrainLock:
+    """發送者文件鎖（同一時間只有一個進程發送隊列，避免重複發送）"""
+
+    def __init__(self, queue: TelegramQueue):
+        self.path = queue.path.with_suffix('.lock')
+        self._file = None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        self._file = open(self.path, 'a')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def drain(token: str, queue: TelegramQueue, sender: TelegramSender = None) -> Optional[int]:
+    """發送所有到期消息一次，返回成功條數（另一個發送者正在運行時返回 None，由它發送）"""
+    lock = DrainLock(queue)
+    if not lock.acquire():
+        return None
+
+    try:
+        sender = sender or TelegramSender(token, queue)
+        sent = asyncio.run(sender.drain_once())
+        queue.prune()
+        return sent
+    finally:
+        lock.release()
+
+
+def main():
+    """
+    主函數
+    --drain：發送到期消息後退出（由 cron 每分鐘運行，負責重試）
+    無參數：持續發送隊列中的消息
+    """
+    print("=" * 60)
+    print("Telegram 發送隊列")
+    print("=" * 60)
+    print()
+
+    token = os.environ.get('TELEGRAM_BOT_TOKEN', '')
+    if not token:
+        print("[Telegram] Bot Token 未設置")
+        return
+
+    queue = TelegramQueue()
+    print(f"隊列狀態：{json.dumps(queue.stats(), ensure_ascii=False)}")
+
+    if '--drain' in sys.argv:
+        sent = drain(token, queue)
+        if sent is None:
+            print("另一個發送者正在運行，本次跳過")
+        else:
+            print(f"已發送 {sent} 條消息，隊列狀態：{json.dumps(queue.stats(), ensure_ascii=False)}")
+        return
+
+    lock = DrainLock(queue)
+    lock.acquire(blocking=True)
+    sender = TelegramSender(token, queue)
+    try:
+        asyncio.run(sender.run_forever())
+    except KeyboardInterrupt:
+        print("\n🛑 發送隊列已停止")
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":
+    main()
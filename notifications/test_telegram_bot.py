@@ -20,12 +20,28 @@ CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', 'YOUR_CHAT_ID')
 class TelegramNotifier:
     """Telegram Bot 通知發送器"""
     
-    def __init__(self, token: str, chat_id: str):
+    def __init__(self, token: str, chat_id: str, queue=None):
         self.token = token
         self.chat_id = chat_id
         self.bot_name = "Jarvis Bot"
+        
+        # 發送隊列（未提供時只模擬發送）
+        self.queue = queue
+    
+    def _deliver(self, message: str, label: str, alert_id: str = None):
+        """
+        加入發送隊列（由 telegram_queue 的發送器限速發送）
+        有警報 ID 時按警報去重，否則同一天相同內容只發一次
+        """
+        if self.queue is None:
+            print(f"[Telegram] {label} sent (simulated)")
+            return
+        
+        key = f"alert_{alert_id}" if alert_id else None
+        _, queued = self.queue.enqueue(self.chat_id, message, idempotency_key=key)
+        print(f"[Telegram] {label} {'queued' if queued else 'already queued'}")
     
-    def send_heat_warning(self, temp: float, level: str):
+    def send_heat_warning(self, temp: float, level: str, alert_id: str = None):
         """發送酷熱警告"""
         severity_emoji = 'HIGH' if level == 'high' else 'MODERATE'
         
@@ -50,11 +66,9 @@ Source: HKO
         print(f"[Telegram] Sending heat warning: {temp}C ({level})")
         print(f"[Telegram] Message preview:\n{message}")
         
-        # 在實際應用中，這裡會使用 python-telegram-bot 庫
-        # self.bot.send_message(chat_id=self.chat_id, text=message, parse_mode='HTML')
-        print("[Telegram] Heat warning sent (simulated)")
+        self._deliver(message, "Heat warning", alert_id)
     
-    def send_rainstorm_warning(self, rainfall: float, level: str):
+    def send_rainstorm_warning(self, rainfall: float, level: str, alert_id: str = None):
         """發送暴雨警告"""
         severity_emoji = 'SEVERE' if level == 'severe' else 'HIGH'
         
@@ -79,11 +93,9 @@ Source: HKO
         print(f"[Telegram] Sending rainstorm warning: {rainfall}mm ({level})")
         print(f"[Telegram] Message preview:\n{message}")
         
-        # 在實際應用中，這裡會使用 python-telegram-bot 庫
-        # self.bot.send_message(chat_id=self.chat_id, text=message, parse_mode='HTML')
-        print("[Telegram] Rainstorm warning sent (simulated)")
+        self._deliver(message, "Rainstorm warning", alert_id)
     
-    def send_strong_wind_warning(self, wind_speed: float, level: str):
+    def send_strong_wind_warning(self, wind_speed: float, level: str, alert_id: str = None):
         """發送強風警告"""
         severity_emoji = 'SEVERE' if level == 'severe' else 'HIGH'
         
@@ -108,11 +120,9 @@ Source: HKO
         print(f"[Telegram] Sending strong wind warning: {wind_speed}km/h ({level})")
         print(f"[Telegram] Message preview:\n{message}")
         
-        # 在實際應用中，這裡會使用 python-telegram-bot 庫
-        # self.bot.send_message(chat_id=self.chat_id, text=message, parse_mode='HTML')
-        print("[Telegram] Strong wind warning sent (simulated)")
+        self._deliver(message, "Strong wind warning", alert_id)
     
-    def send_typhoon_warning(self, typhoon_info: str):
+    def send_typhoon_warning(self, typhoon_info: str, alert_id: str = None):
         """發送颱風警告"""
         message = f"""
 <b>Typhoon Warning - SEVERE</b>
@@ -140,9 +150,7 @@ Source: HKO
         print(f"[Telegram] Sending typhoon warning")
         print(f"[Telegram] Message preview:\n{message}")
         
-        # 在實際應用中，這裡會使用 python-telegram-bot 庫
-        # self.bot.send_message(chat_id=self.chat_id, text=message, parse_mode='HTML')
-        print("[Telegram] Typhoon warning sent (simulated)")
+        self._deliver(message, "Typhoon warning", alert_id)
     
     def send_weather_alert(self, alert_data: dict):
         """發送天氣警報（統一接口）"""
@@ -150,19 +158,20 @@ Source: HKO
         severity = alert_data['severity']
         description = alert_data['description']
         title = alert_data['title']
+        alert_id = alert_data.get('alert_id')
         
         if alert_type == 'heat_warning':
             temp = alert_data['metadata']['temperature']
-            self.send_heat_warning(temp, severity)
+            self.send_heat_warning(temp, severity, alert_id)
         elif alert_type == 'rainstorm_warning':
             rainfall = alert_data['metadata']['rainfall']
-            self.send_rainstorm_warning(rainfall, severity)
+            self.send_rainstorm_warning(rainfall, severity, alert_id)
         elif alert_type == 'strong_wind_warning':
             wind_speed = alert_data['metadata']['wind_speed']
-            self.send_strong_wind_warning(wind_speed, severity)
+            self.send_strong_wind_warning(wind_speed, severity, alert_id)
         elif alert_type == 'typhoon_warning':
             typhoon_info = alert_data['metadata'].get('warning_message', 'Typhoon')
-            self.send_typhoon_warning(typhoon_info)
+            self.send_typhoon_warning(typhoon_info, alert_id)
         else:
             print(f"[Telegram] Unknown alert type: {alert_type}")
 
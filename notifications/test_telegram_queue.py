@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+測試 Telegram 發送隊列
+"""
+
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace/notifications')
+
+from telegram_queue import (TelegramQueue, TelegramSender, DrainLock, drain, split_message, make_idempotency_key,
+                            MESSAGE_LIMIT, SENT_RETENTION_DAYS)
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """模擬 Telegram API（按預設順序返回響應）"""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json, timeout):
+        self.posts.append((json['chat_id'], json['text'], time.monotonic()))
+        if self.responses:
+            return self.responses.pop(0)
+        return FakeResponse(200, {'ok': True})
+
+
+def test_split_message():
+    """測試超長消息分段"""
+    text = "\n".join(f"第 {i} 行：" + "天氣" * 40 for i in range(200))
+    parts = split_message(text)
+
+    assert len(parts) > 1
+    assert all(len(part) <= MESSAGE_LIMIT for part in parts)
+    assert "\n".join(parts) == text
+    assert split_message("短消息") == ["短消息"]
+    print("  ✅ 消息分段正確")
+
+
+def test_split_html_message():
+    """測試 HTML 消息不在標籤或實體中間切分，跨段標籤在下一段重新打開"""
+    text = "<b>" + "天氣 &amp; 溫度 " * 600 + "</b>"
+    parts = split_message(text, parse_mode='HTML')
+
+    assert len(parts) > 1
+    assert all(len(part) <= MESSAGE_LIMIT for part in parts)
+    for part in parts:
+        assert part.startswith("<b>") and part.endswith("</b>")
+        assert part.count("&") == part.count("&amp;")
+
+    link = '<a href="https://www.hko.gov.hk/">天文台</a>'
+    parts = split_message("x" * (MESSAGE_LIMIT - 10) + link, parse_mode='HTML')
+    assert parts == ['x' * (MESSAGE_LIMIT - 10), link]
+    assert all(part.count('<') == part.count('>') for part in parts)
+    print("  ✅ HTML 分段正確")
+
+
+def test_drain_lock():
+    """測試同一時間只有一個發送者"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = TelegramQueue(Path(tmp_dir) / "outbox.db")
+        key, _ = queue.enqueue('100', '每日簡報')
+        sender = TelegramSender('token', queue, session=FakeSession())
+
+        lock = DrainLock(queue)
+        assert lock.acquire()
+        assert drain('token', queue, sender=sender) is None
+        assert queue.get(key)['status'] == 'pending'
+        lock.release()
+
+        assert drain('token', queue, sender=sender) == 1
+        assert queue.get(key)['status'] == 'sent'
+    print("  ✅ 發送鎖正確")
+
+
+def test_idempotency_and_durability():
+    """測試冪等鍵去重和重啟後消息不丟失"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "outbox.db"
+
+        queue = TelegramQueue(path)
+        key, queued = queue.enqueue('100', '暴雨警告', idempotency_key='alert_1')
+        assert queued
+        assert queue.enqueue('100', '暴雨警告（重複）', idempotency_key='alert_1') == ('alert_1', False)
+
+        # 重啟後仍在隊列
+        reopened = TelegramQueue(path)
+        assert [m['text'] for m in reopened.due()] == ['暴雨警告']
+
+        session = FakeSession()
+        asyncio.run(TelegramSender('token', reopened, session=session).drain_once())
+        assert len(session.posts) == 1
+        assert reopened.get(key)['status'] == 'sent'
+
+        # 已發送的消息再次加入不會重發
+        reopened.enqueue('100', '暴雨警告', idempotency_key='alert_1')
+        assert reopened.due() == []
+    print("  ✅ 冪等和持久化正確")
+
+
+def test_default_key_scoped_and_prune():
+    """測試默認冪等鍵按日期區分，過期的已發送 / 失敗消息被清理"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = TelegramQueue(Path(tmp_dir) / "outbox.db")
+        assert make_idempotency_key('100', '酷熱警告 34C', scope='2026-10-18') != \
+            make_idempotency_key('100', '酷熱警告 34C', scope='2026-10-19')
+
+        sent_key, _ = queue.enqueue('100', '酷熱警告 34C')
+        failed_key, _ = queue.enqueue('100', '暴雨警告', idempotency_key='alert_2')
+        pending_key, _ = queue.enqueue('100', '強風警告', idempotency_key='alert_3')
+        queue.mark_sent(queue.get(sent_key)['id'])
+        queue.mark_failed(queue.get(failed_key)['id'], 'Bad Request')
+
+        assert queue.prune() == 0
+        assert queue.prune(now=time.time() + (SENT_RETENTION_DAYS + 1) * 86400) == 2
+        assert queue.get(sent_key) is None and queue.get(failed_key) is None
+        assert queue.get(pending_key)['status'] == 'pending'
+    print("  ✅ 冪等鍵範圍和清理正確")
+
+
+def test_retry_after_and_backoff():
+    """測試 429 retry_after 和永久失敗"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = TelegramQueue(Path(tmp_dir) / "outbox.db")
+        throttled, _ = queue.enqueue('100', '消息一')
+        rejected, _ = queue.enqueue('200', '消息二')
+
+        session = FakeSession([
+            FakeResponse(429, {'ok': False, 'description': 'Too Many Requests', 'parameters': {'retry_after': 0.2}}),
+            FakeResponse(400, {'ok': False, 'description': 'Bad Request: chat not found'})
+        ])
+        sender = TelegramSender('token', queue, session=session)
+
+        assert asyncio.run(sender.drain_once()) == 0
+        assert queue.get(throttled)['status'] == 'pending'
+        assert queue.get(rejected)['status'] == 'failed'
+
+        # retry_after 之前不重試
+        assert queue.due() == []
+        time.sleep(0.25)
+        assert asyncio.run(sender.drain_once()) == 1
+        assert queue.get(throttled)['status'] == 'sent'
+    print("  ✅ 429 重試和永久失敗正確")
+
+
+def test_split_parts_not_resent():
+    """測試分段中途失敗後重試不重發已成功的分段"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = TelegramQueue(Path(tmp_dir) / "outbox.db")
+        key, _ = queue.enqueue('100', "\n".join(["A" * 4000, "B" * 4000, "C" * 100]))
+
+        session = FakeSession([FakeResponse(200), FakeResponse(502)])
+        sender = TelegramSender('token', queue, session=session, chat_rate=100)
+        sender.backoff = lambda attempts: 0
+
+        asyncio.run(sender.drain_once())
+        assert queue.get(key)['parts_sent'] == 1
+
+        asyncio.run(sender.drain_once())
+        assert queue.get(key)['status'] == 'sent'
+        assert [text[0] for _, text, _ in session.posts] == ['A', 'B', 'B', 'C']
+    print("  ✅ 分段續發正確")
+
+
+def test_per_chat_rate_limit():
+    """測試同一聊天限速、不同聊天並發"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = TelegramQueue(Path(tmp_dir) / "outbox.db")
+        for i in range(3):
+            queue.enqueue('100', f"聊天一 {i}")
+            queue.enqueue('200', f"聊天二 {i}")
+
+        session = FakeSession()
+        sender = TelegramSender('token', queue, session=session, chat_rate=10)
+        assert asyncio.run(sender.drain_once()) == 6
+
+        times = [t for chat_id, _, t in session.posts if chat_id == '100']
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        assert all(gap >= 0.08 for gap in gaps)
+        assert [text for chat_id, text, _ in session.posts if chat_id == '100'] == ['聊天一 0', '聊天一 1', '聊天一 2']
+    print("  ✅ 聊天限速正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("Telegram 發送隊列測試")
+    print("=" * 60)
+    print()
+
+    test_split_message()
+    test_split_html_message()
+    test_drain_lock()
+    test_idempotency_and_durability()
+    test_default_key_scoped_and_prune()
+    test_retry_after_and_backoff()
+    test_split_parts_not_resent()
+    test_per_chat_rate_limit()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+段落切分
+把條目內容按句子切成有重疊的段落（按 token 數控制大小，中文每字約一個 token），
+每個段落保留所屬條目的 ID 和元數據，檢索時只返回命中的段落
+"""
+
+import re
+import math
+from typing import Dict, List, Any, Tuple
+
+# 每個段落的 token 上限和相鄰段落的重疊 token 數
+PASSAGE_TOKENS = 200
+PASSAGE_OVERLAP = 40
+
+_CJK = r'\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af'
+_TOKEN_PIECE_RE = re.compile(rf'[{_CJK}]|[A-Za-z]+|\d+|\S')
+_CJK_END_RE = re.compile(rf'[{_CJK}\u3000-\u303f\uff00-\uffef]$')
+_SENTENCE_RE = re.compile(r'(?<=[。！？!?；;\n])|(?<=\.)\s+')
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isascii() and piece.isalpha():
+        return math.ceil(len(piece) / 4)
+    if piece.isdigit():
+        return math.ceil(len(piece) / 3)
+    return 1
+
+
+def count_tokens(text: str) -> int:
+    """估算 token 數（中日韓文字每字 1 個，英文單詞約每 4 個字母 1 個）"""
+    return sum(_piece_tokens(piece) for piece in _TOKEN_PIECE_RE.findall(text or ''))
+
+
+def split_sentences(text: str) -> List[str]:
+    """按中英文句末標點和換行切句"""
+    return [s.strip() for s in _SENTENCE_RE.split(text or '') if s and s.strip()]
+
+
+def _split_long(sentence: str, max_tokens: int) -> List[str]:
+    """超長句子按 token 硬切"""
+    if count_tokens(sentence) <= max_tokens:
+        return [sentence]
+
+    parts, start, size = [], 0, 0
+    for match in _TOKEN_PIECE_RE.finditer(sentence):
+        tokens = _piece_tokens(match.group())
+        if size and size + tokens > max_tokens:
+            parts.append(sentence[start:match.start()].strip())
+            start, size = match.start(), 0
+        size += tokens
+    parts.append(sentence[start:].strip())
+    return [p for p in parts if p]
+
+
+def _join(sentences: List[str]) -> str:
+    """拼接句子（中文之間不加空格）"""
+    text = ''
+    for sentence in sentences:
+        if text and not _CJK_END_RE.search(text):
+            text += ' '
+        text += sentence
+    return text
+
+
+def chunk_text(text: str, max_tokens: int = PASSAGE_TOKENS, overlap: int = PASSAGE_OVERLAP) -> List[str]:
+    """切分為段落（整句不拆開，相鄰段落重疊末尾不超過 overlap 個 token 的句子）"""
+    sentences: List[Tuple[str, int]] = []
+    for sentence in split_sentences(text):
+        sentences.extend((part, count_tokens(part)) for part in _split_long(sentence, max_tokens))
+
+    passages = []
+    current: List[Tuple[str, int]] = []
+    size = 0
+
+    for sentence, tokens in sentences:
+        if current and size + tokens > max_tokens:
+            passages.append(_join([s for s, _ in current]))
+
+            # 上一段末尾的句子作為重疊
+            kept, kept_size = [], 0
+            for s, t in reversed(current):
+                if kept_size + t > overlap or kept_size + t + tokens > max_tokens:
+                    break
+                kept.insert(0, (s, t))
+                kept_size += t
+            current, size = kept, kept_size
+
+        current.append((sentence, tokens))
+        size += tokens
+
+    if current:
+        passages.append(_join([s for s, _ in current]))
+    return passages
+
+
+def chunk_entry(entry: Dict[str, Any], max_tokens: int = PASSAGE_TOKENS,
+                overlap: int = PASSAGE_OVERLAP) -> List[Dict[str, Any]]:
+    """
+    把一個知識庫條目切成段落
+    每個段落帶所屬條目的 ID（id）、日期和元數據，content 為段落文本；沒有內容時用摘要
+    """
+    text = entry.get('content') or entry.get('summary') or ''
+    chunks = chunk_text(text, max_tokens, overlap) or ['']
+
+    return [
+        {
+            'id': entry['id'],
+            'passage_id': f"{entry['id']}#{i}",
+            'passage': i,
+            'passages': len(chunks),
+            'date': entry.get('date', ''),
+            'category': entry.get('category', ''),
+            'heading': entry.get('heading', ''),
+            'summary': entry.get('summary', ''),
+            'tags': entry.get('tags', []),
+            'content': chunk,
+            'tokens': count_tokens(chunk)
+        }
+        for i, chunk in enumerate(chunks)
+    ]
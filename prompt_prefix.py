@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+靜態提示前綴緩存
+SYSTEM_PROMPT.md / SOUL.md / IDENTITY.md / USER.md / TOOLS.md 只讀取和拼接一次（按 mtime 自動重載），
+每個 Agent 的前綴在 Ollama 預熱一次：前綴逐字節不變時 Ollama 直接複用 KV 緩存，
+每次請求只需處理動態後綴（也可選擇傳遞預熱返回的 context）
+"""
+
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+import requests
+
+from singleflight import SingleFlight, request_key, SINGLEFLIGHT_TTL
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+
+# Ollama 熔斷器（與 neur-opt 共用，Ollama 不可用時快速失敗，不再逐個等待超時）
+sys.path.insert(0, str(WORKSPACE / "heartbeat"))
+from circuit_breaker import circuit_breaker
+
+OLLAMA_URL = "http://localhost:11434"
+DEFAULT_MODEL = "qwen2.5:1.5b"
+REQUEST_TIMEOUT = 120
+
+PREFIX_FILES = ('SYSTEM_PROMPT.md', 'SOUL.md', 'IDENTITY.md', 'USER.md', 'TOOLS.md')
+
+# 兩次檢查 mtime 的最短間隔（秒）
+CHECK_INTERVAL = 2.0
+# 模型和 KV 緩存在 Ollama 中保留的時間
+KEEP_ALIVE = "30m"
+
+
+def agent_workspace(agent_id: str) -> Path:
+    """Agent 的工作目錄（main 為主工作目錄，其他為 workspace-<agent>）"""
+    if agent_id == 'main':
+        return WORKSPACE
+    return WORKSPACE.parent / f"workspace-{agent_id}"
+
+
+class PromptPrefix:
+    """一個 Agent 的靜態前綴（文件 mtime 變化時重新拼接）"""
+
+    def __init__(self, workspace: Path, files=PREFIX_FILES, fallback: Optional[Path] = WORKSPACE,
+                 check_interval: float = CHECK_INTERVAL):
+        self.workspace = Path(workspace)
+        self.files = tuple(files)
+        self.fallback = Path(fallback) if fallback else None
+        self.check_interval = check_interval
+
+        self._text = ''
+        self._digest = ''
+        self._mtimes: Dict[Path, float] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _paths(self) -> List[Path]:
+        """每個文件優先用 Agent 自己的版本，沒有時用主工作目錄的"""
+        paths = []
+        for name in self.files:
+            for base in (self.workspace, self.fallback):
+                if base is not None and (base / name).exists():
+                    paths.append(base / name)
+                    break
+        return paths
+
+    def _current_mtimes(self) -> Dict[Path, float]:
+        return {path: path.stat().st_mtime_ns for path in self._paths()}
+
+    def _render(self, paths: List[Path]) -> str:
+        sections = []
+        for path in paths:
+            content = path.read_text(encoding='utf-8').strip()
+            if content:
+                sections.append(f"<!-- {path.name} -->\n{content}")
+        return '\n\n'.join(sections) + '\n\n'
+
+    def refresh(self, force: bool = False) -> bool:
+        """文件有變化時重新拼接，返回是否重載"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+
+            mtimes = self._current_mtimes()
+            if not force and mtimes == self._mtimes:
+                return False
+
+            self._text = self._render(list(mtimes))
+            self._digest = hashlib.sha256(self._text.encode('utf-8')).hexdigest()[:16]
+            self._mtimes = mtimes
+            self.loads += 1
+            return True
+
+    @property
+    def text(self) -> str:
+        """前綴文本"""
+        self.refresh()
+        return self._text
+
+    @property
+    def digest(self) -> str:
+        """前綴內容的哈希"""
+        self.refresh()
+        return self._digest
+
+
+class PrefixCache:
+    """各 Agent 的前綴和 Ollama 預熱狀態"""
+
+    def __init__(self, model: str = DEFAULT_MODEL, ollama_url: str = OLLAMA_URL,
+                 session: Optional[requests.Session] = None, keep_alive: str = KEEP_ALIVE,
+                 use_context: bool = False, workspaces: Optional[Dict[str, Path]] = None,
+                 coalesce_ttl: Optional[float] = SINGLEFLIGHT_TTL):
+        """
+        use_context=False：請求發送完整提示（前綴不變，Ollama 複用前綴的 KV 緩存）
+        use_context=True：請求只發送後綴，附帶預熱時返回的 context（末尾含預熱時生成的一個 token）
+        coalesce_ttl 不為 None 時合併相同的並發請求（見 singleflight），為 None 時不合併
+        """
+        self.model = model
+        self.ollama_url = ollama_url
+        self.session = session or requests.Session()
+        self.keep_alive = keep_alive
+        self.use_context = use_context
+        self.workspaces = workspaces or {}
+
+        self.flight = SingleFlight(ttl=coalesce_ttl) if coalesce_ttl is not None else None
+
+        self._prefixes: Dict[str, PromptPrefix] = {}
+        self._warm: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def prefix(self, agent_id: str) -> PromptPrefix:
+        """Agent 的前綴對象"""
+        with self._lock:
+            if agent_id not in self._prefixes:
+                workspace = self.workspaces.get(agent_id) or agent_workspace(agent_id)
+                self._prefixes[agent_id] = PromptPrefix(workspace)
+            return self._prefixes[agent_id]
+
+    @circuit_breaker('ollama', fail_threshold=3, reset_timeout=60)
+    def _post(self, payload: Dict[str, Any], stream: bool = False):
+        response = self.session.post(f"{self.ollama_url}/api/generate", json=payload,
+                                     stream=stream, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response
+
+    def warm(self, agent_id: str) -> Dict[str, Any]:
+        """在 Ollama 處理一次前綴（載入模型並填充 KV 緩存）"""
+        prefix = self.prefix(agent_id)
+        text, digest = prefix.text, prefix.digest
+
+        start = time.perf_counter()
+        data = self._post({
+            'model': self.model,
+            'prompt': text,
+            'raw': True,
+            'stream': False,
+            'keep_alive': self.keep_alive,
+            'options': {'num_predict': 1}
+        }).json()
+
+        state = {
+            'digest': digest,
+            'context': data.get('context'),
+            'prompt_eval_count': data.get('prompt_eval_count'),
+            'warm_seconds': time.perf_counter() - start,
+            'warmed_at': time.time()
+        }
+        with self._lock:
+            self._warm[agent_id] = state
+        return state
+
+    def ensure_warm(self, agent_id: str) -> Dict[str, Any]:
+        """前綴未預熱或已變化時重新預熱"""
+        digest = self.prefix(agent_id).digest
+        state = self._warm.get(agent_id)
+        if state is None or state['digest'] != digest:
+            state = self.warm(agent_id)
+        return state
+
+    def build_payload(self, agent_id: str, suffix: str, options: Optional[Dict[str, Any]] = None,
+                      stream: bool = False) -> Dict[str, Any]:
+        """請求內容（前綴 + 動態後綴）"""
+        state = self.ensure_warm(agent_id)
+        payload = {
+            'model': self.model,
+            'raw': True,
+            'stream': stream,
+            'keep_alive': self.keep_alive,
+            'options': options or {}
+        }
+        if self.use_context and state.get('context'):
+            payload['context'] = state['context']
+            payload['prompt'] = suffix
+        else:
+            payload['prompt'] = self.prefix(agent_id).text + suffix
+        return payload
+
+    def _flight_key(self, agent_id: str, payload: Dict[str, Any], stream: bool) -> str:
+        return request_key(payload['prompt'], self.model, payload['options'], agent=agent_id,
+                           prefix=self._warm[agent_id]['digest'], stream=stream)
+
+    def generate(self, agent_id: str, suffix: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """生成回覆（非流式，相同的並發請求共用一次生成）"""
+        payload = self.build_payload(agent_id, suffix, options)
+        if self.flight is None:
+            return self._post(payload).json()
+        return self.flight.do(self._flight_key(agent_id, payload, False), lambda: self._post(payload).json())
+
+    def _stream_chunks(self, payload: Dict[str, Any]):
+        response = self._post(payload, stream=True)
+        # 調用方提前停止讀取時也要釋放連接
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    break
+        finally:
+            response.close()
+
+    def stream(self, agent_id: str, suffix: str, options: Optional[Dict[str, Any]] = None):
+        """流式生成，逐個返回文本片段（相同的並發請求收到同一組片段）"""
+        payload = self.build_payload(agent_id, suffix, options, stream=True)
+        if self.flight is None:
+            return self._stream_chunks(payload)
+        return self.flight.stream(self._flight_key(agent_id, payload, True), lambda: self._stream_chunks(payload))
+
+
+def time_to_first_token(post, payload: Dict[str, Any]) -> float:
+    """發送流式請求，返回收到第一個文本片段的耗時（秒）"""
+    start = time.perf_counter()
+    response = post(payload)
+    try:
+        for line in response.iter_lines():
+            if line and json.loads(line).get('response'):
+                return time.perf_counter() - start
+    finally:
+        response.close()
+    return time.perf_counter() - start
+
+
+def benchmark_ttft(cache: PrefixCache, agent_id: str, suffixes: List[str],
+                   options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    對比首 token 延遲：
+    cold —— 前綴開頭加唯一標記（KV 緩存無法複用，每次重新處理整個前綴）
+    cached —— 預熱後的前綴 + 後綴
+    """
+    options = {'num_predict': 1, **(options or {})}
+    post = lambda payload: cache._post(payload, stream=True)
+
+    cold, cached = [], []
+    for suffix in suffixes:
+        payload = cache.build_payload(agent_id, suffix, options, stream=True)
+        payload.pop('context', None)
+        payload['prompt'] = f"<!-- {uuid.uuid4().hex} -->\n" + cache.prefix(agent_id).text + suffix
+        cold.append(time_to_first_token(post, payload))
+
+    # 未緩存的請求已覆蓋 KV 緩存，重新預熱
+    cache.warm(agent_id)
+    for suffix in suffixes:
+        cached.append(time_to_first_token(post, cache.build_payload(agent_id, suffix, options, stream=True)))
+
+    def mean(values):
+        return sum(values) / len(values) if values else 0.0
+
+    return {
+        'agent_id': agent_id,
+        'model': cache.model,
+        'prefix_chars': len(cache.prefix(agent_id).text),
+        'runs': len(suffixes),
+        'cold_ttft': mean(cold),
+        'cached_ttft': mean(cached),
+        'speedup': mean(cold) / mean(cached) if mean(cached) else None
+    }
+
+
+def main():
+    """主函數"""
+    parser = argparse.ArgumentParser(description='靜態提示前綴緩存')
+    parser.add_argument('--agent', default='main', help='Agent ID')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Ollama 模型')
+    parser.add_argument('--runs', type=int, default=5, help='基準測試次數')
+    parser.add_argument('--use-context', action='store_true', help='傳遞預熱返回的 context')
+    parser.add_argument('--benchmark', action='store_true', help='測量首 token 延遲')
+    args = parser.parse_args()
+
+    cache = PrefixCache(model=args.model, use_context=args.use_context)
+    prefix = cache.prefix(args.agent)
+    print(f"📄 前綴：{len(prefix.text)} 字符（{prefix.digest}）")
+
+    try:
+        state = cache.warm(args.agent)
+    except requests.RequestException as e:
+        print(f"❌ 預熱失敗: {e}")
+        return 1
+    print(f"🔥 預熱完成：{state['warm_seconds']:.2f} 秒，前綴 {state['prompt_eval_count']} tokens")
+
+    if args.benchmark:
+        suffixes = [f"\n用戶：第 {i} 個問題，今日天氣如何？\n助手：" for i in range(args.runs)]
+        result = benchmark_ttft(cache, args.agent, suffixes)
+        print(f"⏱️  首 token 延遲：未緩存 {result['cold_ttft'] * 1000:.0f} ms，"
+              f"緩存前綴 {result['cached_ttft'] * 1000:.0f} ms（{result['speedup']:.1f}×）")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,11 +13,22 @@ import os
 import json
 import hashlib
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 import re
 import subprocess
 from datetime import datetime
 
+import numpy as np
+
+from knowledge_store import KnowledgeStore
+from vector_index import VectorIndex, write_index, current_version
+from hnsw_index import HNSWIndex
+from passage_chunker import chunk_entry
+
+
+# 偽嵌入維度（SHA-256 十六進制摘要每位一維）
+EMBEDDING_DIM = 64
+
 
 class RAGCache:
     """RAG 緩存類"""
@@ -28,17 +39,22 @@ class RAGCache:
 
         self.workspace = workspace
         self.kb_file = workspace / "knowledge-base.md"
+        self.kb_store = KnowledgeStore(workspace / "knowledge")
         self.cache_file = workspace / "rag" / "cache.json"
         self.index_file = workspace / "rag" / "index.json"
+        self.vector_dir = workspace / "rag" / "vectors"
+        self.vector_index = None
+        self.hnsw = None
         self.log_file = workspace / "rag" / "log.txt"
 
         # 創建目錄
         self.cache_file.parent.mkdir(parents=True, exist_ok=True)
         self.index_file.parent.mkdir(parents=True, exist_ok=True)
 
-        # 加載現有緩存
+        # 加載現有緩存（向量索引只 mmap 打開，元數據按需逐行讀取）
         self.cache = self._load_cache()
-        self.index = self._load_index()
+        self._index = None
+        self._load_index()
 
         self._log("RAG Cache 初始化完成")
 
@@ -54,17 +70,106 @@ class RAGCache:
         with open(self.cache_file, 'w', encoding='utf-8') as f:
             json.dump(self.cache, f, indent=2, ensure_ascii=False)
 
-    def _load_index(self) -> List[Dict[str, Any]]:
-        """加載索引"""
-        if self.index_file.exists():
+    @property
+    def index(self) -> List[Dict[str, Any]]:
+        """未刪除段落的元數據（有向量索引時每次從 mmap 讀取，不常駐內存）"""
+        if self._index is not None:
+            return self._index
+        return list(self._iter_entries())
+
+    @index.setter
+    def index(self, entries: List[Dict[str, Any]]) -> None:
+        self._index = entries
+
+    def _live_rows(self) -> Iterator[int]:
+        """向量索引中未刪除的行號"""
+        for i in range(self.vector_index.count):
+            if self.hnsw is None or not self.hnsw.deleted[i]:
+                yield i
+
+    def _iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """逐個讀取未刪除段落的元數據"""
+        if self._index is not None:
+            yield from self._index
+        elif self.vector_index is not None:
+            for i in self._live_rows():
+                yield self.vector_index.metadata(i)
+
+    def _open_vector_index(self, index: VectorIndex) -> None:
+        """切換到指定版本的向量索引（有 HNSW 圖時一併加載），關閉被取代的舊版本"""
+        previous = self.vector_index
+        self.vector_index = index
+        self.hnsw = HNSWIndex.from_vector_index(index) if 'hnsw' in index.manifest else None
+        self._index = None
+
+        if previous is not None and previous is not index:
+            previous.close()
+
+    def _load_index(self) -> None:
+        """加載索引（優先 mmap 打開二進制向量索引，否則讀取舊的 index.json）"""
+        if current_version(self.vector_dir):
+            self._open_vector_index(VectorIndex(self.vector_dir))
+        elif self.index_file.exists():
             with open(self.index_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+                self._index = json.load(f)
+        else:
+            self._index = []
+
+    def _save_index(self, embeddings: List[List[float]]) -> None:
+        """保存索引（構建 HNSW 圖，寫入新版本向量索引並原子切換）"""
+        if not embeddings:
+            version = write_index(np.zeros((0, EMBEDDING_DIM)), [], root=self.vector_dir)
+            self._open_vector_index(VectorIndex(self.vector_dir, version))
+            return
+
+        hnsw = HNSWIndex(len(embeddings[0]))
+        for embedding, entry in zip(embeddings, self.index):
+            hnsw.add(embedding, entry)
 
-    def _save_index(self) -> None:
-        """保存索引"""
-        with open(self.index_file, 'w', encoding='utf-8') as f:
-            json.dump(self.index, f, indent=2, ensure_ascii=False)
+        version = hnsw.save(self.vector_dir, quantize=True)
+        self._open_vector_index(VectorIndex(self.vector_dir, version))
+
+    def _passage_embedding(self, passage: Dict[str, Any]) -> List[float]:
+        """段落的嵌入（標題 + 段落文本）"""
+        return self._get_embedding(passage['heading'] + " " + passage['content'])
+
+    @staticmethod
+    def _replacement_key(entry: Dict[str, Any]) -> tuple:
+        """替換舊段落用的鍵（條目 ID 不含日期，不同日期的同名條目各自保留）"""
+        return entry.get('date') or '', entry['id']
+
+    def add_entries(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        增量加入條目（切成段落，同日期同 ID 條目的舊段落軟刪除），保存為新版本索引
+        返回加入的條目數
+        """
+        if not entries:
+            return 0
+
+        if self.hnsw is None:
+            # 還沒有 HNSW 圖：先用現有段落構建
+            hnsw = HNSWIndex(EMBEDDING_DIM)
+            for passage in self._iter_entries():
+                hnsw.add(self._passage_embedding(passage), passage)
+        else:
+            hnsw = self.hnsw
+
+        live = {}
+        for i in range(hnsw.count):
+            if not hnsw.deleted[i]:
+                live.setdefault(self._replacement_key(hnsw.get_metadata(i)), []).append(i)
+
+        for entry in entries:
+            for node in live.pop(self._replacement_key(entry), []):
+                hnsw.delete(node)
+            for passage in chunk_entry(entry):
+                hnsw.add(self._passage_embedding(passage), passage)
+
+        version = hnsw.save(self.vector_dir, quantize=True)
+        self._open_vector_index(VectorIndex(self.vector_dir, version))
+
+        self._log(f"增量加入 {len(entries)} 個條目，索引版本 {version}")
+        return len(entries)
 
     def _log(self, message: str) -> None:
         """記錄日誌"""
@@ -154,11 +259,27 @@ class RAGCache:
         self._save_cache()
         self._log(f"緩存存儲: {question[:50]}...")
 
-    def load_knowledge_base(self) -> List[Dict[str, Any]]:
+    def load_knowledge_base(self, dates: Optional[List[str]] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         加載知識庫
-        解析 knowledge-base.md
+        優先按分段流式讀取（可只讀指定日期），沒有分段時解析 knowledge-base.md
         """
+        if self.kb_store.segments():
+            entries = [
+                {
+                    'category': entry['category'],
+                    'heading': entry['heading'],
+                    'content': entry['content'],
+                    'tags': entry['tags'],
+                    'summary': entry['summary'],
+                    'id': entry['id'],
+                    'date': entry['date']
+                }
+                for entry in self.kb_store.iter_entries(dates=dates, since=since)
+            ]
+            self._log(f"從分段存儲加載了 {len(entries)} 個知識庫條目")
+            return entries
+
         if not self.kb_file.exists():
             self._log(f"警告：知識庫不存在: {self.kb_file}")
             return []
@@ -253,51 +374,43 @@ class RAGCache:
     def build_index(self) -> None:
         """
         構建索引
-        從知識庫加載條目並建立索引
+        從知識庫加載條目，切成段落後建立索引（每個段落帶所屬條目的 ID 和元數據）
         """
         self._log("開始構建 RAG 索引...")
 
         entries = self.load_knowledge_base()
 
-        # 構建索引
+        # 構建索引（元數據和向量分開保存）
         self.index = []
+        embeddings = []
 
         for entry in entries:
-            # 計算嵌入
-            embedding = self._get_embedding(entry['heading'] + " " + entry.get('summary', ''))
-
-            self.index.append({
-                'id': entry['id'],
-                'category': entry['category'],
-                'heading': entry['heading'],
-                'content': entry['content'],
-                'tags': entry.get('tags', []),
-                'summary': entry.get('summary', ''),
-                'embedding': embedding
-            })
+            for passage in chunk_entry(entry):
+                embeddings.append(self._passage_embedding(passage))
+                self.index.append(passage)
 
         # 保存索引
-        self._save_index()
+        self._save_index(embeddings)
 
         # 統計
         category_stats = {}
-        for entry in self.index:
+        for entry in entries:
             cat = entry['category']
             category_stats[cat] = category_stats.get(cat, 0) + 1
 
-        self._log(f"索引構建完成: {len(self.index)} 個條目")
+        self._log(f"索引構建完成: {len(embeddings)} 個段落（{len(entries)} 個條目）")
         self._log(f"分類統計: {category_stats}")
 
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         搜索知識庫
-        返回相關條目（按相似度排序）
+        返回相關段落（按相似度排序，content 只含命中的段落）
         """
         self._log(f"搜索查詢: {query}")
 
         # 計算每個條目的相似度
         results = []
-        for entry in self.index:
+        for entry in self._iter_entries():
             score = self._calculate_similarity(query, entry)
 
             if score > 0:
@@ -314,6 +427,31 @@ class RAGCache:
         self._log(f"找到 {len(top_results)} 個相關結果")
         return top_results
 
+    def semantic_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        向量搜索段落（mmap 索引，有新版本時自動切換）
+        """
+        if self.vector_index is None:
+            return []
+
+        index = self.vector_index.reload()
+        if index is not self.vector_index:
+            self._open_vector_index(index)
+            self._log(f"切換到新版本向量索引: {index.version}")
+
+        embedding = self._get_embedding(query)
+
+        # 有 HNSW 圖時近似搜索，否則暴力搜索
+        if self.hnsw is not None:
+            hits = self.hnsw.search(embedding, top_k)
+        else:
+            hits = self.vector_index.search(embedding, top_k)
+
+        return [
+            {**self.vector_index.metadata(i), 'score': score}
+            for i, score in hits
+        ]
+
     def query(self, question: str, use_cache: bool = True) -> tuple[Optional[str], List[Dict[str, Any]]]:
         """
         查詢知識庫
@@ -337,10 +475,11 @@ class RAGCache:
         return {
             'total_entries': len(self.cache),
             'total_queries': total_queries,
-            'index_size': len(self.index),
+            'index_size': sum(1 for _ in self._live_rows()) if self._index is None else len(self._index),
             'kb_file': str(self.kb_file),
             'cache_file': str(self.cache_file),
-            'index_file': str(self.index_file)
+            'index_file': str(self.index_file),
+            'vector_index': self.vector_index.version if self.vector_index else None
         }
 
 
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+每日簡報預渲染產物
+預計算階段一次渲染 Markdown / HTML / Telegram-HTML 三個版本，按日期和欄目哈希保存為版本化產物；
+欄目內容沒變時重用上一版本的渲染片段，只重新渲染變化的欄目。
+發送和查詢階段直接讀取產物
+"""
+
+import os
+import re
+import json
+import html
+import hashlib
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_ARTIFACT_DIR = WORKSPACE / "reports" / "artifacts"
+
+VARIANTS = ('markdown', 'html', 'telegram')
+
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+
+
+def section_hash(report: Dict[str, Any]) -> str:
+    """欄目內容哈希（標題、內容和狀態）"""
+    payload = json.dumps(
+        {'title': report['title'], 'content': report['content'], 'status': report['status']},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _inline_html(text: str) -> str:
+    """轉義 HTML 並把 **粗體** 轉成 <b>"""
+    return _BOLD_RE.sub(r'<b>\1</b>', html.escape(text, quote=False))
+
+
+def render_section(report: Dict[str, Any]) -> Dict[str, str]:
+    """渲染單個欄目的三個版本"""
+    title = report['title']
+    content = report['content'][0] if report['content'] else ''
+
+    paragraphs = "\n".join(
+        f"<p>{_inline_html(line)}</p>" for line in content.strip().splitlines() if line.strip()
+    )
+
+    return {
+        'markdown': f"{title}\n{content}",
+        'html': f"<section>\n<h2>{html.escape(title)}</h2>\n{paragraphs}\n</section>",
+        'telegram': f"<b>{html.escape(title)}</b>\n{_inline_html(content.strip())}"
+    }
+
+
+def assemble(variant: str, date: str, fragments: List[str], summary: List[str], generated_at: datetime) -> str:
+    """把欄目片段組合成完整簡報"""
+    if variant == 'markdown':
+        body = "\n\n---\n\n".join(fragments)
+        summary_text = "\n".join(summary)
+        return f"""# 每日簡報
+**日期：{date}**
+**時間：{generated_at.strftime('%H:%M:%S')}**
+
+---
+
+{body}
+
+---
+
+**簡報摘要**
+{summary_text}
+
+**生成時間：{generated_at.strftime('%H:%M:%S')}**
+
+---
+
+**系統助手 - 技術支援系統**
+"""
+
+    if variant == 'html':
+        body = "\n".join(fragments)
+        items = "\n".join(f"<li>{html.escape(line.lstrip('- '))}</li>" for line in summary)
+        return f"""<!DOCTYPE html>
+<html lang="zh-HK">
+<head><meta charset="utf-8"><title>每日簡報 {date}</title></head>
+<body>
+<h1>每日簡報</h1>
+<p><b>日期：</b>{date} <b>時間：</b>{generated_at.strftime('%H:%M:%S')}</p>
+{body}
+<h2>簡報摘要</h2>
+<ul>
+{items}
+</ul>
+<p>系統助手 - 技術支援系統</p>
+</body>
+</html>
+"""
+
+    if variant == 'telegram':
+        body = "\n\n".join(fragments)
+        summary_text = html.escape("\n".join(summary), quote=False)
+        return f"<b>日期：</b>{date}\n\n{body}\n\n<b>簡報摘要</b>\n{summary_text}"
+
+    raise ValueError(f"未知的簡報版本：{variant}")
+
+
+def build_artifact(date: str, sections: List[Tuple[str, str, Dict[str, Any]]], summary: List[str],
+                   metadata: Optional[Dict[str, Any]] = None,
+                   previous: Optional[Dict[str, Any]] = None,
+                   generated_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """生成產物（sections 為 (名稱, 顯示名稱, 欄目) 列表，欄目哈希沒變的重用上一版本片段）"""
+    generated_at = generated_at or datetime.now(HK_TZ)
+    previous_hashes = previous['section_hashes'] if previous else {}
+
+    hashes = {}
+    fragments = {}
+    rendered = []
+
+    for name, _, report in sections:
+        hashes[name] = section_hash(report)
+
+        if previous_hashes.get(name) == hashes[name]:
+            fragments[name] = previous['fragments'][name]
+        else:
+            fragments[name] = render_section(report)
+            rendered.append(name)
+
+    version = hashlib.sha256(
+        "\n".join(f"{name}:{hashes[name]}" for name, _, _ in sections).encode('utf-8')
+    ).hexdigest()[:12]
+
+    variants = {
+        variant: assemble(variant, date, [fragments[name][variant] for name, _, _ in sections],
+                          summary, generated_at)
+        for variant in VARIANTS
+    }
+
+    return {
+        'date': date,
+        'version': version,
+        'created_at': generated_at.isoformat(),
+        'section_hashes': hashes,
+        'fragments': fragments,
+        'variants': variants,
+        'rendered': rendered,
+        'metadata': metadata or {}
+    }
+
+
+class ReportArtifactStore:
+    """產物存儲（每日一個目錄，每個版本一個文件，latest.json 指向當前版本）"""
+
+    def __init__(self, root: Path = DEFAULT_ARTIFACT_DIR):
+        self.root = Path(root)
+
+    def _write_json(self, path: Path, data: Dict[str, Any]):
+        """原子寫入"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, artifact: Dict[str, Any]):
+        """保存產物並切換當前版本"""
+        day_dir = self.root / artifact['date']
+        self._write_json(day_dir / f"{artifact['version']}.json", artifact)
+        self._write_json(day_dir / "latest.json", {'version': artifact['version'], 'created_at': artifact['created_at']})
+
+    def get(self, date: str, version: str) -> Optional[Dict[str, Any]]:
+        """讀取指定版本"""
+        return self._read_json(self.root / date / f"{version}.json")
+
+    def latest(self, date: str) -> Optional[Dict[str, Any]]:
+        """讀取當日的當前版本"""
+        pointer = self._read_json(self.root / date / "latest.json")
+        if not pointer:
+            return None
+        return self.get(date, pointer['version'])
+
+    def versions(self, date: str) -> List[str]:
+        """當日所有版本"""
+        day_dir = self.root / date
+        if not day_dir.exists():
+            return []
+        return sorted(p.stem for p in day_dir.glob("*.json") if p.stem != 'latest')
+
+
+def handle_briefing_query(query: str, store: Optional[ReportArtifactStore] = None,
+                          variant: str = 'markdown') -> str:
+    """回答「今日簡報有什麼」（只讀預渲染產物）"""
+    store = store or ReportArtifactStore()
+    artifact = store.latest(datetime.now(HK_TZ).strftime('%Y-%m-%d'))
+
+    if not artifact:
+        return "今日簡報尚未生成，請稍後再試"
+
+    return artifact['variants'][variant]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+測試多來源對沖天氣獲取
+"""
+
+import time
+
+from weather_providers import Provider, HedgedWeatherFetcher, providers_for, shared_fetcher
+import weather_openmeteo
+
+
+def make_fetch(name, delay=0.0, fail=False):
+    """生成模擬來源"""
+    calls = []
+
+    def fetch(timeout):
+        calls.append(time.monotonic())
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"{name} 不可用")
+        return {'temperature': 28.0, 'source': name}
+
+    fetch.calls = calls
+    return fetch
+
+
+def test_hedge_after_p95():
+    """測試主來源超過 p95 未返回時對沖到次來源"""
+    slow = Provider('slow', make_fetch('slow', delay=0.5))
+    fast = Provider('fast', make_fetch('fast', delay=0.01))
+
+    # 主來源平時 20ms 返回
+    for _ in range(10):
+        slow.record(0.02, True)
+    fast.record(0.05, True)
+
+    fetcher = HedgedWeatherFetcher([slow, fast], ttl=60, deadline=2)
+    start = time.monotonic()
+    observation = fetcher.fetch()
+    elapsed = time.monotonic() - start
+
+    assert observation['source'] == 'fast'
+    assert elapsed < 0.3
+    assert len(slow.fetch.calls) == 1 and len(fast.fetch.calls) == 1
+    print("  ✅ 對沖請求正確")
+
+
+def test_failure_reorders_and_cache():
+    """測試失敗來源被降級，結果被緩存"""
+    broken = Provider('broken', make_fetch('broken', fail=True))
+    backup = Provider('backup', make_fetch('backup'))
+
+    fetcher = HedgedWeatherFetcher([broken, backup], ttl=60, deadline=2)
+    assert fetcher.fetch()['source'] == 'backup'
+    time.sleep(0.05)
+    assert [p.name for p in fetcher.ranked_providers()] == ['backup', 'broken']
+
+    # TTL 內直接返回緩存
+    cached = fetcher.fetch()
+    assert cached['cached'] and not cached['stale']
+    assert len(backup.fetch.calls) == 1
+    print("  ✅ 排序和緩存正確")
+
+
+def test_stale_cache_when_all_fail():
+    """測試所有來源失敗時返回過期緩存"""
+    flaky_fetch = make_fetch('flaky')
+    provider = Provider('flaky', flaky_fetch)
+    fetcher = HedgedWeatherFetcher([provider], ttl=0, deadline=1)
+    assert fetcher.fetch()['source'] == 'flaky'
+
+    def broken(timeout):
+        raise ConnectionError("down")
+    provider.fetch = broken
+
+    observation = fetcher.fetch()
+    assert observation['stale']
+    assert observation['source'] == 'flaky'
+    print("  ✅ 過期緩存回退正確")
+
+
+def test_entry_point_providers():
+    """測試查詢腳本的來源順序和缺失字段的輸出"""
+    assert [p.name for p in providers_for('Open-Meteo')] == ['Open-Meteo', 'HKO', 'wttr.in']
+    assert [p.name for p in providers_for('wttr.in', 'Hong Kong')] == ['wttr.in', 'HKO', 'Open-Meteo']
+    assert [p.name for p in providers_for('wttr.in', 'Tokyo')] == ['wttr.in']
+
+    # 對沖到天文台時沒有風速和天氣描述，濕度也可能缺失
+    hko = Provider('HKO', lambda timeout: {'temperature': 29.0, 'humidity': None, 'wind_speed': None,
+                                           'weather_condition': None, 'source': 'HKO'})
+    original = weather_openmeteo.shared_fetcher
+    with HedgedWeatherFetcher([hko]) as fetcher:
+        weather_openmeteo.shared_fetcher = lambda primary: fetcher
+        try:
+            text = weather_openmeteo.get_weather_opnmeteo()
+        finally:
+            weather_openmeteo.shared_fetcher = original
+    assert '29.0°C' in text and '**湿度**：未知' in text and 'HKO' in text
+
+    # 查詢腳本共用同一個獲取器，TTL 緩存和延遲統計跨請求保留
+    assert shared_fetcher('Open-Meteo') is shared_fetcher('Open-Meteo')
+    assert shared_fetcher('wttr.in', 'Tokyo') is not shared_fetcher('wttr.in', 'Hong Kong')
+    print("  ✅ 查詢腳本對沖正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("多來源對沖天氣獲取測試")
+    print("=" * 60)
+    print()
+
+    test_hedge_after_p95()
+    test_failure_reorders_and_cache()
+    test_stale_cache_when_all_fail()
+    test_entry_point_providers()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+多來源天氣獲取（香港天文台、Open-Meteo、wttr.in）
+對沖請求：先問最快的來源，超過其 p95 延遲仍未返回就同時問下一個，取最先返回的有效結果
+"""
+
+import json
+import math
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Any, Optional
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+HKO_URL = "https://data.weather.gov.hk/weatherAPI/opendata/weather.php?dataType=rhrread&lang=tc"
+OPENMETEO_URL = (
+    "https://api.open-meteo.com/v1/forecast?latitude=22.3193&longitude=114.1694"
+    "&current=temperature_2m,relative_humidity_2m,precipitation,wind_speed_10m,"
+    "wind_direction_10m,weather_code&timezone=Asia%2FHong_Kong"
+)
+WTTR_URL = "https://wttr.in/{city}?lang=zh&format=j1"
+
+# Open-Meteo 天氣代碼
+OPENMETEO_WEATHER_CODES = {
+    0: "晴朗",
+    1: "多云",
+    2: "阴天",
+    3: "雷阵雨",
+    45: "雾",
+    48: "毛毛雨",
+    51: "毛毛雨",
+    53: "阵雨",
+    55: "雷阵雨",
+    61: "大雨",
+    63: "暴雨",
+    65: "大雪",
+    66: "雨夹雪",
+    67: "雨夹雪",
+    71: "小雪",
+    73: "中雪",
+    75: "大雪",
+    77: "阵雨夹雪",
+    80: "雷阵雨",
+    81: "雷雨",
+    82: "雷阵雨",
+    85: "暴雪",
+    95: "雷暴",
+    96: "雷暴",
+    99: "雷暴"
+}
+
+COMPASS_POINTS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                  'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+
+DEFAULT_HEDGE_DELAY = 2.0   # 未有足夠延遲樣本時的對沖等待（秒）
+ERROR_PENALTY = 10.0        # 錯誤率對排序的懲罰（秒）
+
+
+def _get_json(url: str, timeout: float) -> Any:
+    """GET 並解析 JSON"""
+    req = urllib.request.Request(url, headers={'User-Agent': 'jarvis-weather/1.0'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _number(value) -> Optional[float]:
+    """轉成數字（失敗返回 None）"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compass(degrees) -> Optional[str]:
+    """角度轉 16 方位"""
+    degrees = _number(degrees)
+    if degrees is None:
+        return None
+    return COMPASS_POINTS[int((degrees % 360) / 22.5 + 0.5) % 16]
+
+
+def fetch_hko(timeout: float = 10) -> Dict[str, Any]:
+    """香港天文台 rhrread（天文台總部讀數）"""
+    data = _get_json(HKO_URL, timeout)
+
+    temperature = None
+    for entry in (data.get('temperature') or {}).get('data') or []:
+        if entry.get('place') == '香港天文台':
+            temperature = _number(entry.get('value'))
+
+    humidity_data = (data.get('humidity') or {}).get('data') or []
+
+    return {
+        'temperature': temperature,
+        'humidity': _number(humidity_data[0].get('value')) if humidity_data else None,
+        'rainfall': None,
+        'wind_speed': None,
+        'wind_direction': None,
+        'weather_condition': None,
+        'observation_time': datetime.fromisoformat(data['updateTime']),
+        'source': 'HKO'
+    }
+
+
+def fetch_openmeteo(timeout: float = 10) -> Dict[str, Any]:
+    """Open-Meteo 當前天氣"""
+    current = _get_json(OPENMETEO_URL, timeout)['current']
+
+    return {
+        'temperature': _number(current.get('temperature_2m')),
+        'humidity': _number(current.get('relative_humidity_2m')),
+        'rainfall': _number(current.get('precipitation')),
+        'wind_speed': _number(current.get('wind_speed_10m')),
+        'wind_direction': _compass(current.get('wind_direction_10m')),
+        'weather_condition': OPENMETEO_WEATHER_CODES.get(current.get('weather_code'), "未知"),
+        'observation_time': datetime.fromisoformat(current['time']).replace(tzinfo=HK_TZ),
+        'source': 'Open-Meteo'
+    }
+
+
+def fetch_wttr(timeout: float = 10, city: str = "Hong Kong") -> Dict[str, Any]:
+    """wttr.in 當前天氣（JSON 格式）"""
+    url = WTTR_URL.format(city=urllib.parse.quote(city))
+    current = _get_json(url, timeout)['current_condition'][0]
+
+    description = (current.get('lang_zh') or current.get('weatherDesc') or [{}])[0].get('value')
+
+    return {
+        'temperature': _number(current.get('temp_C')),
+        'humidity': _number(current.get('humidity')),
+        'rainfall': _number(current.get('precipMM')),
+        'wind_speed': _number(current.get('windspeedKmph')),
+        'wind_direction': current.get('winddir16Point'),
+        'weather_condition': description,
+        'observation_time': datetime.now(HK_TZ),
+        'source': 'wttr.in'
+    }
+
+
+def is_valid_observation(observation: Any) -> bool:
+    """有效觀測：至少要有溫度"""
+    return isinstance(observation, dict) and observation.get('temperature') is not None
+
+
+class Provider:
+    """天氣來源（記錄延遲和錯誤率的 EWMA）"""
+
+    def __init__(self, name: str, fetch: Callable[[float], Dict[str, Any]],
+                 alpha: float = 0.2, window: int = 50):
+        self.name = name
+        self.fetch = fetch
+        self.alpha = alpha
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """記錄一次請求結果"""
+        with self._lock:
+            self.latencies.append(latency)
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+            self.error_ewma += self.alpha * ((0.0 if ok else 1.0) - self.error_ewma)
+
+    def p95(self, default: float = DEFAULT_HEDGE_DELAY) -> float:
+        """最近延遲的 p95（樣本不足時返回默認值）"""
+        with self._lock:
+            if len(self.latencies) < 5:
+                return default
+            ordered = sorted(self.latencies)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    def score(self) -> float:
+        """排序分數（越小越優先；未試過的來源按 0 延遲處理）"""
+        with self._lock:
+            return (self.latency_ewma or 0.0) + self.error_ewma * ERROR_PENALTY
+
+    def stats(self) -> Dict[str, Any]:
+        """來源統計"""
+        return {
+            'name': self.name,
+            'latency_ewma': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'error_ewma': round(self.error_ewma, 3),
+            'p95': round(self.p95(), 3),
+            'samples': len(self.latencies)
+        }
+
+
+def default_providers() -> List[Provider]:
+    """默認來源（香港天文台優先）"""
+    return [
+        Provider('HKO', fetch_hko),
+        Provider('Open-Meteo', fetch_openmeteo),
+        Provider('wttr.in', fetch_wttr)
+    ]
+
+
+def providers_for(primary: str, city: str = "Hong Kong") -> List[Provider]:
+    """以 primary 為首的來源列表（香港以外的城市只有 wttr.in 支持）"""
+    if city.replace(' ', '').lower() != 'hongkong':
+        return [Provider('wttr.in', lambda timeout: fetch_wttr(timeout, city=city))]
+
+    return sorted(default_providers(), key=lambda provider: provider.name != primary)
+
+
+class HedgedWeatherFetcher:
+    """對沖式多來源天氣獲取（帶 TTL 緩存）"""
+
+    def __init__(self, providers: List[Provider] = None, ttl: float = 300,
+                 request_timeout: float = 10, deadline: float = 5):
+        self.providers = providers or default_providers()
+        self.ttl = ttl
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+
+        self._executor = ThreadPoolExecutor(max_workers=len(self.providers) * 2)
+        self._cache = None
+        self._cache_time = 0.0
+        self._lock = threading.Lock()
+
+    def ranked_providers(self) -> List[Provider]:
+        """按延遲 / 錯誤率 EWMA 排序（分數相同時保持原順序）"""
+        return sorted(self.providers, key=lambda provider: provider.score())
+
+    def _submit(self, provider: Provider):
+        """提交請求，完成時（即使已經有結果）更新來源統計"""
+        start = time.monotonic()
+        future = self._executor.submit(provider.fetch, self.request_timeout)
+
+        def on_done(done):
+            ok = done.exception() is None and is_valid_observation(done.result())
+            provider.record(time.monotonic() - start, ok)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def _cached(self, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """讀取緩存"""
+        with self._lock:
+            if self._cache is None:
+                return None
+            age = time.monotonic() - self._cache_time
+            if age > self.ttl and not allow_stale:
+                return None
+            observation = dict(self._cache)
+
+        observation['cached'] = True
+        observation['stale'] = age > self.ttl
+        return observation
+
+    def fetch(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """獲取當前天氣（最先返回的有效結果；全部失敗時返回過期緩存）"""
+        if not force:
+            cached = self._cached()
+            if cached is not None:
+                return cached
+
+        queue = self.ranked_providers()
+        pending = {}
+        deadline = time.monotonic() + self.deadline
+
+        def launch_next():
+            provider = queue.pop(0)
+            pending[self._submit(provider)] = provider
+            return provider
+
+        current = launch_next()
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            wait_for = min(current.p95(), remaining) if queue else remaining
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.pop(future)
+                if future.exception() is None and is_valid_observation(future.result()):
+                    observation = dict(future.result())
+                    with self._lock:
+                        self._cache = observation
+                        self._cache_time = time.monotonic()
+                    observation['cached'] = False
+                    observation['stale'] = False
+                    return observation
+
+            # 超過 p95 未返回，或已返回但無效：對沖到下一個來源
+            if queue:
+                current = launch_next()
+
+        return self._cached(allow_stale=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """所有來源統計（按當前排序）"""
+        return [provider.stats() for provider in self.ranked_providers()]
+
+    def close(self):
+        """關閉線程池（不等待仍在進行的對沖請求）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> 'HedgedWeatherFetcher':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared_fetchers: Dict[tuple, HedgedWeatherFetcher] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_fetcher(primary: str, city: str = "Hong Kong") -> HedgedWeatherFetcher:
+    """進程內共用的獲取器（同一來源和城市只創建一次，TTL 緩存和延遲統計跨請求保留）"""
+    key = (primary, city)
+    with _shared_lock:
+        if key not in _shared_fetchers:
+            _shared_fetchers[key] = HedgedWeatherFetcher(providers_for(primary, city),
+                                                         request_timeout=10, deadline=10)
+        return _shared_fetchers[key]
+
+
+def main():
+    """主函數 - 測試多來源天氣獲取"""
+    print("=" * 60)
+    print("多來源天氣獲取測試")
+    print("=" * 60)
+    print()
+
+    with HedgedWeatherFetcher() as fetcher:
+        for i in range(int(sys.argv[1]) if len(sys.argv) > 1 else 3):
+            start = time.monotonic()
+            observation = fetcher.fetch(force=True)
+            elapsed = (time.monotonic() - start) * 1000
+
+            if observation:
+                print(f"[{i + 1}] {observation['source']}: {observation['temperature']}°C ({elapsed:.0f} ms)")
+            else:
+                print(f"[{i + 1}] 所有來源都失敗 ({elapsed:.0f} ms)")
+
+        print()
+        print("來源統計：")
+        for stats in fetcher.stats():
+            print(f"  {stats['name']}: EWMA {stats['latency_ewma']}s, 錯誤率 {stats['error_ewma']}, p95 {stats['p95']}s")
+
+
+if __name__ == "__main__":
+    main()
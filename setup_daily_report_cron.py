@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 配置定時任務（Cron Job）
-每天早上 8:00 自動生成並發送每日簡報
+按 daily_report_cron.txt 安裝：7:50 預計算每日簡報，8:00 發送，每 15 分鐘採集新聞，
+每分鐘發送 Telegram 隊列
 """
 
 import os
@@ -11,6 +12,38 @@ from datetime import datetime, timezone, timedelta
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
+# 定時任務定義（安裝器只從這個文件讀取，不另外維護一份）
+CRON_FILE = "/home/jarvis/.openclaw/workspace/daily_report_cron.txt"
+
+
+def load_cron_jobs(cron_file: str = CRON_FILE) -> str:
+    """讀取 daily_report_cron.txt 中的任務（去掉 shebang）"""
+    with open(cron_file, 'r', encoding='utf-8') as f:
+        lines = [line.rstrip('\n') for line in f if not line.startswith('#!')]
+    return "\n".join(lines).strip() + "\n"
+
+
+def merge_crontab(existing: str, jobs: str) -> str:
+    """把任務合併到現有 crontab（替換之前安裝的同一腳本的任務和註釋，其他任務保留）"""
+    job_lines = set(jobs.splitlines())
+    scripts = {
+        token
+        for line in job_lines if line.strip() and not line.startswith('#')
+        for token in line.split() if token.endswith('.py')
+    }
+    
+    kept = []
+    for line in existing.splitlines():
+        if line in job_lines:
+            continue
+        if any(script in line for script in scripts):
+            # 舊任務上方的註釋一併移除
+            if kept and kept[-1].startswith('#'):
+                kept.pop()
+            continue
+        kept.append(line)
+    return "\n".join(kept + jobs.splitlines()).strip() + "\n"
+
 
 def setup_daily_report_cron():
     """設置每日簡報 Cron Job"""
@@ -19,34 +52,29 @@ def setup_daily_report_cron():
     print("=" * 60)
     print()
     
-    # 1. 創建 Cron Job
-    print("[1/3] 創建 Cron Job...")
-    
-    cron_job = """
-# 每天早上 8:00 生成並發送每日簡報
-0 8 * * * /usr/bin/python3 /home/jarvis/.openclaw/workspace/daily_report_generator.py >> /home/jarvis/.openclaw/workspace/logs/daily_report.log 2>&1
-"""
-    
-    # 保存 Cron Job
-    cron_file = "/home/jarvis/.openclaw/workspace/daily_report_cron.txt"
+    # 1. 讀取 Cron Job（daily_report_cron.txt 是唯一來源）
+    print("[1/3] 讀取 Cron Job...")
     
     try:
-        with open(cron_file, 'w') as f:
-            f.write(cron_job)
-        print("  Cron Job 已創建")
-    except Exception as e:
-        print(f"  創建失敗：{e}")
+        cron_job = load_cron_jobs()
+        print(f"  已讀取 {CRON_FILE}")
+    except OSError as e:
+        print(f"  讀取失敗：{e}")
+        return
     
     print()
     
-    # 2. �加到系統 Cron
-    print("[2/3] 設加到系統 Cron...")
+    # 2. 加到系統 Cron
+    print("[2/3] 加到系統 Cron...")
     
     try:
-        # 使用 crontab 安裝
+        existing = subprocess.run(['crontab', '-l'], capture_output=True, text=True, timeout=10)
+        current = existing.stdout if existing.returncode == 0 else ''
+        
+        # crontab - 會替換整個 crontab，所以先合併現有的任務
         result = subprocess.run(
-            ['crontab', '-a'],
-            input=cron_job,
+            ['crontab', '-'],
+            input=merge_crontab(current, cron_job),
             capture_output=True,
             text=True,
             timeout=10
@@ -67,7 +95,17 @@ def setup_daily_report_cron():
     try:
         result = subprocess.run(['crontab', '-l'], capture_output=True, text=True, timeout=10)
         
-        if 'daily_report' in result.stdout:
+        installed = set(result.stdout.splitlines())
+        missing = [
+            line for line in cron_job.splitlines()
+            if line.strip() and not line.startswith('#') and line not in installed
+        ]
+        
+        if missing:
+            print("  以下任務未安裝（簡報依賴新聞採集和隊列發送，缺一不可）：")
+            for line in missing:
+                print(f"    {line}")
+        elif 'daily_report' in result.stdout:
             print("  Cron Job 已正確安裝")
             print(f"  Cron Job 內容：")
             print(f"  {result.stdout}")
@@ -82,9 +120,10 @@ def setup_daily_report_cron():
     print("=" * 60)
     print()
     print("配置總結：")
-    print("  任務時間：每天早上 8:00")
-    print("  任務頻率：每天一次")
-    print("  任務腳本：daily_report_generator.py")
+    print("  預計算：每天早上 7:50（daily_report_generator.py）")
+    print("  發送：每天早上 8:00（daily_report_sender.py）")
+    print("  新聞採集：每 15 分鐘（news_feed.py，簡報和新聞查詢只讀本地新聞庫）")
+    print("  Telegram 隊列：每分鐘（notifications/telegram_queue.py --drain）")
     print("  日誌文件：logs/daily_report.log")
     print()
     print("下一步：")
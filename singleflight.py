@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+LLM 請求合併（singleflight）
+相同的（規範化提示, 模型, 選項）同時只執行一次生成，其餘請求等待並共用結果；
+完成後 TTL 秒內到達的相同請求直接返回結果。流式請求時每個等待者收到相同的 token
+"""
+
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Any, Optional, Callable, Iterator, Tuple
+
+# 完成後結果保留的秒數（接住稍晚到達的相同請求）
+SINGLEFLIGHT_TTL = 5.0
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """規範化提示（NFKC，合併空白）"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', prompt or '')).strip()
+
+
+def request_key(prompt: str, model: str, options: Optional[Dict[str, Any]] = None, **extra) -> str:
+    """請求的合併鍵"""
+    payload = json.dumps([normalize_prompt(prompt), model, options or {}, extra],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """一次進行中的生成"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks = []
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+    def finish(self, result=None, error: Optional[BaseException] = None):
+        with self.condition:
+            self.result = result
+            self.error = error
+            self.done = True
+            self.condition.notify_all()
+
+    def wait(self):
+        with self.condition:
+            while not self.done:
+                self.condition.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def iter_chunks(self) -> Iterator[str]:
+        """從頭重放已收到的片段，再等待新的片段"""
+        position = 0
+        while True:
+            with self.condition:
+                while position >= len(self.chunks) and not self.done:
+                    self.condition.wait()
+                pending = self.chunks[position:]
+                done, error = self.done, self.error
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if done and position >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """按鍵合併並發的相同調用"""
+
+    def __init__(self, ttl: float = SINGLEFLIGHT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+
+        self._calls: Dict[str, _Call] = {}
+        self._recent: Dict[str, Tuple[float, _Call]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'executions': 0, 'shared': 0, 'ttl_hits': 0}
+
+    def _join(self, key: str) -> Tuple[_Call, bool]:
+        """加入進行中或 TTL 內的調用，沒有時新建（返回 (調用, 是否由自己執行)）"""
+        with self._lock:
+            self.stats['requests'] += 1
+            now = self.clock()
+
+            for k in [k for k, (expires, _) in self._recent.items() if expires <= now]:
+                del self._recent[k]
+
+            if key in self._recent:
+                self.stats['ttl_hits'] += 1
+                return self._recent[key][1], False
+
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats['shared'] += 1
+                return call, False
+
+            call = self._calls[key] = _Call()
+            self.stats['executions'] += 1
+            return call, True
+
+    def _complete(self, key: str, call: _Call, result=None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._calls.pop(key, None)
+            # 失敗的結果不保留，下一個請求重新執行
+            if error is None and self.ttl > 0:
+                self._recent[key] = (self.clock() + self.ttl, call)
+        call.finish(result, error)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """執行 fn（相同 key 並發時只執行一次，其餘等待同一結果）"""
+        call, leader = self._join(key)
+        if not leader:
+            return call.wait()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._complete(key, call, error=e)
+            raise
+        self._complete(key, call, result)
+        return result
+
+    def stream(self, key: str, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        流式執行 fn（生成在後台線程中進行，所有等待者收到相同的片段；
+        某個等待者中途停止讀取不影響其他等待者）
+        """
+        call, leader = self._join(key)
+        if leader:
+            def run():
+                try:
+                    for chunk in fn():
+                        with call.condition:
+                            call.chunks.append(chunk)
+                            call.condition.notify_all()
+                except BaseException as e:
+                    self._complete(key, call, error=e)
+                else:
+                    self._complete(key, call, ''.join(call.chunks))
+
+            threading.Thread(target=run, name='singleflight-stream', daemon=True).start()
+
+        return call.iter_chunks()
+
+    def forget(self, key: str):
+        """丟棄 TTL 內保留的結果"""
+        with self._lock:
+            self._recent.pop(key, None)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+測試按 token 預算打包上下文
+"""
+
+import sys
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from context_packer import ContextPacker, make_pieces, budget_for_state, similarity, cached_token_count
+
+SYSTEM_PROMPT = "你是 Jarvis，一個在香港運行的個人助理。回答要簡潔。"
+
+TURNS = [
+    {'role': 'user', 'content': '今日天氣點樣？'},
+    {'role': 'assistant', 'content': '今日多雲，氣溫二十五至二十九度。'},
+    {'role': 'user', 'content': '有冇颱風？'},
+    {'role': 'assistant', 'content': '天文台現時發出一號戒備信號。'},
+    {'role': 'user', 'content': '會唔會改掛八號風球？'},
+]
+
+PASSAGES = [
+    {'passage_id': 'data::颱風#0', 'heading': '颱風信號', 'content': '天文台會視乎風力改發八號烈風或暴風信號。' * 3, 'score': 0.9},
+    {'passage_id': 'data::颱風#1', 'heading': '颱風信號', 'content': '天文台會視乎風力改發八號烈風或暴風信號。' * 3, 'score': 0.8},
+    {'passage_id': 'code::python#0', 'heading': 'Python 優化', 'content': '使用緩存減少重複計算。' * 20, 'score': 0.1},
+]
+
+MEMORIES = [
+    {'id': 'm1', 'title': '用戶偏好', 'content': '用戶住在沙田，關心交通安排。', 'importance': 5},
+    {'id': 'm2', 'title': '舊記錄', 'content': '用戶曾經問過股票。', 'importance': 1},
+]
+
+
+def test_required_and_budget():
+    """測試必選內容總是保留，總 token 不超出預算"""
+    pieces = make_pieces(SYSTEM_PROMPT, TURNS, PASSAGES, MEMORIES)
+    packed = ContextPacker(budget=120).pack(pieces)
+
+    kinds = [p['kind'] for p in packed['pieces']]
+    assert kinds[0] == 'system'
+    assert packed['pieces'][-1]['text'].endswith('會唔會改掛八號風球？')
+    assert packed['tokens'] <= 120 and not packed['over_budget']
+    assert packed['tokens'] == sum(p['tokens'] for p in packed['pieces'])
+    # 長而不相關的段落每 token 效用最低，被丟棄
+    assert {'kind': 'passage', 'id': 'code::python#0', 'tokens': cached_token_count(
+        'Python 優化\n' + PASSAGES[2]['content']), 'reason': 'budget'} in packed['dropped']
+    print(f"  ✅ 預算內打包 {packed['tokens']} / 120 tokens")
+
+
+def test_duplicates_dropped():
+    """測試近似重複的段落只保留一份"""
+    assert similarity('天文台發出八號風球', '天文台發出八號風球。') == 1.0
+    assert similarity('天氣', 'Python') == 0.0
+
+    packed = ContextPacker(budget=2000).pack(make_pieces(SYSTEM_PROMPT, TURNS, PASSAGES, MEMORIES))
+    ids = [p.get('id') for p in packed['pieces'] if p['kind'] == 'passage']
+    assert ids == ['data::颱風#0', 'code::python#0']
+    duplicate = [d for d in packed['dropped'] if d['reason'] == 'duplicate']
+    assert duplicate == [{'kind': 'passage', 'id': 'data::颱風#1', 'tokens': duplicate[0]['tokens'],
+                          'reason': 'duplicate', 'duplicate_of': {'kind': 'passage', 'id': 'data::颱風#0'}}]
+    print("  ✅ 近似重複去除正確")
+
+
+def test_order_and_turn_priority():
+    """測試輸出順序（系統、記憶、段落、對話按時間）和較新對話優先"""
+    packed = ContextPacker(budget=2000).pack(make_pieces(SYSTEM_PROMPT, TURNS, PASSAGES, MEMORIES))
+    kinds = [p['kind'] for p in packed['pieces']]
+    assert kinds == sorted(kinds, key=['system', 'summary', 'memory', 'passage', 'turn'].index)
+    turns = [p['id'] for p in packed['pieces'] if p['kind'] == 'turn']
+    assert turns == sorted(turns)
+
+    # 預算只夠幾輪對話時保留最新的
+    packed = ContextPacker(budget=60).pack(make_pieces(SYSTEM_PROMPT, TURNS))
+    turns = [p['id'] for p in packed['pieces'] if p['kind'] == 'turn']
+    assert turns == list(range(5 - len(turns), 5)) and len(turns) < 5
+    print("  ✅ 輸出順序正確")
+
+
+def test_budget_for_state():
+    """測試按對話狀態選擇預算，必選內容超出時標記 over_budget"""
+    assert budget_for_state('continuation') > budget_for_state('new_conversation')
+    assert budget_for_state('unknown') == budget_for_state('new_conversation')
+
+    packed = ContextPacker(budget=5).pack(make_pieces(SYSTEM_PROMPT, TURNS))
+    assert packed['over_budget'] and [p['kind'] for p in packed['pieces']] == ['system', 'turn']
+    assert ContextPacker.render(packed).startswith(SYSTEM_PROMPT)
+    print("  ✅ 預算選擇正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("上下文打包測試")
+    print("=" * 60)
+    print()
+
+    test_required_and_budget()
+    test_duplicates_dropped()
+    test_order_and_turn_priority()
+    test_budget_for_state()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
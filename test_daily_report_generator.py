@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+測試每日簡報並發欄目獲取
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from daily_report_generator import DailyReportGenerator
+from report_artifacts import ReportArtifactStore
+
+
+def make_section(title, delay=0.0, status='success', fail=False):
+    """生成模擬欄目"""
+    def fetch():
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("連接失敗")
+        return {'title': title, 'date': '2026-01-01', 'content': [f"{title}內容"], 'status': status}
+    return fetch
+
+
+def make_generator(cache_dir, deadline=0.5, **delays):
+    """創建使用模擬欄目的生成器"""
+    generator = DailyReportGenerator(deadline=deadline, cache_dir=cache_dir,
+                                     artifact_store=ReportArtifactStore(Path(cache_dir) / "artifacts"))
+    generator.sections = [
+        ('weather', '天氣', make_section('天氣', delays.get('weather', 0.0))),
+        ('global_news', '全球新聞', make_section('全球新聞', delays.get('global_news', 0.0))),
+        ('hong_kong_news', '香港新聞', make_section('香港新聞', delays.get('hong_kong_news', 0.0))),
+        ('stock', '股市', make_section('股市', delays.get('stock', 0.0)))
+    ]
+    return generator
+
+
+def test_sections_run_concurrently():
+    """測試欄目並發獲取（總耗時接近最慢欄目）"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator = make_generator(tmp_dir, weather=0.2, global_news=0.2, hong_kong_news=0.2, stock=0.2)
+        reports = generator.fetch_sections()
+
+        assert all(r['status'] == 'success' for r in reports.values())
+        assert generator.report_metadata['wall_time'] < 0.6
+        assert all(t['source'] == 'live' for t in generator.report_metadata['sections'].values())
+        assert (Path(tmp_dir) / "weather.json").exists()
+    print("  ✅ 並發獲取正確")
+
+
+def test_timeout_falls_back_to_cache():
+    """測試超時欄目使用上次緩存，並記錄耗時"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        make_generator(tmp_dir).fetch_sections()
+
+        generator = make_generator(tmp_dir, deadline=0.2, stock=2.0)
+        start = time.perf_counter()
+        reports = generator.fetch_sections()
+
+        # 不等待超時的欄目
+        assert time.perf_counter() - start < 1.0
+        assert reports['stock']['status'] == 'cached'
+        assert '股市內容' in reports['stock']['content'][0]
+        assert reports['weather']['status'] == 'success'
+
+        stock = generator.report_metadata['sections']['stock']
+        assert stock == {'status': 'timeout', 'source': 'cache', 'elapsed': None}
+        assert generator.report_metadata['sections']['weather']['elapsed'] is not None
+    print("  ✅ 超時使用緩存正確")
+
+
+def test_error_without_cache():
+    """測試沒有緩存時失敗欄目降級為錯誤"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator = make_generator(tmp_dir)
+        generator.sections[1] = ('global_news', '全球新聞', make_section('全球新聞', fail=True))
+        reports = generator.fetch_sections()
+
+        assert reports['global_news']['status'] == 'error'
+        assert generator.report_metadata['sections']['global_news'] == {
+            'status': 'error', 'source': 'none', 'elapsed': None
+        }
+
+        # 失敗的結果不覆蓋緩存
+        assert not (Path(tmp_dir) / "global_news.json").exists()
+    print("  ✅ 無緩存降級正確")
+
+
+def test_empty_cache_uses_placeholder():
+    """測試緩存內容為空時不出錯，使用不可用提示"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        (Path(tmp_dir) / "stock.json").write_text(
+            '{"title": "股市", "content": [], "status": "success", "cached_at": "2026-10-18T08:00:00+08:00"}',
+            encoding='utf-8')
+
+        generator = make_generator(tmp_dir, deadline=0.2, stock=2.0)
+        reports = generator.fetch_sections()
+
+        assert reports['stock']['status'] == 'error'
+        assert reports['stock']['content'] == ["獲取股市超時"]
+        assert generator.report_metadata['sections']['stock']['source'] == 'none'
+    print("  ✅ 空緩存降級正確")
+
+
+def test_report_includes_timings():
+    """測試簡報摘要包含欄目耗時"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = make_generator(tmp_dir).generate_daily_report()
+
+        assert '天氣內容' in report
+        assert '- 股市：success（' in report
+    print("  ✅ 簡報耗時正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("每日簡報並發測試")
+    print("=" * 60)
+    print()
+
+    test_sections_run_concurrently()
+    test_timeout_falls_back_to_cache()
+    test_error_without_cache()
+    test_empty_cache_uses_placeholder()
+    test_report_includes_timings()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
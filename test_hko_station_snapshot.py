@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+測試多站點實時天氣快照
+"""
+
+import sys
+import tempfile
+import subprocess
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+import hko_weather_monitor
+from hko_station_snapshot import StationSnapshot
+from hko_warning_diff import WarningDiffEngine
+from weather_agent import handle_weather_query, load_station_snapshot
+
+
+def rhrread():
+    """生成 rhrread 測試數據"""
+    return {
+        'updateTime': '2026-07-20T14:02:00+08:00',
+        'temperature': {
+            'recordTime': '2026-07-20T14:00:00+08:00',
+            'data': [
+                {'place': '京士柏', 'value': 33, 'unit': 'C'},
+                {'place': '沙田', 'value': 36, 'unit': 'C'},
+                {'place': '觀塘', 'value': 31, 'unit': 'C'}
+            ]
+        },
+        'rainfall': {
+            'data': [
+                {'unit': 'mm', 'place': '觀塘', 'max': 45, 'main': 'FALSE'},
+                {'unit': 'mm', 'place': '中西區', 'max': 0, 'main': 'FALSE'},
+                {'unit': 'mm', 'place': '離島區', 'main': 'TRUE'}
+            ]
+        },
+        'humidity': {'data': [{'place': '香港天文台', 'value': 70, 'unit': 'percent'}]}
+    }
+
+
+def test_columns_aligned():
+    """測試溫度站和雨量分區合併到同一地點軸"""
+    snapshot = StationSnapshot.from_payload(rhrread())
+
+    assert len(snapshot) == 5
+    assert snapshot.lookup('觀塘')['temperature'] == 31.0
+    assert snapshot.lookup('觀塘')['rainfall'] == 45.0
+    assert snapshot.lookup('中西區')['temperature'] is None
+    assert snapshot.lookup('離島區')['rainfall'] is None
+    assert snapshot.humidity == 70
+    print("  ✅ 列式數據對齊正確")
+
+
+def test_vectorized_alerts():
+    """測試所有站點一次過評估警報"""
+    snapshot = StationSnapshot.from_payload(rhrread())
+    alerts = {alert['alert_type']: alert for alert in snapshot.evaluate_alerts()}
+
+    assert set(alerts) == {'heat_warning', 'rainstorm_warning'}
+    assert alerts['heat_warning']['metadata']['places'] == sorted(['京士柏', '沙田'])
+    assert alerts['heat_warning']['severity'] == 'severe'
+    assert alerts['rainstorm_warning']['metadata']['places'] == ['觀塘']
+    assert alerts['rainstorm_warning']['severity'] == 'high'
+    print("  ✅ 向量化警報正確")
+
+
+def test_bulk_rows():
+    """測試轉成批量寫入的行"""
+    rows = StationSnapshot.from_payload(rhrread()).to_weather_rows()
+
+    assert len(rows) == 5
+    assert len({row['data_id'] for row in rows}) == 5
+    kwun_tong = next(row for row in rows if row['location'] == '觀塘')
+    assert kwun_tong['data_id'] == 'rhrread_觀塘_202607201400'
+    assert (kwun_tong['temperature'], kwun_tong['rainfall']) == (31.0, 45.0)
+    print("  ✅ 批量寫入行正確")
+
+
+def test_district_query():
+    """測試地區查詢"""
+    snapshot = StationSnapshot.from_payload(rhrread())
+
+    report = handle_weather_query("中西有冇落雨", station_snapshot=snapshot)
+    assert '中西區：' in report
+    assert '過去一小時雨量：0mm' in report
+
+    # 沒有提及地區時使用原有報告
+    assert '地區天氣' not in handle_weather_query("現在幾度", station_snapshot=snapshot)
+    print("  ✅ 地區查詢正確")
+
+
+def test_agent_station_snapshot_cached():
+    """測試 Agent 在有效期內複用多站點快照，獲取失敗時保留上一個快照"""
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return rhrread() if len(calls) == 1 else None
+
+    first = load_station_snapshot(ttl=0, fetch=fetch)
+    assert first is not None and first.lookup('沙田')['temperature'] == 36.0
+    assert load_station_snapshot(ttl=0, fetch=fetch) is first
+    assert load_station_snapshot(ttl=3600, fetch=fetch) is first
+    assert len(calls) == 2
+    print("  ✅ Agent 快照緩存正確")
+
+
+def test_monitor_checks_without_current_weather():
+    """測試獲取當前天氣失敗時，警告摘要和站點警報照常檢查"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        monitor = hko_weather_monitor.HKOWeatherMonitor()
+        monitor.warning_engine = WarningDiffEngine(Path(tmp_dir) / "state.json")
+        monitor.current_weather = None
+        monitor.station_snapshot = StationSnapshot.from_payload(rhrread())
+        monitor.save_alerts_to_db = lambda alerts: True
+        monitor.save_warning_alerts = lambda alerts: True
+
+        original = hko_weather_monitor.fetch_warning_summary
+        hko_weather_monitor.fetch_warning_summary = lambda: {
+            'WTCSGNL': {'name': '八號烈風或暴風信號', 'code': 'TC8NE', 'actionCode': 'ISSUE'}
+        }
+        try:
+            alerts = monitor.process_alerts()
+        finally:
+            hko_weather_monitor.fetch_warning_summary = original
+
+        assert {alert['alert_type'] for alert in alerts} == {'typhoon_warning', 'heat_warning', 'rainstorm_warning'}
+        assert monitor.warning_engine.snapshot and monitor.pending_warning_changes is None
+    print("  ✅ 無當前天氣時照常檢查警告")
+
+
+def test_agent_without_numpy():
+    """測試未安裝 NumPy 時天氣 Agent 和監控器仍可導入，只是沒有多站點快照"""
+    script = (
+        "import sys\n"
+        "sys.modules['numpy'] = None\n"
+        "import weather_agent, hko_weather_monitor\n"
+        "assert weather_agent.load_station_snapshot(fetch=lambda: {}) is None\n"
+        "assert hko_weather_monitor.HKOWeatherMonitor().update_station_snapshot() is False\n"
+    )
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=30,
+                   cwd=str(Path(hko_weather_monitor.__file__).resolve().parent))
+    print("  ✅ 未安裝 NumPy 時降級正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("多站點實時天氣快照測試")
+    print("=" * 60)
+    print()
+
+    test_columns_aligned()
+    test_vectorized_alerts()
+    test_bulk_rows()
+    test_district_query()
+    test_agent_station_snapshot_cached()
+    test_monitor_checks_without_current_weather()
+    test_agent_without_numpy()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+測試警告摘要差異引擎
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from hko_warning_diff import WarningDiffEngine, event_to_alert
+
+
+def warnsum(**codes):
+    """生成 warnsum 測試數據"""
+    return {
+        key: {'name': key, 'code': code, 'actionCode': 'ISSUE', 'issueTime': '2026-02-26T10:00:00+08:00'}
+        for key, code in codes.items()
+    }
+
+
+def poll_and_accept(engine, payload):
+    """輪詢並在處理後接受新快照"""
+    events, current = engine.poll(payload)
+    engine.accept(current, events)
+    return events
+
+
+def test_events_and_sequence():
+    """測試發出、升級、降級、取消事件和序號"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = WarningDiffEngine(Path(tmp_dir) / "state.json")
+
+        events = poll_and_accept(engine, warnsum(WRAIN='WRAINA'))
+        assert [(e['event'], e['seq']) for e in events] == [('issued', 1)]
+
+        # 相同數據不再產生事件
+        assert poll_and_accept(engine, warnsum(WRAIN='WRAINA')) == []
+
+        events = poll_and_accept(engine, warnsum(WRAIN='WRAINR', WTCSGNL='TC3'))
+        assert [(e['warning'], e['event'], e['seq']) for e in events] == [
+            ('WRAIN', 'upgraded', 2),
+            ('WTCSGNL', 'issued', 3)
+        ]
+
+        events = poll_and_accept(engine, warnsum(WTCSGNL='TC1'))
+        assert [(e['warning'], e['event']) for e in events] == [
+            ('WRAIN', 'cancelled'),
+            ('WTCSGNL', 'downgraded')
+        ]
+        assert event_to_alert(events[1])['alert_type'] == 'typhoon_warning'
+    print("  ✅ 變化事件正確")
+
+
+def test_state_survives_restart():
+    """測試重啟後不重複發出事件"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_file = Path(tmp_dir) / "state.json"
+
+        poll_and_accept(WarningDiffEngine(state_file), warnsum(WHOT='WHOT'))
+
+        restarted = WarningDiffEngine(state_file)
+        assert poll_and_accept(restarted, warnsum(WHOT='WHOT')) == []
+
+        events = poll_and_accept(restarted, {'WHOT': {'name': 'WHOT', 'code': 'WHOT', 'actionCode': 'CANCEL'}})
+        assert [(e['event'], e['seq']) for e in events] == [('cancelled', 2)]
+    print("  ✅ 重啟後狀態正確")
+
+
+def test_unaccepted_events_replayed():
+    """測試下游處理失敗（未調用 accept）時，下次輪詢重新產生同樣的事件"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_file = Path(tmp_dir) / "state.json"
+        engine = WarningDiffEngine(state_file)
+
+        events, _ = engine.poll(warnsum(WTCSGNL='TC8NE'))
+        assert [(e['event'], e['seq']) for e in events] == [('issued', 1)]
+        assert not state_file.exists()
+
+        # 重啟後仍然產生同一事件（同一序號），接受後不再產生
+        restarted = WarningDiffEngine(state_file)
+        replayed, current = restarted.poll(warnsum(WTCSGNL='TC8NE'))
+        assert [(e['event'], e['seq']) for e in replayed] == [('issued', 1)]
+        restarted.accept(current, replayed)
+        assert poll_and_accept(WarningDiffEngine(state_file), warnsum(WTCSGNL='TC8NE')) == []
+    print("  ✅ 未接受的事件會重新產生")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("警告摘要差異引擎測試")
+    print("=" * 60)
+    print()
+
+    test_events_and_sequence()
+    test_state_survives_restart()
+    test_unaccepted_events_replayed()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
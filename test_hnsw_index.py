@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+測試 HNSW 近似最近鄰索引
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+import numpy as np
+
+from hnsw_index import HNSWIndex
+from vector_index import VectorIndex
+from vector_quantizer import recall_at_k
+from benchmark_vector_index import make_dataset
+from rag_cache import RAGCache
+from knowledge_store import KnowledgeStore
+
+
+def build(vectors, **kwargs):
+    index = HNSWIndex(vectors.shape[1], **kwargs)
+    for i, v in enumerate(vectors):
+        index.add(v, {'id': i})
+    return index
+
+
+def brute_force(vectors, queries, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = queries @ normalized.T
+    return [list(np.argsort(-row)[:k]) for row in scores]
+
+
+def test_recall():
+    """測試 recall@10 相對暴力搜索"""
+    vectors, queries = make_dataset(3000, 32, 50)
+    index = build(vectors, M=12, ef_construction=100)
+
+    exact = brute_force(vectors, queries, 10)
+    approx = [[n for n, _ in index.search(q, 10, ef=64)] for q in queries]
+    recall = recall_at_k(exact, approx, 10)
+    assert recall >= 0.95, recall
+    print(f"  ✅ recall@10 = {recall:.3f}")
+
+
+def test_soft_delete():
+    """測試軟刪除的節點不出現在結果中"""
+    vectors, _ = make_dataset(500, 16, 1)
+    index = build(vectors, M=8, ef_construction=50)
+
+    assert index.search(vectors[42], 1)[0][0] == 42
+    index.delete(42)
+    assert 42 not in [n for n, _ in index.search(vectors[42], 10)]
+    assert len(index) == 499
+
+    # 刪除大部分節點時仍能返回足夠結果
+    for node in range(400):
+        index.delete(node)
+    results = index.search(vectors[0], 10, ef=10)
+    assert len(results) == 10 and all(n >= 400 for n, _ in results)
+    print("  ✅ 軟刪除正確")
+
+
+def test_save_load_and_insert():
+    """測試保存為向量索引、mmap 加載後繼續增量插入"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        vectors, queries = make_dataset(1000, 16, 10)
+        index = build(vectors[:800], M=8, ef_construction=64)
+        index.delete(3)
+        index.save(root, quantize=True)
+
+        loaded = HNSWIndex.load(root)
+        assert isinstance(loaded.vectors, np.memmap)
+        assert loaded.get_metadata(5) == {'id': 5}
+        assert loaded.deleted[3] and len(loaded) == 799
+        assert loaded.search(queries[0], 5) == index.search(queries[0], 5)
+
+        for i in range(800, 1000):
+            assert loaded.add(vectors[i], {'id': i}) == i
+        assert not isinstance(loaded.vectors, np.memmap)
+        assert loaded.search(vectors[900], 1)[0][0] == 900
+
+        loaded.save(root)
+        reopened = VectorIndex.open(root)
+        assert reopened.count == 1000 and reopened.manifest['hnsw']['M'] == 8
+        assert HNSWIndex.from_vector_index(reopened).get_metadata(999) == {'id': 999}
+    print("  ✅ 保存、加載和增量插入正確")
+
+
+def test_rag_cache_add_entries():
+    """測試 RAGCache 增量加入條目（同 ID 替換舊條目）"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir)
+        KnowledgeStore(workspace / "knowledge").write_segment('2026-10-19', [
+            {'category': 'code', 'heading': 'Python 優化', 'summary': '使用緩存'}
+        ])
+
+        rag = RAGCache(workspace)
+        rag.build_index()
+        assert rag.hnsw is not None
+
+        rag.add_entries([
+            {'id': 'code::python-優化', 'date': '2026-10-19', 'category': 'code', 'heading': 'Python 優化',
+             'summary': '使用 mmap'},
+            {'id': 'system::備份', 'category': 'system', 'heading': '備份', 'summary': '每日備份'}
+        ])
+        assert sorted(e['summary'] for e in rag.index) == ['使用 mmap', '每日備份']
+
+        reopened = RAGCache(workspace)
+        assert len(reopened.index) == 2 and len(reopened.hnsw) == 2
+        hit = reopened.semantic_search('Python 優化 使用 mmap', top_k=1)[0]
+        assert hit['summary'] == '使用 mmap'
+    print("  ✅ RAGCache 增量加入正確")
+
+
+def test_rag_cache_lazy_metadata():
+    """測試打開 RAGCache 時不讀取元數據，切換版本後關閉舊索引"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir)
+        KnowledgeStore(workspace / "knowledge").write_segment('2026-10-19', [
+            {'category': 'code', 'heading': 'Python 優化', 'summary': '使用緩存'}
+        ])
+        RAGCache(workspace).build_index()
+
+        reads = []
+        original = VectorIndex.metadata
+        VectorIndex.metadata = lambda self, i: reads.append(i) or original(self, i)
+        try:
+            reader = RAGCache(workspace)
+            assert reads == []
+            assert reader.semantic_search('Python 優化', top_k=1)[0]['summary'] == '使用緩存'
+            assert reads == [0]
+        finally:
+            VectorIndex.metadata = original
+
+        old = reader.vector_index
+        RAGCache(workspace).add_entries([
+            {'id': 'system::備份', 'category': 'system', 'heading': '備份', 'summary': '每日備份'}
+        ])
+        reader.semantic_search('備份', top_k=1)
+        assert reader.vector_index is not old and old.vectors is None
+        assert reader.get_cache_stats()['index_size'] == 2
+    print("  ✅ RAGCache 元數據按需讀取")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("HNSW 索引測試")
+    print("=" * 60)
+    print()
+
+    test_recall()
+    test_soft_delete()
+    test_save_load_and_insert()
+    test_rag_cache_add_entries()
+    test_rag_cache_lazy_metadata()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
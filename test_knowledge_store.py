@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+測試分段知識庫存儲
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from knowledge_store import KnowledgeStore
+from rag_cache import RAGCache
+
+LEGACY_KB = """## 2026-02-25
+
+### SYSTEM
+
+#### 系統設置
+**摘要：** 配置 PostgreSQL
+**分類：** system
+**標籤：** postgres, setup
+
+### CODE
+
+#### Python 優化
+**摘要：** 使用緩存
+**分類：** code
+"""
+
+
+def make_entries(prefix, count, category='task'):
+    return [{'category': category, 'heading': f"{prefix} {i}", 'summary': f"摘要 {i}"} for i in range(count)]
+
+
+def test_segments_and_manifest():
+    """測試每天一個分段，寫入不影響其他分段"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = KnowledgeStore(Path(tmp_dir))
+        store.write_segment('2026-10-18', make_entries('昨天', 3))
+        yesterday = (Path(tmp_dir) / "segments" / "2026-10-18.jsonl").stat().st_mtime_ns
+
+        store.write_segment('2026-10-19', make_entries('今天', 2))
+        # 重跑當天只替換當天分段
+        store.write_segment('2026-10-19', make_entries('今天', 4))
+
+        assert store.segments() == ['2026-10-18', '2026-10-19']
+        assert store.count() == 7
+        assert store.manifest['segments']['2026-10-19']['count'] == 4
+        assert (Path(tmp_dir) / "segments" / "2026-10-18.jsonl").stat().st_mtime_ns == yesterday
+        assert not list(Path(tmp_dir).rglob("*.tmp"))
+    print("  ✅ 分段和 manifest 正確")
+
+
+def test_iterate_and_append():
+    """測試按日期流式讀取和追加"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = KnowledgeStore(Path(tmp_dir))
+        for day in range(1, 6):
+            store.write_segment(f"2026-10-0{day}", make_entries(f"第{day}天", 2))
+
+        assert [e['date'] for e in store.iter_entries(dates=['2026-10-03'])] == ['2026-10-03'] * 2
+        assert len(list(store.iter_entries(since='2026-10-04'))) == 4
+        assert list(store.iter_entries(dates=['2026-09-30'])) == []
+
+        store.append('2026-10-05', [{'category': 'task', 'heading': '第5天 1', 'summary': '更新'},
+                                    {'category': 'code', 'heading': '新條目'}])
+        entries = list(store.iter_entries(dates=['2026-10-05']))
+        assert [e['summary'] for e in entries] == ['摘要 0', '更新', '']
+        assert entries[2]['id'] == 'code::新條目'
+    print("  ✅ 流式讀取和追加正確")
+
+
+def test_import_and_render():
+    """測試導入舊 knowledge-base.md 並渲染視圖"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kb_file = Path(tmp_dir) / "knowledge-base.md"
+        kb_file.write_text(LEGACY_KB, encoding='utf-8')
+
+        store = KnowledgeStore(Path(tmp_dir) / "knowledge")
+        assert store.import_markdown(kb_file) == 2
+
+        entry = next(store.iter_entries())
+        assert entry['tags'] == ['postgres', 'setup']
+        assert entry['summary'] == '配置 PostgreSQL'
+
+        store.write_segment('2026-10-19', make_entries('今天', 1))
+        assert store.render_markdown(kb_file) == 3
+
+        rendered = kb_file.read_text(encoding='utf-8')
+        assert rendered.index('## 2026-02-25') < rendered.index('## 2026-10-19')
+        assert '#### Python 優化' in rendered
+
+        # 視圖可以再次導入（往返一致）
+        other = KnowledgeStore(Path(tmp_dir) / "other")
+        other.import_markdown(kb_file)
+        assert [e['heading'] for e in other.iter_entries()] == [e['heading'] for e in store.iter_entries()]
+    print("  ✅ 導入和渲染正確")
+
+
+def test_update_markdown_appends_day():
+    """測試只更新當天的視圖段落，結果與完整渲染一致，且不讀取舊分段"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kb_file = Path(tmp_dir) / "knowledge-base.md"
+        store = KnowledgeStore(Path(tmp_dir) / "knowledge")
+        store.write_segment('2026-10-18', make_entries('昨天', 2))
+        store.render_markdown(kb_file)
+
+        read_dates = []
+        original = store.iter_entries
+        store.iter_entries = lambda dates=None, **kw: (read_dates.append(dates), original(dates, **kw))[1]
+
+        store.write_segment('2026-10-19', make_entries('今天', 1))
+        assert store.update_markdown('2026-10-19', kb_file) == 1
+        # 同一天再次運行時替換該天的段落
+        store.write_segment('2026-10-19', make_entries('今天', 3))
+        assert store.update_markdown('2026-10-19', kb_file) == 3
+        assert read_dates == [['2026-10-19'], ['2026-10-19']]
+
+        expected = Path(tmp_dir) / "expected.md"
+        KnowledgeStore(Path(tmp_dir) / "knowledge").render_markdown(expected)
+        assert kb_file.read_text(encoding='utf-8') == expected.read_text(encoding='utf-8')
+
+        # 補寫較早的日期時重新完整渲染
+        store.write_segment('2026-10-17', make_entries('前天', 1))
+        assert store.update_markdown('2026-10-17', kb_file) == 1
+        rendered = kb_file.read_text(encoding='utf-8')
+        assert rendered.index('## 2026-10-17') < rendered.index('## 2026-10-18') < rendered.index('## 2026-10-19')
+    print("  ✅ 視圖只追加當天段落")
+
+
+def test_rag_cache_reads_segments():
+    """測試 RAGCache 從分段讀取知識庫"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir)
+        store = KnowledgeStore(workspace / "knowledge")
+        store.write_segment('2026-10-18', make_entries('昨天', 2))
+        store.write_segment('2026-10-19', make_entries('今天', 3))
+
+        rag = RAGCache(workspace)
+        assert len(rag.load_knowledge_base()) == 5
+        assert len(rag.load_knowledge_base(dates=['2026-10-19'])) == 3
+        assert rag.load_knowledge_base(since='2026-10-19')[0]['id'] == 'task::今天-0'
+    print("  ✅ RAGCache 分段讀取正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("分段知識庫測試")
+    print("=" * 60)
+    print()
+
+    test_segments_and_manifest()
+    test_iterate_and_append()
+    test_import_and_render()
+    test_update_markdown_appends_day()
+    test_rag_cache_reads_segments()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+測試 RSS 新聞採集服務
+"""
+
+import io
+import sys
+import time
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from news_feed import NewsStore, FeedPoller, parse_feed, normalize_title, handle_news_query
+from daily_report_generator import DailyReportGenerator
+
+RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Google News</title>
+<item>
+  <title>港鐵新線通車 - 明報</title>
+  <link>https://example.com/a</link>
+  <guid>guid-a</guid>
+  <pubDate>Mon, 19 Oct 2026 02:00:00 GMT</pubDate>
+  <description>&lt;a href="x"&gt;港鐵新線&lt;/a&gt; 今日通車</description>
+  <source url="https://mingpao.com">明報</source>
+</item>
+<item>
+  <title>Typhoon nears Hong Kong</title>
+  <link>https://example.com/b</link>
+  <guid>guid-b</guid>
+  <pubDate>Mon, 19 Oct 2026 03:00:00 GMT</pubDate>
+</item>
+</channel></rss>"""
+
+ATOM = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<entry>
+  <title>Typhoon  nears Hong Kong!</title>
+  <link href="https://other.com/b"/>
+  <id>tag:other,b</id>
+  <updated>2026-10-19T04:00:00Z</updated>
+</entry>
+<entry>
+  <title>Markets rally</title>
+  <link href="https://other.com/c"/>
+  <id>tag:other,c</id>
+  <updated>2026-10-19T05:00:00Z</updated>
+  <summary>Stocks rise</summary>
+</entry>
+</feed>"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.raw = io.BytesIO(body)
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """模擬 RSS 服務器（支持 ETag 條件請求）"""
+
+    def __init__(self, feeds):
+        self.feeds = feeds
+        self.requests = []
+
+    def get(self, url, headers, timeout, stream):
+        self.requests.append((url, dict(headers)))
+        body, etag = self.feeds[url]
+        if headers.get('If-None-Match') == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, body.encode('utf-8'), {'ETag': etag})
+
+
+def test_parse_feed():
+    """測試流式解析 RSS 和 Atom"""
+    rss = list(parse_feed(io.BytesIO(RSS.encode('utf-8'))))
+    atom = list(parse_feed(io.BytesIO(ATOM.encode('utf-8'))))
+
+    assert [item['guid'] for item in rss] == ['guid-a', 'guid-b']
+    assert rss[0]['summary'] == '港鐵新線 今日通車'
+    assert rss[0]['source'] == '明報'
+    assert atom[1]['link'] == 'https://other.com/c'
+    assert atom[1]['published'] - rss[1]['published'] == 7200
+    assert normalize_title('港鐵新線通車 - 明報', '明報') == normalize_title('港鐵新線通車')
+    print("  ✅ 流式解析正確")
+
+
+def test_conditional_poll_and_dedupe():
+    """測試條件請求和跨來源去重"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = NewsStore(Path(tmp_dir) / "news.db")
+        session = FakeSession({'rss': (RSS, '"v1"'), 'atom': (ATOM, '"v2"')})
+        poller = FeedPoller(store, {'hong_kong': ['rss'], 'global': ['atom']}, session=session)
+
+        results = {r['url']: r for r in poller.poll_all()}
+        assert results['rss']['new'] == 2
+        # 同一標題（標準化後）不重複保存
+        assert results['atom']['new'] == 1
+        assert store.stats() == {'hong_kong': 2, 'global': 1}
+
+        # 未到輪詢間隔不請求
+        assert poller.poll_all() == []
+
+        # 強制輪詢帶 ETag，304 不重新解析
+        results = poller.poll_all(force=True)
+        assert all(r['status'] == 'not_modified' for r in results)
+        assert session.requests[-1][1]['If-None-Match'] in ('"v1"', '"v2"')
+        assert store.get_feed('rss')['etag'] == '"v1"'
+    print("  ✅ 條件請求和去重正確")
+
+
+def test_retention():
+    """測試每個來源按數量和天數清理"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = NewsStore(Path(tmp_dir) / "news.db", max_items=3, max_age_days=1)
+        now = time.time()
+        items = [{'guid': f"g{i}", 'title': f"新聞 {i}", 'published': now - i * 3600} for i in range(5)]
+        items.append({'guid': 'old', 'title': '舊新聞', 'published': now - 3 * 86400})
+
+        assert store.add_items('feed', 'global', items, now=now) == 6
+        assert store.prune('feed', now=now) == 3
+        assert [item['guid'] for item in store.latest('global', 10)] == ['g0', 'g1', 'g2']
+    print("  ✅ 保留策略正確")
+
+
+def test_report_reads_local_store():
+    """測試簡報和新聞查詢只讀本地新聞庫"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = NewsStore(Path(tmp_dir) / "news.db")
+        generator = DailyReportGenerator(cache_dir=Path(tmp_dir) / "sections", news_store=store)
+
+        assert generator.get_hong_kong_news_report()['status'] == 'error'
+
+        store.add_items('rss', 'hong_kong', parse_feed(io.BytesIO(RSS.encode('utf-8'))))
+
+        start = time.perf_counter()
+        report = generator.get_hong_kong_news_report()
+        assert time.perf_counter() - start < 0.05
+        assert report['status'] == 'success'
+        assert '港鐵新線通車' in report['content'][0]
+
+        answer = handle_news_query("今日香港有咩新聞？", store=store)
+        assert answer.index('Typhoon') < answer.index('港鐵')
+        assert handle_news_query("全球新聞", store=store) == "本地新聞庫暫無資料，請稍後再試"
+    print("  ✅ 本地新聞庫讀取正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("RSS 新聞採集測試")
+    print("=" * 60)
+    print()
+
+    test_parse_feed()
+    test_conditional_poll_and_dedupe()
+    test_retention()
+    test_report_reads_local_store()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+測試段落切分和按段落檢索
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from passage_chunker import count_tokens, split_sentences, chunk_text, chunk_entry
+from rag_cache import RAGCache
+from knowledge_store import KnowledgeStore
+
+LONG_CONTENT = (
+    "天文台於上午發出八號烈風或暴風信號。市民應留在安全地方，遠離海旁。" * 6
+    + "Ollama runs qwen2.5 locally on the CPU box. Preloading the model avoids cold starts. " * 6
+    + "每日備份在凌晨三點執行。備份檔案保存七日。"
+)
+
+
+def test_count_tokens():
+    """測試中英文 token 估算"""
+    assert count_tokens('天文台') == 3
+    assert count_tokens('cache') == 2
+    assert count_tokens('Ollama 配置 2026') == 2 + 2 + 2
+    assert count_tokens('') == 0
+    print("  ✅ token 估算正確")
+
+
+def test_chunk_text():
+    """測試按句子切分、大小上限和重疊"""
+    assert split_sentences('第一句。第二句！Third one. Fourth') == ['第一句。', '第二句！', 'Third one.', 'Fourth']
+
+    passages = chunk_text(LONG_CONTENT, max_tokens=80, overlap=20)
+    assert len(passages) > 3
+    assert all(count_tokens(p) <= 80 for p in passages)
+    # 相鄰段落有重疊的句子，整句不被拆開
+    for previous, current in zip(passages, passages[1:]):
+        assert split_sentences(current)[0] in split_sentences(previous)
+    assert chunk_text('短內容。') == ['短內容。']
+    assert chunk_text('') == []
+
+    # 沒有標點的超長文本按 token 硬切
+    assert all(count_tokens(p) <= 50 for p in chunk_text('字' * 500, max_tokens=50, overlap=10))
+    print(f"  ✅ 切分為 {len(passages)} 個段落")
+
+
+def test_chunk_entry_back_references():
+    """測試段落保留所屬條目的 ID 和元數據"""
+    entry = {'id': 'data::天氣', 'category': 'data', 'heading': '天氣', 'summary': '颱風', 'tags': ['hko'],
+             'content': LONG_CONTENT}
+    passages = chunk_entry(entry, max_tokens=80, overlap=20)
+
+    assert all(p['id'] == 'data::天氣' and p['heading'] == '天氣' and p['tags'] == ['hko'] for p in passages)
+    assert [p['passage'] for p in passages] == list(range(len(passages)))
+    assert passages[1]['passage_id'] == 'data::天氣#1' and passages[0]['passages'] == len(passages)
+
+    short = chunk_entry({'id': 'x', 'heading': '標題', 'summary': '只有摘要', 'content': ''})
+    assert len(short) == 1 and short[0]['content'] == '只有摘要'
+    print("  ✅ 段落元數據正確")
+
+
+def test_rag_cache_returns_passages():
+    """測試 RAGCache 按段落建索引，搜索只返回命中的段落"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir)
+        KnowledgeStore(workspace / "knowledge").write_segment('2026-10-19', [
+            {'category': 'system', 'heading': '系統筆記', 'summary': '雜項', 'content': LONG_CONTENT * 3},
+            {'category': 'code', 'heading': 'Python 優化', 'summary': '使用緩存'}
+        ])
+
+        rag = RAGCache(workspace)
+        rag.build_index()
+        notes = [p for p in rag.index if p['id'] == 'system::系統筆記']
+        assert len(notes) > 1 and len(rag.index) == len(notes) + 1
+
+        results = rag.search('凌晨三點', top_k=3)
+        assert results and all(r['id'] == 'system::系統筆記' for r in results)
+        assert all('凌晨三點' in r['content'] and len(r['content']) < len(LONG_CONTENT) for r in results)
+
+        # 更新條目時舊段落全部替換
+        rag.add_entries([{'id': 'system::系統筆記', 'date': '2026-10-19', 'category': 'system',
+                          'heading': '系統筆記', 'summary': '雜項', 'content': '只剩一句。'}])
+        assert [p['content'] for p in rag.index if p['id'] == 'system::系統筆記'] == ['只剩一句。']
+    print("  ✅ RAGCache 按段落檢索正確")
+
+
+def test_same_heading_on_another_day_kept():
+    """測試新一天的同名條目不會替換舊日期的段落"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir)
+        store = KnowledgeStore(workspace / "knowledge")
+        store.write_segment('2026-10-18', [{'category': 'system', 'heading': '每日總結', 'summary': '昨天'}])
+
+        rag = RAGCache(workspace)
+        rag.build_index()
+
+        store.write_segment('2026-10-19', [{'category': 'system', 'heading': '每日總結', 'summary': '今天'}])
+        rag.add_entries(list(store.iter_entries(dates=['2026-10-19'])))
+        assert sorted((p['date'], p['summary']) for p in rag.index) == [
+            ('2026-10-18', '昨天'), ('2026-10-19', '今天')
+        ]
+    print("  ✅ 不同日期的同名條目各自保留")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("段落切分測試")
+    print("=" * 60)
+    print()
+
+    test_count_tokens()
+    test_chunk_text()
+    test_chunk_entry_back_references()
+    test_rag_cache_returns_passages()
+    test_same_heading_on_another_day_kept()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+測試靜態提示前綴緩存
+"""
+
+import os
+import sys
+import json as json_module
+import time
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+import requests
+
+from prompt_prefix import PromptPrefix, PrefixCache, benchmark_ttft
+import circuit_breaker
+from circuit_breaker import CircuitOpenError
+
+
+class FakeResponse:
+    def __init__(self, data, lines=()):
+        self.data = data
+        self.lines = lines
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeOllama:
+    """模擬 Ollama：只重新處理與上一個提示不同的部分（前綴 KV 複用），耗時與處理的字符數成正比"""
+
+    def __init__(self, seconds_per_char=2e-6):
+        self.seconds_per_char = seconds_per_char
+        self.last_prompt = ''
+        self.payloads = []
+        self.responses = []
+
+    def post(self, url, json=None, stream=False, timeout=None):
+        self.payloads.append(json)
+        prompt = json['prompt']
+        common = 0
+        for a, b in zip(self.last_prompt, prompt):
+            if a != b:
+                break
+            common += 1
+        evaluated = len(prompt) - common
+        self.last_prompt = prompt
+        time.sleep(evaluated * self.seconds_per_char)
+
+        data = {'response': '好', 'done': True, 'prompt_eval_count': evaluated, 'context': [1, 2, 3]}
+        lines = [json_module.dumps({'response': token}).encode('utf-8') for token in json.get('tokens', [])]
+        self.responses.append(FakeResponse(data, lines + [json_module.dumps(data).encode('utf-8')]))
+        return self.responses[-1]
+
+
+def make_workspace(root: Path):
+    for name, content in [('SYSTEM_PROMPT.md', '系統提示' * 500), ('SOUL.md', '性格'), ('IDENTITY.md', '身份'),
+                          ('USER.md', '用戶'), ('TOOLS.md', '工具')]:
+        (root / name).write_text(content, encoding='utf-8')
+
+
+def test_prefix_reload_on_mtime():
+    """測試前綴只讀取一次，文件修改後重載，Agent 缺少的文件用主工作目錄的"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        main_dir, agent_dir = Path(tmp_dir) / "main", Path(tmp_dir) / "chat"
+        main_dir.mkdir()
+        agent_dir.mkdir()
+        make_workspace(main_dir)
+        (agent_dir / "SOUL.md").write_text('聊天性格', encoding='utf-8')
+
+        prefix = PromptPrefix(agent_dir, fallback=main_dir, check_interval=0)
+        text = prefix.text
+        assert '聊天性格' in text and '系統提示' in text and '<!-- TOOLS.md -->' in text
+        assert text.index('SYSTEM_PROMPT.md') < text.index('SOUL.md') < text.index('TOOLS.md')
+        assert prefix.text == text and prefix.loads == 1
+
+        path = agent_dir / "SOUL.md"
+        path.write_text('新性格', encoding='utf-8')
+        os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        assert '新性格' in prefix.text and prefix.loads == 2
+    print("  ✅ 前綴按 mtime 重載")
+
+
+def test_warm_once_and_suffix_only():
+    """測試只預熱一次，前綴變化後重新預熱；context 模式只發送後綴"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        make_workspace(root)
+        ollama = FakeOllama(seconds_per_char=0)
+
+        cache = PrefixCache(session=ollama, workspaces={'main': root})
+        cache.prefix('main').check_interval = 0
+        cache.generate('main', '用戶：你好\n助手：')
+        cache.generate('main', '用戶：天氣\n助手：')
+        warm = [p for p in ollama.payloads if p['options'] == {'num_predict': 1}]
+        assert len(warm) == 1 and warm[0]['keep_alive']
+        assert ollama.payloads[-1]['prompt'].startswith(cache.prefix('main').text)
+        # 第二次請求只處理後綴
+        assert ollama.payloads[-1]['prompt'][len(cache.prefix('main').text):] == '用戶：天氣\n助手：'
+
+        path = root / "USER.md"
+        path.write_text('新用戶資料', encoding='utf-8')
+        os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        cache.generate('main', '用戶：再見\n助手：')
+        assert len([p for p in ollama.payloads if p['options'] == {'num_predict': 1}]) == 2
+
+        context_cache = PrefixCache(session=ollama, workspaces={'main': root}, use_context=True)
+        payload = context_cache.build_payload('main', '用戶：你好')
+        assert payload['prompt'] == '用戶：你好' and payload['context'] == [1, 2, 3]
+    print("  ✅ 預熱和後綴請求正確")
+
+
+def test_identical_requests_coalesced():
+    """測試相同的並發請求只發出一次生成"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        make_workspace(root)
+        ollama = FakeOllama(seconds_per_char=1e-4)
+        cache = PrefixCache(session=ollama, workspaces={'main': root})
+        cache.ensure_warm('main')
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(lambda _: cache.generate('main', '用戶：八號風球幾時除？\n助手：'), range(10)))
+
+        assert all(r['response'] == '好' for r in results)
+        assert len(ollama.payloads) == 2 and cache.flight.stats['executions'] == 1
+        assert list(cache.stream('main', '用戶：八號風球幾時除？\n助手：')) == ['好']
+    print("  ✅ 相同請求合併正確")
+
+
+def test_ollama_down_fails_fast():
+    """測試 Ollama 不可用時熔斷（不再逐個等待超時），提前停止讀取的流式響應被關閉"""
+    class DownSession:
+        def __init__(self):
+            self.calls = 0
+
+        def post(self, *args, **kwargs):
+            self.calls += 1
+            raise requests.ConnectionError("ollama down")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        make_workspace(root)
+        session = DownSession()
+        cache = PrefixCache(session=session, workspaces={'main': root})
+
+        try:
+            for _ in range(3):
+                try:
+                    cache.generate('main', '用戶：你好\n助手：')
+                    assert False
+                except requests.ConnectionError:
+                    pass
+            try:
+                cache.generate('main', '用戶：你好\n助手：')
+                assert False
+            except CircuitOpenError:
+                pass
+            assert session.calls == 3
+        finally:
+            circuit_breaker._breakers.pop('ollama', None)
+
+        ollama = FakeOllama(seconds_per_char=0)
+        cache = PrefixCache(session=ollama, workspaces={'main': root}, coalesce_ttl=None)
+        payload = cache.build_payload('main', '用戶：你好', stream=True)
+        chunks = cache._stream_chunks({**payload, 'tokens': ['天', '文', '台']})
+        assert next(chunks) == '天'
+        chunks.close()
+        assert ollama.responses[-1].closed
+    print("  ✅ 熔斷和流式連接關閉正確")
+
+
+def test_benchmark_ttft():
+    """測試首 token 延遲基準：緩存前綴明顯更快"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        make_workspace(root)
+        cache = PrefixCache(session=FakeOllama(), workspaces={'main': root})
+
+        result = benchmark_ttft(cache, 'main', [f"\n用戶：問題 {i}\n助手：" for i in range(3)])
+        assert result['runs'] == 3 and result['prefix_chars'] > 2000
+        assert result['cached_ttft'] < result['cold_ttft'] / 3
+    print(f"  ✅ 首 token 延遲加速 {result['speedup']:.1f}×")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("提示前綴緩存測試")
+    print("=" * 60)
+    print()
+
+    test_prefix_reload_on_mtime()
+    test_warm_once_and_suffix_only()
+    test_identical_requests_coalesced()
+    test_ollama_down_fails_fast()
+    test_benchmark_ttft()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+測試每日簡報預渲染產物
+"""
+
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from report_artifacts import ReportArtifactStore, build_artifact, handle_briefing_query, HK_TZ
+from daily_report_generator import DailyReportGenerator
+
+
+def make_sections(stock_content="恒生指數 <18450>"):
+    """生成欄目"""
+    return [
+        ('weather', '天氣', {'title': '🌤 今日天氣簡報', 'content': ["**早間**\n- 溫度：22°C"], 'status': 'success'}),
+        ('stock', '股市', {'title': '📊 股市走勢', 'content': [stock_content], 'status': 'success'})
+    ]
+
+
+def test_variants_rendered():
+    """測試三個版本一次渲染，HTML 正確轉義"""
+    artifact = build_artifact('2026-10-19', make_sections(), ['- 天氣：success'])
+
+    assert set(artifact['variants']) == {'markdown', 'html', 'telegram'}
+    assert artifact['rendered'] == ['weather', 'stock']
+    assert '**早間**' in artifact['variants']['markdown']
+    assert '<b>早間</b>' in artifact['variants']['telegram']
+    assert '&lt;18450&gt;' in artifact['variants']['telegram']
+    assert '&lt;18450&gt;' in artifact['variants']['html']
+    assert artifact['variants']['markdown'].startswith('# 每日簡報')
+    print("  ✅ 三個版本渲染正確")
+
+
+def test_incremental_rerender():
+    """測試只重新渲染變化的欄目，版本按欄目哈希"""
+    first = build_artifact('2026-10-19', make_sections(), [])
+    second = build_artifact('2026-10-19', make_sections(), [], previous=first)
+    third = build_artifact('2026-10-19', make_sections("恒生指數 18500"), [], previous=first)
+
+    assert second['rendered'] == []
+    assert second['version'] == first['version']
+    assert third['rendered'] == ['stock']
+    assert third['version'] != first['version']
+    assert third['fragments']['weather'] == first['fragments']['weather']
+    assert '18500' in third['variants']['markdown']
+    print("  ✅ 增量渲染正確")
+
+
+def test_store_and_serve():
+    """測試產物保存、版本切換和查詢"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ReportArtifactStore(Path(tmp_dir))
+        date = datetime.now(HK_TZ).strftime('%Y-%m-%d')
+
+        assert handle_briefing_query("今日簡報有什麼？", store=store) == "今日簡報尚未生成，請稍後再試"
+
+        first = build_artifact(date, make_sections(), [])
+        store.save(first)
+        second = build_artifact(date, make_sections("恒生指數 18500"), [], previous=first)
+        store.save(second)
+
+        assert store.versions(date) == sorted([first['version'], second['version']])
+        assert store.latest(date)['version'] == second['version']
+        assert store.get(date, first['version'])['variants'] == first['variants']
+        assert '18500' in handle_briefing_query("今日簡報有什麼？", store=store)
+    print("  ✅ 產物保存和讀取正確")
+
+
+def test_generator_precompute_and_serve():
+    """測試生成器預計算後發送只讀產物"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator = DailyReportGenerator(cache_dir=Path(tmp_dir) / "sections",
+                                         artifact_store=ReportArtifactStore(Path(tmp_dir) / "artifacts"))
+        calls = []
+
+        def stock():
+            calls.append(1)
+            return make_sections()[1][2]
+
+        generator.sections = [('stock', '股市', stock)]
+
+        artifact = generator.precompute()
+        assert artifact['rendered'] == ['stock']
+
+        # 內容沒變不產生新版本
+        assert generator.precompute()['rendered'] == []
+        assert len(calls) == 2
+
+        # 發送階段只讀產物
+        assert '恒生指數' in generator.serve('telegram')
+        assert len(calls) == 2
+    print("  ✅ 預計算和讀取正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("每日簡報產物測試")
+    print("=" * 60)
+    print()
+
+    test_variants_rendered()
+    test_incremental_rerender()
+    test_store_and_serve()
+    test_generator_precompute_and_serve()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+測試 LLM 請求合併（singleflight）
+"""
+
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from singleflight import SingleFlight, request_key, normalize_prompt
+
+
+def test_request_key():
+    """測試提示規範化後相同的請求使用同一個鍵"""
+    assert normalize_prompt('  今日  天氣\n如何？ ') == '今日 天氣 如何?'
+    assert request_key('今日天氣如何？', 'qwen2.5:1.5b', {'temperature': 0.2}) == \
+        request_key(' 今日天氣如何? ', 'qwen2.5:1.5b', {'temperature': 0.2})
+    assert request_key('今日天氣如何？', 'qwen2.5:1.5b') != request_key('今日天氣如何？', 'qwen2.5:0.5b')
+    assert request_key('a', 'm', {'num_predict': 10}) != request_key('a', 'm', {'num_predict': 20})
+    print("  ✅ 合併鍵正確")
+
+
+def test_concurrent_calls_share_one_execution():
+    """測試並發的相同請求只執行一次"""
+    flight = SingleFlight(ttl=0)
+    executions = []
+    gate = threading.Event()
+
+    def generate():
+        executions.append(1)
+        gate.wait(5)
+        return {'response': '八號風球'}
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        futures = [pool.submit(flight.do, 'key', generate) for _ in range(20)]
+        while flight.stats['requests'] < 20:
+            time.sleep(0.01)
+        gate.set()
+        results = [f.result() for f in futures]
+
+    assert len(executions) == 1
+    assert all(r == {'response': '八號風球'} for r in results)
+    assert flight.stats == {'requests': 20, 'executions': 1, 'shared': 19, 'ttl_hits': 0}
+    print("  ✅ 20 個並發請求合併為 1 次生成")
+
+
+def test_ttl_and_errors():
+    """測試 TTL 內的相同請求直接返回結果，過期後重新執行，失敗不保留"""
+    now = [0.0]
+    flight = SingleFlight(ttl=5, clock=lambda: now[0])
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('key', generate) == 1
+    now[0] = 4.9
+    assert flight.do('key', generate) == 1 and flight.stats['ttl_hits'] == 1
+    now[0] = 5.1
+    assert flight.do('key', generate) == 2
+
+    def failing():
+        raise RuntimeError('ollama down')
+
+    for _ in range(2):
+        try:
+            flight.do('bad', failing)
+            assert False
+        except RuntimeError:
+            pass
+    assert flight.stats['executions'] == 4
+    print("  ✅ TTL 和錯誤處理正確")
+
+
+def test_stream_shared_tokens():
+    """測試流式請求的每個等待者收到相同的 token（包括中途加入的）"""
+    flight = SingleFlight(ttl=5)
+    started = threading.Event()
+    release = threading.Event()
+    executions = []
+
+    def tokens():
+        executions.append(1)
+        yield '天文台'
+        started.set()
+        release.wait(5)
+        yield '已發出'
+        yield '八號風球'
+
+    first = flight.stream('key', tokens)
+    started.wait(5)
+    second = flight.stream('key', tokens)
+
+    results = {}
+    threads = [threading.Thread(target=lambda name=name, it=it: results.__setitem__(name, list(it)))
+               for name, it in (('first', first), ('second', second))]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results['first'] == results['second'] == ['天文台', '已發出', '八號風球']
+    # TTL 內稍晚到達的請求重放完整結果
+    assert list(flight.stream('key', tokens)) == ['天文台', '已發出', '八號風球']
+    assert len(executions) == 1
+    print("  ✅ 流式 token 共用正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("LLM 請求合併測試")
+    print("=" * 60)
+    print()
+
+    test_request_key()
+    test_concurrent_calls_share_one_execution()
+    test_ttl_and_errors()
+    test_stream_shared_tokens()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+測試內存映射向量索引
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+import numpy as np
+
+from vector_index import VectorIndex, write_index, current_version, benchmark_load
+from rag_cache import RAGCache
+from knowledge_store import KnowledgeStore
+
+
+def make_data(count, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    metadata = [{'id': f"entry-{i}", 'heading': f"條目 {i}"} for i in range(count)]
+    return vectors, metadata
+
+
+def test_write_and_search():
+    """測試寫入、mmap 打開和搜索（float32 / float16）"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, metadata = make_data(500)
+
+        for dtype in ('float32', 'float16'):
+            root = Path(tmp_dir) / dtype
+            write_index(vectors, metadata, root=root, dtype=dtype)
+            index = VectorIndex.open(root)
+
+            assert isinstance(index.vectors, np.memmap)
+            assert index.vectors.dtype == np.dtype(dtype)
+            assert index.metadata(123) == {'id': 'entry-123', 'heading': '條目 123'}
+
+            results = index.search(vectors[42], top_k=3)
+            assert results[0][0] == 42
+            assert abs(results[0][1] - 1.0) < 1e-2
+            index.close()
+    print("  ✅ 寫入和搜索正確")
+
+
+def test_atomic_swap():
+    """測試新版本原子切換，舊讀者不受影響"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        first = write_index(*make_data(10, seed=1), root=root)
+        reader = VectorIndex.open(root)
+
+        second = write_index(*make_data(20, seed=2), root=root)
+        assert current_version(root) == second != first
+
+        # 舊讀者仍可讀，直到重新加載
+        assert reader.is_stale()
+        assert reader.metadata(9)['id'] == 'entry-9'
+        reader = reader.reload()
+        assert reader.version == second and len(reader) == 20
+
+        # 只保留最近兩個版本
+        third = write_index(*make_data(5, seed=3), root=root)
+        versions = sorted(p.name for p in root.iterdir() if p.name.startswith('v'))
+        assert versions == [second, third]
+        assert not list(root.glob(".tmp-*"))
+
+        # 空索引
+        write_index(np.zeros((0, 8)), [], root=root)
+        assert VectorIndex.open(root).search(np.ones(8)) == []
+    print("  ✅ 原子切換正確")
+
+
+def test_open_cost_constant():
+    """測試打開索引的成本不隨大小增長（對比 JSON 解析）"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors, metadata = make_data(20000, dim=128)
+        write_index(vectors, metadata, root=Path(tmp_dir) / "large")
+        write_index(vectors[:100], metadata[:100], root=Path(tmp_dir) / "small")
+
+        json_file = Path(tmp_dir) / "index.json"
+        json_file.write_text(json.dumps([{**m, 'embedding': v.tolist()} for m, v in zip(metadata, vectors)]))
+        start = time.perf_counter()
+        json.loads(json_file.read_text())
+        json_ms = (time.perf_counter() - start) * 1000
+
+        large = min(benchmark_load(Path(tmp_dir) / "large")['open_ms'] for _ in range(5))
+        small = min(benchmark_load(Path(tmp_dir) / "small")['open_ms'] for _ in range(5))
+
+        assert large < json_ms / 10
+        assert large < small * 5 + 1
+    print(f"  ✅ 打開成本恆定（mmap {large:.2f}ms vs JSON {json_ms:.0f}ms）")
+
+
+def test_rag_cache_uses_vector_index():
+    """測試 RAGCache 構建並讀取二進制索引"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workspace = Path(tmp_dir)
+        KnowledgeStore(workspace / "knowledge").write_segment('2026-10-19', [
+            {'category': 'code', 'heading': 'Python 優化', 'summary': '使用緩存'},
+            {'category': 'system', 'heading': '系統設置', 'summary': '配置 PostgreSQL'}
+        ])
+
+        rag = RAGCache(workspace)
+        rag.build_index()
+        assert not any('embedding' in entry for entry in rag.index)
+
+        reopened = RAGCache(workspace)
+        assert [e['heading'] for e in reopened.index] == ['Python 優化', '系統設置']
+        assert reopened.search('Python')[0]['id'] == 'code::python-優化'
+        # 偽嵌入為文本哈希，相同文本分數最高
+        assert reopened.semantic_search('Python 優化 使用緩存', top_k=1)[0]['heading'] == 'Python 優化'
+    print("  ✅ RAGCache 二進制索引正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("向量索引測試")
+    print("=" * 60)
+    print()
+
+    test_write_and_search()
+    test_atomic_swap()
+    test_open_cost_constant()
+    test_rag_cache_uses_vector_index()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+測試 int8 量化向量存儲和精確重排
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+import numpy as np
+
+from vector_quantizer import ScalarQuantizer, recall_at_k
+from vector_index import VectorIndex, write_index
+from benchmark_vector_index import run_benchmark
+
+
+def test_quantizer_roundtrip():
+    """測試量化誤差在一個步長以內，近似內積接近精確值"""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1000, 64)).astype(np.float32)
+    quantizer = ScalarQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(quantizer.decode(codes) - vectors) <= quantizer.scale / 2 + 1e-6)
+
+    query = rng.standard_normal(64).astype(np.float32)
+    approx = quantizer.scores(codes, query)
+    exact = vectors @ query
+    assert np.max(np.abs(approx - exact)) < 0.1 * np.max(np.abs(exact))
+    print("  ✅ 量化往返正確")
+
+
+def test_quantized_index_search():
+    """測試量化索引：近似篩選 + 精確重排，分數為全精度"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((2000, 32)).astype(np.float32)
+        write_index(vectors, [{'id': i} for i in range(2000)], root=Path(tmp_dir), quantize=True)
+
+        index = VectorIndex.open(Path(tmp_dir))
+        assert index.codes.dtype == np.int8
+        assert index.codes.nbytes * 4 == index.vectors.nbytes
+
+        exact = index.search(vectors[7], top_k=5, exact=True)
+        reranked = index.search(vectors[7], top_k=5)
+        assert reranked[0][0] == 7
+        assert [i for i, _ in reranked] == [i for i, _ in exact]
+        assert np.allclose([s for _, s in reranked], [s for _, s in exact], atol=1e-5)
+    print("  ✅ 量化索引搜索正確")
+
+
+def test_benchmark_recall():
+    """測試基準測試報告的 recall@k"""
+    assert recall_at_k([[1, 2, 3]], [[3, 2, 9]], 3) == 2 / 3
+
+    result = run_benchmark(count=5000, dim=64, queries=20, k=10, rerank_factor=10)
+    assert result['recall_rerank'] >= 0.95
+    assert result['recall_rerank'] >= result['recall_int8']
+    assert result['memory']['int8'] * 4 == result['memory']['float32']
+    print(f"  ✅ recall@10 = {result['recall_rerank']:.3f}（僅 int8：{result['recall_int8']:.3f}）")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("量化向量存儲測試")
+    print("=" * 60)
+    print()
+
+    test_quantizer_roundtrip()
+    test_quantized_index_search()
+    test_benchmark_recall()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
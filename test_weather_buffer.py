@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+測試天氣觀測環形緩衝區
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+sys.path.insert(0, '/home/jarvis/.openclaw/workspace')
+
+from weather_buffer import WeatherRingBuffer, HK_TZ
+
+
+def make_observation(minutes, temperature=28.0, rainfall=0.0, wind_speed=15.0):
+    """生成測試觀測"""
+    start = datetime(2026, 2, 26, 8, 0, tzinfo=HK_TZ)
+    return {
+        'temperature': temperature,
+        'humidity': 75,
+        'rainfall': rainfall,
+        'wind_speed': wind_speed,
+        'observation_time': start + timedelta(minutes=minutes)
+    }
+
+
+def test_rolling_stats():
+    """測試滾動統計與容量淘汰"""
+    buffer = WeatherRingBuffer(capacity=4)
+    temperatures = [30.0, 25.0, 27.0, 33.0, 26.0, 28.0]
+
+    for i, temp in enumerate(temperatures):
+        buffer.append(make_observation(i * 5, temperature=temp))
+
+    # 只保留最後 4 個觀測：27, 33, 26, 28
+    stats = buffer.stats('temperature')
+    assert len(buffer) == 4
+    assert stats['min'] == 26.0
+    assert stats['max'] == 33.0
+    assert stats['sum'] == 114.0
+    assert stats['mean'] == 28.5
+    assert [row['temperature'] for row in buffer.recent(10)] == [27.0, 33.0, 26.0, 28.0]
+    print("  ✅ 滾動統計正確")
+
+
+def test_rainfall_1h():
+    """測試一小時累計雨量"""
+    buffer = WeatherRingBuffer(capacity=100)
+
+    # 每 10 分鐘 5mm，共 2 小時
+    for i in range(13):
+        buffer.append(make_observation(i * 10, rainfall=5.0))
+
+    # 最後一個觀測在 120 分鐘，窗口內為 70 - 120 分鐘的 6 個觀測
+    assert buffer.rainfall_1h() == 30.0
+    print("  ✅ 一小時累計雨量正確")
+
+
+def test_snapshot_restore():
+    """測試快照保存和恢復"""
+    buffer = WeatherRingBuffer(capacity=8)
+    for i in range(12):
+        buffer.append(make_observation(i * 5, temperature=20.0 + i, rainfall=1.0))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "observations.snapshot"
+        assert buffer.snapshot(path)
+
+        restored = WeatherRingBuffer.restore(path, capacity=8)
+
+    assert len(restored) == len(buffer)
+    assert restored.all_stats() == buffer.all_stats()
+    assert restored.rainfall_1h() == buffer.rainfall_1h()
+    assert restored.latest() == buffer.latest()
+    print("  ✅ 快照恢復正確")
+
+
+def test_agent_reads_monitor_snapshot():
+    """測試 Weather Agent 讀取監控器的快照回答查詢（快照未變化時不重新讀取）"""
+    from weather_agent import handle_weather_query, load_weather_buffer
+
+    buffer = WeatherRingBuffer(capacity=8)
+    for i in range(6):
+        buffer.append(make_observation(i * 10, temperature=30.0 + i, rainfall=2.0))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "observations.snapshot"
+        assert load_weather_buffer(path) is None
+
+        buffer.snapshot(path)
+        loaded = load_weather_buffer(path)
+        assert loaded is load_weather_buffer(path)
+
+        report = handle_weather_query("現在幾度", weather_buffer=loaded)
+        assert "溫度：35.0度" in report and "最近 6 次觀測" in report
+    print("  ✅ Agent 讀取監控快照正確")
+
+
+def main():
+    """主函數"""
+    print("=" * 60)
+    print("天氣觀測環形緩衝區測試")
+    print("=" * 60)
+    print()
+
+    test_rolling_stats()
+    test_rainfall_1h()
+    test_snapshot_restore()
+    test_agent_reads_monitor_snapshot()
+
+    print()
+    print("所有測試通過！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+內存映射向量索引
+向量保存為 float32/float16 的 .npy 矩陣，元數據保存為 JSONL + 偏移量 sidecar，
+各 Agent 進程用 mmap 打開（零拷貝，共享頁緩存），新版本寫入臨時目錄後原子重命名切換。
+可選 int8 量化碼：先在量化碼上近似打分，再用全精度向量精確重排候選
+"""
+
+import os
+import json
+import mmap
+import time
+import shutil
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+import numpy as np
+
+from vector_quantizer import ScalarQuantizer
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_INDEX_DIR = WORKSPACE / "rag" / "vectors"
+
+CURRENT_FILE = "CURRENT"
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.jsonl"
+OFFSETS_FILE = "offsets.npy"
+MANIFEST_FILE = "manifest.json"
+CODES_FILE = "codes.npy"
+QUANTIZER_FILE = "quantizer.npz"
+
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ('float32', 'float16')
+
+# 搜索時每次轉換成 float32 的行數（float16 索引不會整體展開）
+SEARCH_CHUNK = 8192
+
+# 量化搜索時精確重排的候選數 = top_k × RERANK_FACTOR
+RERANK_FACTOR = 10
+
+
+def _fsync_file(path: Path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2 歸一化（零向量保持為零）"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def write_index(vectors, metadata: List[Dict[str, Any]], root: Path = DEFAULT_INDEX_DIR,
+                dtype: str = 'float32', normalize: bool = True, extra: Optional[Dict[str, Any]] = None,
+                keep_versions: int = 2, quantize: bool = False,
+                arrays: Optional[Dict[str, np.ndarray]] = None) -> str:
+    """寫入新版本索引並原子切換，返回版本名
+    （quantize 時同時寫入 int8 量化碼，arrays 為附加數組，如 HNSW 圖，保存為 <名稱>.npy）"""
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"不支持的向量類型：{dtype}")
+
+    root = Path(root)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(metadata), -1)
+    if len(matrix) != len(metadata):
+        raise ValueError(f"向量數量 {len(matrix)} 與元數據數量 {len(metadata)} 不一致")
+
+    if normalize and len(matrix):
+        matrix = _normalize_rows(matrix)
+    matrix = np.ascontiguousarray(matrix.astype(dtype))
+
+    digest = hashlib.sha256(matrix.tobytes()).hexdigest()[:8]
+    version = f"v{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{digest}"
+
+    tmp_dir = root / f".tmp-{version}"
+    tmp_dir.mkdir(parents=True)
+
+    try:
+        np.save(tmp_dir / VECTORS_FILE, matrix)
+        files = [VECTORS_FILE, META_FILE, OFFSETS_FILE, MANIFEST_FILE]
+
+        quantized = quantize and len(matrix) > 0
+        if quantized:
+            quantizer = ScalarQuantizer.fit(matrix)
+            np.save(tmp_dir / CODES_FILE, quantizer.encode(matrix))
+            quantizer.save(tmp_dir / QUANTIZER_FILE)
+            files += [CODES_FILE, QUANTIZER_FILE]
+
+        for name, array in (arrays or {}).items():
+            np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array))
+            files.append(f"{name}.npy")
+
+        # 元數據：每行一條 JSON，偏移量用於按行號直接讀取
+        offsets = np.zeros(len(metadata) + 1, dtype=np.int64)
+        with open(tmp_dir / META_FILE, 'wb') as f:
+            for i, item in enumerate(metadata):
+                line = json.dumps(item, ensure_ascii=False).encode('utf-8') + b'\n'
+                f.write(line)
+                offsets[i + 1] = offsets[i] + len(line)
+        np.save(tmp_dir / OFFSETS_FILE, offsets)
+
+        manifest = {
+            'format': FORMAT_VERSION,
+            'version': version,
+            'count': int(matrix.shape[0]),
+            'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            'dtype': dtype,
+            'normalized': normalize,
+            'quantized': quantized,
+            'created_at': datetime.now().isoformat(),
+            **(extra or {})
+        }
+        with open(tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        for name in files:
+            _fsync_file(tmp_dir / name)
+
+        os.rename(tmp_dir, root / version)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # 原子切換當前版本
+    pointer_tmp = root / f".{CURRENT_FILE}.tmp"
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, root / CURRENT_FILE)
+
+    prune_versions(root, keep_versions)
+    return version
+
+
+def current_version(root: Path = DEFAULT_INDEX_DIR) -> Optional[str]:
+    """當前版本名（沒有索引時返回 None）"""
+    try:
+        return (Path(root) / CURRENT_FILE).read_text(encoding='utf-8').strip() or None
+    except OSError:
+        return None
+
+
+def prune_versions(root: Path = DEFAULT_INDEX_DIR, keep: int = 2) -> List[str]:
+    """刪除舊版本（保留最近 keep 個，已打開的 mmap 不受影響）"""
+    root = Path(root)
+    current = current_version(root)
+    versions = sorted(p.name for p in root.iterdir() if p.is_dir() and p.name.startswith('v'))
+
+    removed = []
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name != current:
+            shutil.rmtree(root / name, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+class VectorIndex:
+    """只讀向量索引（mmap 打開）"""
+
+    def __init__(self, root: Path = DEFAULT_INDEX_DIR, version: Optional[str] = None):
+        self.root = Path(root)
+        self.version = version or current_version(self.root)
+        if self.version is None:
+            raise FileNotFoundError(f"向量索引不存在：{self.root}")
+
+        self.path = path = self.root / self.version
+        with open(path / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.count = self.manifest['count']
+        self.dim = self.manifest['dim']
+        self.dtype = self.manifest['dtype']
+
+        self.codes = None
+        self.quantizer = None
+
+        if self.count:
+            self.vectors = np.load(path / VECTORS_FILE, mmap_mode='r')
+            if self.manifest.get('quantized'):
+                self.codes = np.load(path / CODES_FILE, mmap_mode='r')
+                self.quantizer = ScalarQuantizer.load(path / QUANTIZER_FILE)
+            self._offsets = np.load(path / OFFSETS_FILE, mmap_mode='r')
+            self._meta_file = open(path / META_FILE, 'rb')
+            self._meta = mmap.mmap(self._meta_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=self.dtype)
+            self._offsets = np.zeros(1, dtype=np.int64)
+            self._meta_file = None
+            self._meta = b''
+
+    @classmethod
+    def open(cls, root: Path = DEFAULT_INDEX_DIR) -> 'VectorIndex':
+        """打開當前版本"""
+        return cls(root)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        """關閉 mmap"""
+        if self._meta_file is not None:
+            self._meta.close()
+            self._meta_file.close()
+            self._meta_file = None
+        self.vectors = None
+        self.codes = None
+
+    def load_array(self, name: str, mmap_mode: Optional[str] = 'r') -> np.ndarray:
+        """讀取附加數組（默認 mmap）"""
+        return np.load(self.path / f"{name}.npy", mmap_mode=mmap_mode)
+
+    def is_stale(self) -> bool:
+        """是否已有更新的版本"""
+        return current_version(self.root) != self.version
+
+    def reload(self) -> 'VectorIndex':
+        """有新版本時返回新索引，否則返回自己"""
+        if not self.is_stale():
+            return self
+        return VectorIndex(self.root)
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        """按行號讀取元數據（只解析這一行）"""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._meta[start:end])
+
+    def iter_metadata(self) -> Iterator[Dict[str, Any]]:
+        """按順序讀取所有元數據"""
+        for i in range(self.count):
+            yield self.metadata(i)
+
+    def _prepare_query(self, query) -> np.ndarray:
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        if self.manifest.get('normalized'):
+            norm = np.linalg.norm(q)
+            if norm:
+                q = q / norm
+        return q
+
+    def scores(self, query) -> np.ndarray:
+        """查詢向量與所有向量的相似度（已歸一化時為餘弦相似度）"""
+        q = self._prepare_query(query)
+
+        result = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SEARCH_CHUNK):
+            block = np.asarray(self.vectors[start:start + SEARCH_CHUNK], dtype=np.float32)
+            result[start:start + len(block)] = block @ q
+        return result
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """分數最高的 k 個位置（降序）"""
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def search(self, query, top_k: int = 5, exact: bool = False,
+               rerank_factor: int = RERANK_FACTOR) -> List[Tuple[int, float]]:
+        """返回最相似的 (行號, 分數)（有量化碼時先近似篩選再精確重排）"""
+        if not self.count:
+            return []
+
+        if self.codes is None or exact:
+            scores = self.scores(query)
+            return [(int(i), float(scores[i])) for i in self._top(scores, top_k)]
+
+        q = self._prepare_query(query)
+
+        # 第一輪：量化碼近似打分
+        candidates = self._top(self.quantizer.scores(self.codes, q), max(top_k, top_k * rerank_factor))
+
+        # 第二輪：只從磁盤讀取候選的全精度向量精確重排
+        rows = np.sort(candidates)
+        exact_scores = np.asarray(self.vectors[rows], dtype=np.float32) @ q
+        order = self._top(exact_scores, top_k)
+        return [(int(rows[i]), float(exact_scores[i])) for i in order]
+
+
+def benchmark_load(root: Path = DEFAULT_INDEX_DIR) -> Dict[str, float]:
+    """測量打開索引和讀取一條元數據的耗時"""
+    start = time.perf_counter()
+    index = VectorIndex.open(root)
+    opened = time.perf_counter() - start
+
+    if index.count:
+        index.metadata(index.count - 1)
+    first_read = time.perf_counter() - start - opened
+    index.close()
+
+    return {'open_ms': opened * 1000, 'first_read_ms': first_read * 1000}
@@ -5,20 +5,68 @@ Main Agent 的子 Agent
 """
 
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 import sys
 import json
+import time
+
+from weather_buffer import WeatherRingBuffer, DEFAULT_SNAPSHOT_FILE
+try:
+    from hko_station_snapshot import StationSnapshot, fetch_rhrread
+except ImportError:
+    # 多站點快照需要 NumPy（可選依賴）；未安裝時只使用單站天氣
+    StationSnapshot = fetch_rhrread = None
 
 # 香港時區
 HK_TZ = timezone(timedelta(hours=8))
 
+# 已載入的觀測快照（快照文件未變化時複用）
+_buffer_cache = {'path': None, 'mtime': None, 'buffer': None}
+
+# rhrread 每小時更新，多站點快照在有效期內複用
+STATION_SNAPSHOT_TTL = 600
+_station_cache = {'fetched_at': 0.0, 'snapshot': None}
+
+
+def load_weather_buffer(path: Path = DEFAULT_SNAPSHOT_FILE):
+    """讀取 continuous_weather_monitor 保存的觀測快照（沒有快照或快照為空時返回 None）"""
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    if _buffer_cache['path'] != path or _buffer_cache['mtime'] != mtime:
+        buffer = WeatherRingBuffer.restore(path)
+        _buffer_cache.update(path=path, mtime=mtime, buffer=buffer if len(buffer) > 0 else None)
+
+    return _buffer_cache['buffer']
+
+
+def load_station_snapshot(ttl: float = STATION_SNAPSHOT_TTL, fetch=fetch_rhrread):
+    """獲取 rhrread 多站點快照（有效期內複用；獲取失敗時返回上一個快照；未安裝 NumPy 時返回 None）"""
+    if StationSnapshot is None:
+        return None
+
+    now = time.monotonic()
+    if _station_cache['snapshot'] is None or now - _station_cache['fetched_at'] >= ttl:
+        payload = fetch()
+        if payload is not None:
+            _station_cache.update(fetched_at=now, snapshot=StationSnapshot.from_payload(payload))
+
+    return _station_cache['snapshot']
+
 
 class WeatherAgent:
     """天氣 Agent - 處理天氣查詢和警告（乾淨版本）"""
 
-    def __init__(self):
+    def __init__(self, weather_buffer=None):
         self.name = "Weather Agent"
         self.description = "處理天氣查詢和警告"
 
+        # 觀測緩衝區（由監控器寫入，報告直接讀取）
+        self.buffer = weather_buffer
+
         # 模擬天氣數據（用於測試）
         self.current_weather = {
             'temperature': 28.0,
@@ -30,6 +78,18 @@ class WeatherAgent:
             'observation_time': datetime.now(HK_TZ)
         }
 
+        if self.buffer is not None and len(self.buffer) > 0:
+            self.load_from_buffer()
+
+    def load_from_buffer(self):
+        """從觀測緩衝區讀取最新天氣（無數據庫查詢）"""
+        latest = self.buffer.latest()
+        if not latest:
+            return
+
+        self.current_weather.update(latest)
+        self.current_weather['rainfall_1h'] = self.buffer.rainfall_1h()
+
     def check_alerts(self) -> list:
         """檢查天氣警告"""
         alerts = []
@@ -104,6 +164,16 @@ class WeatherAgent:
         report.append("")
         report.append(f"更新時間：{self.current_weather['observation_time'].strftime('%Y-%m-%d %H:%M:%S')}")
 
+        # 滾動統計
+        if self.buffer is not None and len(self.buffer) > 0:
+            temp_stats = self.buffer.stats('temperature')
+            wind_stats = self.buffer.stats('wind_speed')
+            report.append("")
+            report.append(f"最近 {temp_stats['count']} 次觀測：")
+            report.append(f"  平均溫度：{temp_stats['mean']}度（最低 {temp_stats['min']}度，最高 {temp_stats['max']}度）")
+            report.append(f"  平均風速：{wind_stats['mean']}km/h（最高 {wind_stats['max']}km/h）")
+            report.append(f"  過去一小時累計雨量：{self.buffer.rainfall_1h()}mm")
+
         # 檢查警告
         alerts = self.check_alerts()
 
@@ -120,25 +190,21 @@ class WeatherAgent:
         return "\n".join(report)
 
 
-def handle_weather_query(query: str) -> str:
-    """處理天氣查詢"""
-    agent = WeatherAgent()
+def handle_weather_query(query: str, weather_buffer=None, station_snapshot=None) -> str:
+    """處理天氣查詢（有觀測緩衝區時讀取實時數據，否則使用模擬數據）
 
-    # 初始化天氣數據（模擬）
-    agent.current_weather = {
-        'temperature': 28.0,
-        'humidity': 75,
-        'rainfall': 5.0,
-        'wind_speed': 15.0,
-        'wind_direction': 'ESE',
-        'weather_condition': '多云局部地區有驟雨',
-        'observation_time': datetime.now(HK_TZ)
-    }
+    傳入多站點快照時，提及地區的查詢直接用快照中該地區的讀數回答。
+    """
+    agent = WeatherAgent(weather_buffer)
 
     # 判斷查詢類型
     query_lower = query.lower()
 
-    if '溫度' in query_lower or '熱' in query_lower:
+    places = station_snapshot.find_places(query) if station_snapshot is not None else []
+
+    if places:
+        return generate_district_report(station_snapshot, places)
+    elif '溫度' in query_lower or '熱' in query_lower:
         return agent.get_weather_report()
     elif '預報' in query_lower or '未來' in query_lower:
         return generate_forecast_report(agent.current_weather)
@@ -161,6 +227,26 @@ def handle_weather_query(query: str) -> str:
         return agent.get_weather_report()
 
 
+def generate_district_report(snapshot, places: list) -> str:
+    """生成地區天氣報告（讀取多站點快照）"""
+    report = []
+    report.append("香港天文台地區天氣")
+    report.append("")
+
+    for place in places:
+        reading = snapshot.lookup(place)
+        report.append(f"{place}：")
+        if reading['temperature'] is not None:
+            report.append(f"  溫度：{reading['temperature']:g}度")
+        if reading['rainfall'] is not None:
+            report.append(f"  過去一小時雨量：{reading['rainfall']:g}mm")
+
+    report.append("")
+    report.append(f"更新時間：{snapshot.observation_time.strftime('%Y-%m-%d %H:%M')}")
+
+    return "\n".join(report)
+
+
 def generate_forecast_report(weather: dict) -> str:
     """生成天氣預報"""
     report = []
@@ -194,6 +280,8 @@ def generate_rainfall_report(weather: dict) -> str:
     report.append("香港天文台降雨報告")
     report.append("")
     report.append(f"當前降雨：{weather['rainfall']}mm")
+    if 'rainfall_1h' in weather:
+        report.append(f"過去一小時累計：{weather['rainfall_1h']}mm")
     report.append("")
     report.append("降雨建議：")
 
@@ -254,6 +342,7 @@ def main():
     # 測試查詢
     test_queries = [
         "現在幾度",
+        "沙田而家幾度",
         "今天天氣預報",
         "有沒有警報",
         "下雨嗎",
@@ -263,7 +352,8 @@ def main():
     for query in test_queries:
         print(f"用戶查詢：{query}")
         print("-" * 40)
-        print(handle_weather_query(query))
+        print(handle_weather_query(query, weather_buffer=load_weather_buffer(),
+                                   station_snapshot=load_station_snapshot()))
         print()
         print("=" * 60)
         print()
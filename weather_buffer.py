@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+天氣觀測環形緩衝區
+固定容量、array 存儲，O(1) 維護滾動統計和一小時累計雨量
+"""
+
+import os
+import json
+from array import array
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+# 香港時區
+HK_TZ = timezone(timedelta(hours=8))
+
+WORKSPACE = Path.home() / ".openclaw" / "workspace"
+DEFAULT_SNAPSHOT_FILE = WORKSPACE / "weather" / "observations.snapshot"
+
+# 緩衝區保存的數值欄位
+FIELDS = ('temperature', 'humidity', 'rainfall', 'wind_speed')
+
+# 快照格式版本
+SNAPSHOT_VERSION = 1
+
+
+class WeatherRingBuffer:
+    """天氣觀測環形緩衝區"""
+
+    def __init__(self, capacity: int = 288, rain_window: int = 3600):
+        # 默認 288 個觀測 = 5 分鐘一次，共 24 小時
+        if capacity <= 0:
+            raise ValueError("capacity 必須大於 0")
+
+        self.capacity = capacity
+        self.rain_window = rain_window
+
+        # 每個欄位一個固定長度的 double 數組
+        self._times = array('d', [0.0]) * capacity
+        self._values = {field: array('d', [0.0]) * capacity for field in FIELDS}
+
+        # 已寫入的觀測總數（序號），槽位 = 序號 % 容量
+        self._seq = 0
+
+        # 滾動統計
+        self._sums = {field: 0.0 for field in FIELDS}
+        self._min_queues = {field: deque() for field in FIELDS}
+        self._max_queues = {field: deque() for field in FIELDS}
+
+        # 一小時累計雨量（時間窗口起點序號）
+        self._rain_start = 0
+        self._rain_sum = 0.0
+
+    def __len__(self) -> int:
+        return min(self._seq, self.capacity)
+
+    @property
+    def _oldest(self) -> int:
+        """緩衝區內最舊觀測的序號"""
+        return self._seq - len(self)
+
+    def append(self, observation: Dict[str, Any]) -> None:
+        """寫入一個觀測（O(1) 攤銷）"""
+        observation_time = observation.get('observation_time') or datetime.now(HK_TZ)
+        if isinstance(observation_time, datetime):
+            timestamp = observation_time.timestamp()
+        else:
+            timestamp = float(observation_time)
+
+        seq = self._seq
+        slot = seq % self.capacity
+
+        # 1. 容量已滿：移除被覆蓋的最舊觀測
+        if seq >= self.capacity:
+            evicted = seq - self.capacity
+            for field in FIELDS:
+                self._sums[field] -= self._values[field][slot]
+            if self._rain_start <= evicted:
+                self._rain_sum -= self._values['rainfall'][slot]
+                self._rain_start = evicted + 1
+
+        # 2. 寫入新觀測
+        self._times[slot] = timestamp
+        for field in FIELDS:
+            value = float(observation.get(field) or 0.0)
+            self._values[field][slot] = value
+            self._sums[field] += value
+            self._push_extremes(field, seq, value)
+
+        self._rain_sum += self._values['rainfall'][slot]
+        self._seq = seq + 1
+
+        # 3. 移除超出時間窗口的雨量
+        self._expire_rainfall(timestamp)
+
+    def _push_extremes(self, field: str, seq: int, value: float) -> None:
+        """更新單調隊列（滾動最小值 / 最大值）"""
+        oldest = seq + 1 - min(seq + 1, self.capacity)
+        values = self._values[field]
+
+        min_queue = self._min_queues[field]
+        while min_queue and values[min_queue[-1] % self.capacity] >= value:
+            min_queue.pop()
+        min_queue.append(seq)
+        while min_queue[0] < oldest:
+            min_queue.popleft()
+
+        max_queue = self._max_queues[field]
+        while max_queue and values[max_queue[-1] % self.capacity] <= value:
+            max_queue.pop()
+        max_queue.append(seq)
+        while max_queue[0] < oldest:
+            max_queue.popleft()
+
+    def _expire_rainfall(self, now: float) -> None:
+        """移除一小時以前的雨量"""
+        cutoff = now - self.rain_window
+        while self._rain_start < self._seq:
+            slot = self._rain_start % self.capacity
+            if self._times[slot] > cutoff:
+                break
+            self._rain_sum -= self._values['rainfall'][slot]
+            self._rain_start += 1
+
+    def stats(self, field: str) -> Dict[str, Any]:
+        """獲取欄位的滾動統計（mean / min / max / sum）"""
+        if field not in FIELDS:
+            raise KeyError(f"未知欄位：{field}")
+
+        count = len(self)
+        if count == 0:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None, 'sum': 0.0}
+
+        values = self._values[field]
+        total = self._sums[field]
+
+        return {
+            'count': count,
+            'mean': round(total / count, 2),
+            'min': values[self._min_queues[field][0] % self.capacity],
+            'max': values[self._max_queues[field][0] % self.capacity],
+            'sum': round(total, 2)
+        }
+
+    def all_stats(self) -> Dict[str, Dict[str, Any]]:
+        """獲取所有欄位的滾動統計"""
+        return {field: self.stats(field) for field in FIELDS}
+
+    def rainfall_1h(self) -> float:
+        """過去一小時累計雨量（毫米）"""
+        return round(max(self._rain_sum, 0.0), 1)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """獲取最新觀測"""
+        if self._seq == 0:
+            return None
+        return self._row(self._seq - 1)
+
+    def recent(self, limit: int = 24) -> List[Dict[str, Any]]:
+        """獲取最近的觀測（舊到新）"""
+        count = min(limit, len(self))
+        return [self._row(seq) for seq in range(self._seq - count, self._seq)]
+
+    def _row(self, seq: int) -> Dict[str, Any]:
+        slot = seq % self.capacity
+        row = {field: self._values[field][slot] for field in FIELDS}
+        row['observation_time'] = datetime.fromtimestamp(self._times[slot], HK_TZ)
+        return row
+
+    def snapshot(self, path: Path = DEFAULT_SNAPSHOT_FILE) -> bool:
+        """保存快照到磁盤（原子替換）"""
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            header = {
+                'version': SNAPSHOT_VERSION,
+                'capacity': self.capacity,
+                'rain_window': self.rain_window,
+                'count': len(self),
+                'fields': list(FIELDS)
+            }
+
+            # 按時間順序寫出，恢復時直接重放
+            order = [seq % self.capacity for seq in range(self._oldest, self._seq)]
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                array('d', (self._times[i] for i in order)).tofile(f)
+                for field in FIELDS:
+                    values = self._values[field]
+                    array('d', (values[i] for i in order)).tofile(f)
+
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"[BUFFER] 保存快照失敗: {e}")
+            return False
+
+    @classmethod
+    def restore(cls, path: Path = DEFAULT_SNAPSHOT_FILE, capacity: int = 288,
+                rain_window: int = 3600) -> 'WeatherRingBuffer':
+        """從快照恢復（快照不存在或損壞時返回空緩衝區）"""
+        buffer = cls(capacity=capacity, rain_window=rain_window)
+        path = Path(path)
+
+        if not path.exists():
+            return buffer
+
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+                if header.get('version') != SNAPSHOT_VERSION:
+                    print(f"[BUFFER] 快照版本不兼容: {header.get('version')}")
+                    return buffer
+
+                count = header['count']
+                times = array('d')
+                times.fromfile(f, count)
+                columns = {}
+                for field in header['fields']:
+                    columns[field] = array('d')
+                    columns[field].fromfile(f, count)
+
+            for field in FIELDS:
+                columns.setdefault(field, array('d', [0.0]) * count)
+
+            # 重放觀測以重建滾動統計
+            for i in range(count):
+                observation = {field: columns[field][i] for field in FIELDS}
+                observation['observation_time'] = times[i]
+                buffer.append(observation)
+
+            print(f"[BUFFER] 已恢復 {len(buffer)} 個觀測")
+        except Exception as e:
+            print(f"[BUFFER] 恢復快照失敗: {e}")
+            buffer = cls(capacity=capacity, rain_window=rain_window)
+
+        return buffer
+
+
+def main():
+    """主函數 - 測試環形緩衝區"""
+    print("=" * 60)
+    print("天氣觀測環形緩衝區測試")
+    print("=" * 60)
+    print()
+
+    buffer = WeatherRingBuffer(capacity=12)
+    start = datetime.now(HK_TZ) - timedelta(minutes=90)
+
+    for i in range(18):
+        buffer.append({
+            'temperature': 28.0 + i * 0.2,
+            'humidity': 75,
+            'rainfall': 2.0,
+            'wind_speed': 15.0 + i,
+            'observation_time': start + timedelta(minutes=5 * i)
+        })
+
+    print(f"觀測數量：{len(buffer)}")
+    for field, stats in buffer.all_stats().items():
+        print(f"  {field}: {stats}")
+    print(f"過去一小時累計雨量：{buffer.rainfall_1h()}mm")
+    print()
+    print("環形緩衝區已準備就緒！")
+
+
+if __name__ == "__main__":
+    main()